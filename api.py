@@ -1,9 +1,25 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List, Optional, Any
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Any, Tuple
+import os
 import uvicorn
 import logging
+import time
+import uuid
 from recommend_engine import SHLRecommendationEngine
+from metrics import REGISTRY, MultiprocessMetrics, REQUEST_SECONDS, URL_FETCH_FAILURES, time_stage
+from profiling import RequestProfiler
+from serialization import (
+    ASSESSMENT_FIELDS, FastJSONResponse, dumps, fragment_object, fragment_response, recommendation_fragments
+)
+from batch_stream import NDJSONBatchStream
+from job_queue import JobQueue, JobStore
+from singleflight import SingleFlight
+from catalog_registry import CatalogRegistry
+from compression import CompressionMiddleware
+from rate_limiter import RateLimitMiddleware, rate_limit_settings_from_env
 from pydantic import BaseModel
 import requests
 from bs4 import BeautifulSoup
@@ -12,16 +28,58 @@ from bs4 import BeautifulSoup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize recommendation engine
-recommendation_engine = SHLRecommendationEngine()
+# Initialize recommendation engine; SHL_SEMANTIC_CACHE_THRESHOLD (e.g. 0.95) enables
+# reuse of results for near-duplicate queries
+semantic_cache_threshold = os.getenv("SHL_SEMANTIC_CACHE_THRESHOLD")
+recommendation_engine = SHLRecommendationEngine(
+    semantic_cache_threshold=float(semantic_cache_threshold) if semantic_cache_threshold else None,
+    semantic_cache_verify_rate=float(os.getenv("SHL_SEMANTIC_CACHE_VERIFY_RATE", "0"))
+)
+
+# Named catalogs configured in SHL_CATALOGS (a JSON file, see catalog_registry.py) share
+# the engine's model; idle ones are evicted above SHL_CATALOG_MEMORY_MB
+catalog_registry = CatalogRegistry.from_file(
+    recommendation_engine,
+    os.getenv("SHL_CATALOGS"),
+    memory_cap_mb=float(os.getenv("SHL_CATALOG_MEMORY_MB", "1024"))
+)
+
+# Concurrent identical recommendations and URL fetches share one computation
+recommend_flight = SingleFlight("recommend")
+url_fetch_flight = SingleFlight("url_fetch")
+
+# HTML elements whose text starts on a new line when a page is extracted
+BLOCK_TAGS = ["p", "div", "li", "ul", "ol", "br", "tr", "td", "th", "section", "article",
+              "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd", "blockquote", "pre"]
+
+# Longest total time budget accepted by /recommend/bundle (a working day)
+MAX_BUNDLE_MINUTES = 8 * 60
+
+# Opt-in request profiling (see profiling.py for configuration)
+request_profiler = RequestProfiler.from_env()
+
+# With several worker processes, SHL_METRICS_DIR (shared by the workers) makes /metrics
+# report the sum over all of them (when preloaded by serve.py, the forked workers start it)
+metrics_dir = os.getenv("SHL_METRICS_DIR")
+multiprocess_metrics = MultiprocessMetrics(REGISTRY, metrics_dir) if metrics_dir else None
+if multiprocess_metrics is not None and os.getenv("SHL_PRELOAD") != "1":
+    multiprocess_metrics.start()
 
 # Create FastAPI app
 app = FastAPI(
     title="SHL Assessment Recommendation API",
     description="API for recommending SHL assessments based on job descriptions or natural language queries",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Per-client token-bucket rate limits and concurrency quotas (see rate_limiter.py
+# for the SHL_RATE_* settings); rejected requests get a 429 with Retry-After
+app.add_middleware(RateLimitMiddleware, **rate_limit_settings_from_env())
+
+# Compress responses with Brotli or gzip, as negotiated with the client
+app.add_middleware(CompressionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +93,11 @@ class QueryRequest(BaseModel):
     query: str
     max_results: Optional[int] = 10
     url: Optional[str] = None
+    rerank: Optional[bool] = False  # Re-score candidates with the cross-encoder
+    latency_budget_ms: Optional[float] = None  # Budget for recommendation when re-ranking
+    diversity_lambda: Optional[float] = None  # MMR relevance/diversity trade-off (1.0 = relevance only)
+    explain: Optional[bool] = False  # Add an explanation to every recommendation
+    catalog: Optional[str] = None  # Named catalog to recommend from (default catalog if omitted)
 
 class AssessmentResponse(BaseModel):
     title: str
@@ -44,11 +107,59 @@ class AssessmentResponse(BaseModel):
     duration: str
     test_type: str
 
+class FilterCheck(BaseModel):
+    name: str  # 'duration_limit', 'remote_testing', 'adaptive_testing' or 'test_type'
+    value: Any
+    satisfied: bool
+
+class ExplanationResponse(BaseModel):
+    matched_skills: List[str]
+    matched_keywords: List[str]
+    matched_terms: List[str]  # Normalized forms, for highlighting
+    title_matches: List[str]
+    scores: Dict[str, float]  # semantic_similarity, term_overlap, and fusion/rerank when used
+    filters: List[FilterCheck]
+
+class RecommendedAssessmentResponse(AssessmentResponse):
+    explanation: Optional[ExplanationResponse] = None  # Only when the request sets explain
+
 class RecommendationResponse(BaseModel):
-    recommendations: List[AssessmentResponse]
+    recommendations: List[RecommendedAssessmentResponse]
     query: str
     source: str  # 'text' or 'url'
 
+class BundleRequest(BaseModel):
+    query: str
+    total_minutes: Optional[int] = None  # Defaults to the budget stated in the query, or 60 (at most MAX_BUNDLE_MINUTES)
+
+class BundleResponse(BaseModel):
+    recommendations: List[AssessmentResponse]
+    query: str
+    total_minutes: int
+    used_minutes: int
+
+class CatalogAssessmentResponse(AssessmentResponse):
+    id: int  # Position in the catalog
+    description: Optional[str] = None
+
+class AssessmentListResponse(BaseModel):
+    assessments: List[CatalogAssessmentResponse]
+    total: int  # Number of assessments matching the filters
+    offset: int
+    limit: int
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str  # 'queued', 'running', 'succeeded' or 'failed'
+    created_at: float
+    updated_at: float
+    result: Optional[RecommendationResponse] = None
+    error: Optional[str] = None
+
+class SimilarAssessmentsResponse(BaseModel):
+    assessment_id: int
+    recommendations: List[AssessmentResponse]
+
 @app.get("/health")
 async def health_check():
     """
@@ -56,64 +167,415 @@ async def health_check():
     """
     return {"status": "ok", "message": "SHL Assessment Recommendation API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Expose stage timings, request latencies and cache/fallback counters in Prometheus text format.
+    Summed over all worker processes when SHL_METRICS_DIR is set, otherwise this process's only.
+    """
+    text = multiprocess_metrics.render() if multiprocess_metrics is not None else REGISTRY.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/catalogs")
+async def list_catalogs():
+    """
+    List the configured catalogs and the loaded ones (least recently used first) with their estimated memory.
+    """
+    return {"catalogs": catalog_registry.names(), "loaded_mb": catalog_registry.loaded()}
+
 @app.post("/recommend", response_model=RecommendationResponse)
-async def recommend_assessments(request: QueryRequest):
+async def recommend_assessments(request: QueryRequest, http_request: Request):
     """
     Recommend SHL assessments based on a job description or natural language query.
+    
+    Send `X-Profile: 1` (when profiling is enabled) to capture a profile of the recommendation
+    (profiled requests are not coalesced with identical ones); the `X-Request-ID` response
+    header identifies the saved artifact.
     """
+    request_id = RequestProfiler.safe_request_id(http_request.headers.get("X-Request-ID")) or uuid.uuid4().hex
+    
+    profile_id = request_id if request_profiler.should_profile(http_request.headers) else None
+    response = await _recommend_assessments(request, profile_id)
+    
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+def _fetch_url_text(url: str) -> str:
+    """Fetch a job description page and extract its text."""
     try:
+        logger.info(f"Fetching content from URL: {url}")
+        with time_stage("url_fetch"):
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+        
+        with time_stage("html_parse"):
+            # Parse HTML content
+            soup = BeautifulSoup(response.text, 'html.parser')
+            
+            # Drop markup that never holds the job description
+            for tag in soup(["script", "style", "noscript", "nav", "header", "footer"]):
+                tag.decompose()
+            
+            # Extract text content, one block element per line so the engine's
+            # query preprocessing can tell menu items from sentences
+            for tag in soup.find_all(BLOCK_TAGS):
+                tag.insert_after("\n")
+            lines = (" ".join(line.split()) for line in soup.get_text(separator=" ").splitlines())
+            text_content = "\n".join(line for line in lines if line)
+        
+        logger.info(f"Successfully extracted content from URL: {url}")
+        return text_content
+    except Exception as e:
+        URL_FETCH_FAILURES.inc()
+        logger.error(f"Error fetching URL content: {e}")
+        raise
+
+def _recommendation_key(request: QueryRequest, query: str) -> tuple:
+    """Identify requests that produce the same recommendations."""
+    return (query, min(request.max_results, 10), bool(request.rerank),
+            request.latency_budget_ms, request.diversity_lambda, bool(request.explain), request.catalog)
+
+def _recommend_for_request(request: QueryRequest, query: str) -> Tuple[List[Dict[str, Any]], Any]:
+    """
+    Run the auto-filtered recommendation with the options of a request.
+    
+    Returns:
+        The recommendations and the catalog index of the catalog they came from
+    """
+    max_results = min(request.max_results, 10)  # Limit to 10 maximum
+    with catalog_registry.acquire(request.catalog) as engine:
+        with time_stage("recommend"):
+            recommendations = engine.recommend_with_auto_filter(
+                query,
+                top_k=max_results,
+                rerank=bool(request.rerank),
+                latency_budget_ms=request.latency_budget_ms,
+                diversity_lambda=request.diversity_lambda,
+                explain=bool(request.explain)
+            )
+        return recommendations, engine.catalog_index
+
+def _check_catalog(request: QueryRequest) -> None:
+    """Reject requests for catalogs that are not configured."""
+    if request.catalog and request.catalog not in catalog_registry:
+        raise HTTPException(status_code=404, detail=f"Unknown catalog: {request.catalog}")
+
+async def _recommend_assessments(request: QueryRequest, profile_id: str = None) -> Response:
+    """
+    Fetch, recommend and format the response for a /recommend request.
+    
+    Args:
+        request: The request
+        profile_id: Request id to save a profile of the recommendation under (None to not profile)
+    """
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        _check_catalog(request)
         query = request.query
         source = "text"
         
         # If URL is provided, fetch the content
         if request.url:
             try:
-                logger.info(f"Fetching content from URL: {request.url}")
-                response = requests.get(request.url, timeout=10)
-                response.raise_for_status()
-                
-                # Parse HTML content
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract text content
-                text_content = soup.get_text(separator=" ", strip=True)
-                
-                # Use the extracted text as query
-                query = text_content
+                query = await url_fetch_flight.do_async(request.url, _fetch_url_text, request.url)
                 source = "url"
-                
-                logger.info(f"Successfully extracted content from URL: {request.url}")
             except Exception as e:
-                logger.error(f"Error fetching URL content: {e}")
                 raise HTTPException(status_code=400, detail=f"Failed to fetch content from URL: {str(e)}")
         
-        # Get recommendations
-        max_results = min(request.max_results, 10)  # Limit to 10 maximum
-        recommendations = recommendation_engine.recommend_with_auto_filter(query, top_k=max_results)
+        # Get recommendations off the event loop, coalesced with identical in-flight requests;
+        # a profiled request runs its own under the profiler in the worker thread, the one sampled
+        profile_path = None
+        if profile_id is not None:
+            (recommendations, catalog_index), profile_path = await run_in_threadpool(
+                request_profiler.run, profile_id, _recommend_for_request, request, query
+            )
+        else:
+            recommendations, catalog_index = await recommend_flight.do_async(
+                _recommendation_key(request, query), _recommend_for_request, request, query
+            )
         
-        # Format response
-        formatted_recommendations = []
-        for rec in recommendations:
-            formatted_recommendations.append(
-                AssessmentResponse(
-                    title=rec["title"],
-                    url=rec["url"],
-                    remote_testing_support=rec["remote_testing_support"],
-                    adaptive_irt_support=rec["adaptive_irt_support"],
-                    duration=rec["duration"],
-                    test_type=rec["test_type"]
-                )
+        # Format response from the pre-serialized assessments (see RecommendationResponse)
+        with time_stage("response_formatting"):
+            response = fragment_response(
+                "recommendations",
+                recommendation_fragments(recommendations, catalog_index),
+                {
+                    "query": request.query if source == "text" else f"Content from {request.url}",
+                    "source": source
+                }
             )
+        if profile_path:
+            response.headers["X-Profiled"] = "1"
         
-        return RecommendationResponse(
-            recommendations=formatted_recommendations,
-            query=request.query if source == "text" else f"Content from {request.url}",
-            source=source
-        )
+        status = 200
+        return response
         
+    except HTTPException as e:
+        # Keep client errors (e.g. an unreachable URL) as they are
+        status = e.status_code
+        raise
     except Exception as e:
         logger.error(f"Error processing recommendation request: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, endpoint="/recommend", status=str(status))
+
+@app.post("/recommend/bundle", response_model=BundleResponse)
+async def recommend_bundle(request: BundleRequest):
+    """
+    Recommend a set of assessments that can be completed together within a total time budget.
+    """
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        if request.total_minutes is not None and not 0 < request.total_minutes <= MAX_BUNDLE_MINUTES:
+            raise HTTPException(status_code=422,
+                                detail=f"total_minutes must be between 1 and {MAX_BUNDLE_MINUTES}")
+        
+        # Encoding and bundle selection run off the event loop
+        bundle = await run_in_threadpool(
+            recommendation_engine.recommend_bundle, request.query, total_minutes=request.total_minutes
+        )
+        
+        response = fragment_response(
+            "recommendations",
+            recommendation_fragments(bundle["assessments"], recommendation_engine.catalog_index),
+            {
+                "query": request.query,
+                "total_minutes": bundle["total_minutes"],
+                "used_minutes": bundle["used_minutes"]
+            }
+        )
+        status = 200
+        return response
+    
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except Exception as e:
+        logger.error(f"Error processing bundle request: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, endpoint="/recommend/bundle", status=str(status))
+
+def _run_recommendation_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the /recommend response for a background job (runs on a job worker thread)."""
+    request = QueryRequest(**payload)
+    query = request.query
+    source = "text"
+    if request.url:
+        try:
+            query = url_fetch_flight.do(request.url, _fetch_url_text, request.url)
+            source = "url"
+        except Exception as e:
+            raise RuntimeError(f"Failed to fetch content from URL: {str(e)}")
+    
+    recommendations, _ = recommend_flight.do(
+        _recommendation_key(request, query), _recommend_for_request, request, query
+    )
+    return {
+        "recommendations": [
+            dict({field: rec[field] for field in ASSESSMENT_FIELDS},
+                 **({"explanation": rec["explanation"]} if "explanation" in rec else {}))
+            for rec in recommendations
+        ],
+        "query": request.query if source == "text" else f"Content from {request.url}",
+        "source": source
+    }
+
+# Background jobs for slow (URL-based) requests, persisted in a local SQLite file that
+# every worker process shares (when preloaded by serve.py, the forked workers start it)
+job_queue = JobQueue(
+    JobStore(os.getenv("SHL_JOB_DB", "data/jobs.db")),
+    _run_recommendation_job,
+    workers=int(os.getenv("SHL_JOB_WORKERS", "4")),
+    start=os.getenv("SHL_PRELOAD") != "1"
+)
+
+@app.post("/recommend/jobs", response_model=JobResponse, status_code=202)
+async def submit_recommendation_job(request: QueryRequest, response: Response):
+    """
+    Queue a recommendation request (typically one with a `url`) and return its job id
+    immediately. Poll `GET /recommend/jobs/{job_id}` for the result; an identical request
+    submitted while the job is queued or running returns the same job id.
+    """
+    _check_catalog(request)
+    payload = request.model_dump()
+    if payload["url"]:
+        # The query text is not used when a URL is given, so it doesn't distinguish jobs
+        payload["query"] = ""
+    
+    # The job store's SQLite transactions can wait on other workers; keep them off the event loop
+    job_id = await run_in_threadpool(job_queue.submit, payload)
+    response.headers["Location"] = f"/recommend/jobs/{job_id}"
+    return await run_in_threadpool(job_queue.get, job_id)
+
+@app.get("/recommend/jobs/{job_id}", response_model=JobResponse)
+async def get_recommendation_job(job_id: str):
+    """
+    Get the status of a recommendation job and, once it has finished, its result or error.
+    """
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.post("/recommend/stream")
+async def recommend_stream(max_results: int = Query(10, ge=1, le=10),
+                           batch_size: int = Query(32, ge=1, le=256)):
+    """
+    Recommend assessments for many queries, streamed as NDJSON.
+    
+    Send one JSON object per line, `{"query": "...", "id": ...}` (`id` is optional
+    and echoed back). One line per query is written back in input order, as
+    `{"recommendations": [...], "id": ..., "query": ...}` or `{"id": ..., "error": ...}`,
+    each micro-batch as soon as it completes; if a whole batch fails, each of its queries
+    gets `{"index": ..., "id": ..., "error": ...}` and the stream goes on. Only plain
+    text queries are supported.
+    """
+    start_time = time.perf_counter()
+    
+    def process_batch(items: List[Dict[str, Any]]) -> bytes:
+        valid = [
+            item for item in items
+            if "error" not in item and isinstance(item.get("query"), str) and item["query"].strip()
+        ]
+        results = recommendation_engine.recommend_batch([item["query"] for item in valid], top_k=max_results)
+        recommendations_by_item = {id(item): recs for item, recs in zip(valid, results)}
+        
+        lines = []
+        for item in items:
+            recommendations = recommendations_by_item.get(id(item))
+            if recommendations is None:
+                error = item.get("error", "Each line needs a non-empty \"query\" string")
+                lines.append(dumps({"id": item.get("id"), "error": error}))
+            else:
+                lines.append(fragment_object(
+                    "recommendations",
+                    recommendation_fragments(recommendations, recommendation_engine.catalog_index),
+                    {"id": item.get("id"), "query": item["query"]}
+                ))
+        return b"\n".join(lines) + b"\n"
+    
+    def on_complete(processed: int) -> None:
+        logger.info(f"Streamed recommendations for {processed} queries")
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, endpoint="/recommend/stream", status="200")
+    
+    return NDJSONBatchStream(process_batch, batch_size=batch_size, on_complete=on_complete)
+
+def _catalog_etag() -> str:
+    """ETag of catalog responses: the catalog content version."""
+    return f'"{recommendation_engine.catalog_index.version}"'
+
+def _client_has(http_request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header lists the ETag."""
+    return etag in [tag.strip() for tag in http_request.headers.get("If-None-Match", "").split(",")]
+
+def _catalog_assessment_response(assessment_id: int, http_request: Request) -> Response:
+    """Respond with one pre-serialized catalog assessment, or 304 if the client has it."""
+    etag = _catalog_etag()
+    if _client_has(http_request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=recommendation_engine.catalog_index.catalog_fragments[assessment_id],
+        media_type="application/json",
+        headers={"ETag": etag}
+    )
+
+@app.get("/assessments", response_model=AssessmentListResponse)
+async def list_assessments(http_request: Request,
+                           test_type: Optional[str] = None,
+                           min_duration: Optional[float] = Query(None, ge=0),
+                           max_duration: Optional[float] = Query(None, ge=0),
+                           remote: Optional[bool] = None,
+                           adaptive: Optional[bool] = None,
+                           offset: int = Query(0, ge=0),
+                           limit: int = Query(20, ge=1, le=100)):
+    """
+    Browse the catalog, filtered by test type, duration range (minutes) and
+    remote/adaptive support, one page at a time.
+    
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 while
+    the catalog is unchanged.
+    """
+    etag = _catalog_etag()
+    if _client_has(http_request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    catalog_index = recommendation_engine.catalog_index
+    ids, total = catalog_index.page(
+        offset=offset,
+        limit=limit,
+        test_type=test_type,
+        min_duration=min_duration,
+        max_duration=max_duration,
+        remote=remote,
+        adaptive=adaptive
+    )
+    return fragment_response(
+        "assessments",
+        [catalog_index.catalog_fragments[assessment_id] for assessment_id in ids],
+        {"total": total, "offset": offset, "limit": limit},
+        headers={"ETag": etag}
+    )
+
+@app.get("/assessments/lookup", response_model=CatalogAssessmentResponse)
+async def lookup_assessment(http_request: Request, url: Optional[str] = None, title: Optional[str] = None):
+    """
+    Look up a catalog assessment by its URL or its title (case-insensitive).
+    """
+    if not url and not title:
+        raise HTTPException(status_code=422, detail="Provide url or title")
+    
+    catalog_index = recommendation_engine.catalog_index
+    assessment_id = catalog_index.by_url(url) if url else catalog_index.by_title(title)
+    if assessment_id is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    
+    return _catalog_assessment_response(assessment_id, http_request)
+
+@app.get("/assessments/{assessment_id}", response_model=CatalogAssessmentResponse)
+async def get_assessment(assessment_id: int, http_request: Request):
+    """
+    Get a catalog assessment by id (its position in the catalog).
+    """
+    if not 0 <= assessment_id < len(recommendation_engine.assessments):
+        raise HTTPException(status_code=404, detail=f"Assessment {assessment_id} not found")
+    
+    return _catalog_assessment_response(assessment_id, http_request)
+
+@app.get("/assessments/{assessment_id}/similar", response_model=SimilarAssessmentsResponse)
+async def similar_assessments(assessment_id: int, max_results: int = Query(10, ge=1, le=10)):
+    """
+    List the assessments most similar to a catalog assessment ("more like this").
+    
+    The assessment id is its position in the catalog. Results come from the
+    precomputed neighbor graph, so no model is called.
+    """
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        similar = recommendation_engine.similar_assessments(assessment_id, top_k=max_results)
+        if similar is None:
+            raise HTTPException(status_code=404, detail=f"Assessment {assessment_id} not found")
+        
+        response = fragment_response(
+            "recommendations",
+            recommendation_fragments(similar, recommendation_engine.catalog_index),
+            {"assessment_id": assessment_id}
+        )
+        status = 200
+        return response
+    
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except Exception as e:
+        logger.error(f"Error processing similar assessments request: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, endpoint="/assessments/{id}/similar", status=str(status))
 
 if __name__ == "__main__":
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
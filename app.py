@@ -5,6 +5,7 @@ import os
 import pandas as pd
 from recommend_engine import SHLRecommendationEngine
 from evaluator import RecommendationEvaluator
+from explanations import highlight_terms
 import base64
 from PIL import Image
 import io
@@ -26,6 +27,47 @@ def get_recommendation_engine():
 
 engine = get_recommendation_engine()
 
+# Initialize evaluator once, sharing the cached engine
+@st.cache_resource
+def get_evaluator():
+    return RecommendationEvaluator(recommendation_engine=engine)
+
+evaluator = get_evaluator()
+
+SAVED_EVALUATION_PATH = os.path.join("evaluation_results", "evaluation_results.json")
+
+FILTER_LABELS = {
+    "duration_limit": "Max duration (minutes)",
+    "remote_testing": "Remote testing",
+    "adaptive_testing": "Adaptive testing",
+    "test_type": "Test type"
+}
+
+@st.cache_data(show_spinner=False)
+def fetch_url_text(url):
+    """Fetch a job description page and extract its text."""
+    from bs4 import BeautifulSoup
+    
+    response = requests.get(url, timeout=10)
+    soup = BeautifulSoup(response.text, 'html.parser')
+    return soup.get_text(separator=" ", strip=True)
+
+@st.cache_data(show_spinner=False)
+def get_recommendations(query, top_k, index_version):
+    """Get recommendations, cached per query, result count and index version."""
+    return engine.recommend(query, top_k=top_k)
+
+@st.cache_data(show_spinner=False)
+def run_evaluation(k_values, verbose, index_version):
+    """Run the evaluation, cached per k values and index version."""
+    return evaluator.evaluate(k_values=list(k_values), verbose=verbose)
+
+@st.cache_data(show_spinner=False)
+def load_saved_evaluation(path, modified_time):
+    """Load saved evaluation results (cache is refreshed when the file changes)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 # Custom CSS for blue and purple theme
 def add_custom_css():
     st.markdown("""
@@ -242,17 +284,12 @@ with tab1:
                     # Process the query
                     if url_input:
                         # Use URL content as query
-                        import requests
-                        from bs4 import BeautifulSoup
-                        
-                        response = requests.get(url_input, timeout=10)
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        query = soup.get_text(separator=" ", strip=True)
+                        query = fetch_url_text(url_input)
                     else:
                         query = user_query
                     
                     # Get recommendations
-                    recommendations = engine.recommend(query, top_k=max_results * 2)  # Get more for filtering
+                    recommendations = get_recommendations(query, max_results * 2, engine.index_version)  # Get more for filtering
                     
                     # Apply filters if specified
                     filters = {}
@@ -306,18 +343,31 @@ with tab1:
                         
                         st.dataframe(df, hide_index=True, use_container_width=True)
                         
-                        # Show explanations
+                        # Show explanations (term matches, filters and scores; no extra model calls)
                         st.markdown("### Why These Assessments?")
-                        for i, rec in enumerate(filtered_recommendations[:3], 1):
+                        top_recommendations = filtered_recommendations[:3]
+                        explanations = engine.explain(query, top_recommendations, filters=filters)
+                        for rec, explanation in zip(top_recommendations, explanations):
                             with st.expander(f"Why recommend: {rec['title']}"):
-                                st.markdown(f"""
-                                * **Test Type**: {rec['test_type']}
-                                * **Duration**: {rec['duration']}
-                                * **Remote Testing**: {rec['remote_testing_support']}
-                                * **Adaptive Testing**: {rec['adaptive_irt_support']}
+                                assessment_id = engine.catalog_index.by_url(rec['url'])
+                                description = engine.assessments[assessment_id].get('description', '') \
+                                    if assessment_id is not None else ''
+                                filter_lines = "\n".join(
+                                    f"* {FILTER_LABELS.get(check['name'], check['name'])} ({check['value']}): "
+                                    f"{'satisfied' if check['satisfied'] else 'not satisfied'}"
+                                    for check in explanation["filters"]
+                                ) or "* No filters applied"
+                                scores = explanation["scores"]
                                 
-                                This assessment was recommended based on the skills and requirements mentioned in your query.
-                                """)
+                                st.markdown(
+                                    f"{highlight_terms(rec['title'], explanation['matched_terms'])}\n\n"
+                                    f"{highlight_terms(description, explanation['matched_terms'])}\n\n"
+                                    f"* **Matched skills**: {', '.join(explanation['matched_skills']) or 'None'}\n"
+                                    f"* **Matched keywords**: {', '.join(explanation['matched_keywords']) or 'None'}\n"
+                                    f"* **Semantic similarity**: {scores['semantic_similarity']:.2f}\n"
+                                    f"* **Query terms matched**: {scores['term_overlap']:.0%}\n\n"
+                                    f"**Filters**\n\n{filter_lines}"
+                                )
                 
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
@@ -329,9 +379,6 @@ with tab2:
     <p>View the performance metrics of the recommendation system.</p>
     """, unsafe_allow_html=True)
     
-    # Initialize evaluator
-    evaluator = RecommendationEvaluator(recommendation_engine=engine)
-    
     # Add k-value selection
     col1, col2 = st.columns(2)
     with col1:
@@ -348,157 +395,169 @@ with tab2:
         if not k_values:
             st.error("Please select at least one k value for evaluation")
         else:
-            with st.spinner("Running evaluation..."):
-                # Run evaluation with selected k values
-                results = evaluator.evaluate(k_values=k_values, verbose=verbose_output)
-                
-                # Display metrics
-                st.markdown("### Overall Evaluation Metrics")
-                
-                # Create two columns for metrics
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown("#### Mean Average Precision (MAP)")
-                    map_data = {
-                        'K value': k_values,
-                        'MAP': [results["overall"][f"map@{k}"] for k in k_values]
-                    }
-                    map_df = pd.DataFrame(map_data)
-                    st.dataframe(map_df, hide_index=True, use_container_width=True)
-                    
-                    # Create MAP chart
-                    fig, ax = plt.subplots(figsize=(8, 4))
-                    ax.bar([f'MAP@{k}' for k in k_values], 
-                           [results["overall"][f"map@{k}"] for k in k_values],
-                           color='#6c63ff')
-                    ax.set_ylim(0, 1)
-                    ax.set_ylabel('Score')
-                    ax.set_title('Mean Average Precision (MAP)')
-                    ax.spines['top'].set_visible(False)
-                    ax.spines['right'].set_visible(False)
-                    
-                    # Set the figure background to be transparent
-                    fig.patch.set_alpha(0)
-                    ax.set_facecolor('none')
-                    ax.tick_params(axis='x', colors='white')
-                    ax.tick_params(axis='y', colors='white')
-                    ax.yaxis.label.set_color('white')
-                    ax.xaxis.label.set_color('white')
-                    ax.title.set_color('white')
-                    
-                    st.pyplot(fig)
-                
-                with col2:
-                    st.markdown("#### Mean Recall")
-                    recall_data = {
-                        'K value': k_values,
-                        'Mean Recall': [results["overall"][f"mean_recall@{k}"] for k in k_values]
-                    }
-                    recall_df = pd.DataFrame(recall_data)
-                    st.dataframe(recall_df, hide_index=True, use_container_width=True)
+            st.session_state["evaluation_requested"] = True
+    
+    # Show saved results until an evaluation is requested; re-running is cached per k values and index
+    results = None
+    if k_values and st.session_state.get("evaluation_requested"):
+        with st.spinner("Running evaluation..."):
+            results = run_evaluation(tuple(sorted(k_values)), verbose_output, engine.index_version)
+    elif k_values and os.path.exists(SAVED_EVALUATION_PATH):
+        saved_results = load_saved_evaluation(SAVED_EVALUATION_PATH, os.path.getmtime(SAVED_EVALUATION_PATH))
+        if all(f"map@{k}" in saved_results.get("overall", {}) for k in k_values):
+            st.info(f"Showing saved results from {SAVED_EVALUATION_PATH}. Click \"Run Evaluation\" to recompute.")
+            results = saved_results
+        else:
+            st.info("Saved results don't cover the selected k values. Click \"Run Evaluation\" to compute them.")
+    
+    if results:
+        # Display metrics
+        st.markdown("### Overall Evaluation Metrics")
+        
+        # Create two columns for metrics
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### Mean Average Precision (MAP)")
+            map_data = {
+                'K value': k_values,
+                'MAP': [results["overall"][f"map@{k}"] for k in k_values]
+            }
+            map_df = pd.DataFrame(map_data)
+            st.dataframe(map_df, hide_index=True, use_container_width=True)
+            
+            # Create MAP chart
+            fig, ax = plt.subplots(figsize=(8, 4))
+            ax.bar([f'MAP@{k}' for k in k_values], 
+                   [results["overall"][f"map@{k}"] for k in k_values],
+                   color='#6c63ff')
+            ax.set_ylim(0, 1)
+            ax.set_ylabel('Score')
+            ax.set_title('Mean Average Precision (MAP)')
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            
+            # Set the figure background to be transparent
+            fig.patch.set_alpha(0)
+            ax.set_facecolor('none')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
+            ax.yaxis.label.set_color('white')
+            ax.xaxis.label.set_color('white')
+            ax.title.set_color('white')
+            
+            st.pyplot(fig)
+        
+        with col2:
+            st.markdown("#### Mean Recall")
+            recall_data = {
+                'K value': k_values,
+                'Mean Recall': [results["overall"][f"mean_recall@{k}"] for k in k_values]
+            }
+            recall_df = pd.DataFrame(recall_data)
+            st.dataframe(recall_df, hide_index=True, use_container_width=True)
+            
+            # Create Mean Recall chart
+            fig, ax = plt.subplots(figsize=(8, 4))
+            ax.bar([f'Recall@{k}' for k in k_values], 
+                   [results["overall"][f"mean_recall@{k}"] for k in k_values],
+                   color='#30124e')
+            ax.set_ylim(0, 1)
+            ax.set_ylabel('Score')
+            ax.set_title('Mean Recall')
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            
+            # Set the figure background to be transparent
+            fig.patch.set_alpha(0)
+            ax.set_facecolor('none')
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
+            ax.yaxis.label.set_color('white')
+            ax.xaxis.label.set_color('white')
+            ax.title.set_color('white')
+            
+            st.pyplot(fig)
+        
+        # Show precision metrics
+        st.markdown("#### Mean Precision")
+        precision_data = {
+            'K value': k_values,
+            'Mean Precision': [results["overall"][f"mean_precision@{k}"] for k in k_values]
+        }
+        precision_df = pd.DataFrame(precision_data)
+        st.dataframe(precision_df, hide_index=True, use_container_width=True)
+        
+        # Create Mean Precision chart
+        fig, ax = plt.subplots(figsize=(10, 4))
+        ax.bar([f'Precision@{k}' for k in k_values], 
+               [results["overall"][f"mean_precision@{k}"] for k in k_values],
+               color='#4c71b6')
+        ax.set_ylim(0, 1)
+        ax.set_ylabel('Score')
+        ax.set_title('Mean Precision')
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        
+        # Set the figure background to be transparent
+        fig.patch.set_alpha(0)
+        ax.set_facecolor('none')
+        ax.tick_params(axis='x', colors='white')
+        ax.tick_params(axis='y', colors='white')
+        ax.yaxis.label.set_color('white')
+        ax.xaxis.label.set_color('white')
+        ax.title.set_color('white')
+        
+        st.pyplot(fig)
+        
+        # Detailed evaluation for specific k
+        st.markdown("### Per-Query Evaluation")
+        
+        selected_k = st.selectbox("Select k for detailed query evaluation:", options=k_values)
+        detailed_results = evaluator.detailed_evaluation(k=selected_k) if hasattr(evaluator, 'detailed_evaluation') else None
+        
+        if detailed_results:
+            for i, result in enumerate(detailed_results):
+                with st.expander(f"Query {i+1}: {result['query'][:100]}..."):
+                    st.markdown(f"""
+                    * **Recall@{selected_k}**: {result['recall@' + str(selected_k)]:.4f}
+                    * **Precision@{selected_k}**: {result['precision@' + str(selected_k)]:.4f}
+                    * **AP@{selected_k}**: {result['ap@' + str(selected_k)]:.4f}
                     
-                    # Create Mean Recall chart
-                    fig, ax = plt.subplots(figsize=(8, 4))
-                    ax.bar([f'Recall@{k}' for k in k_values], 
-                           [results["overall"][f"mean_recall@{k}"] for k in k_values],
-                           color='#30124e')
-                    ax.set_ylim(0, 1)
-                    ax.set_ylabel('Score')
-                    ax.set_title('Mean Recall')
-                    ax.spines['top'].set_visible(False)
-                    ax.spines['right'].set_visible(False)
+                    **Recommendations:**
+                    """)
                     
-                    # Set the figure background to be transparent
-                    fig.patch.set_alpha(0)
-                    ax.set_facecolor('none')
-                    ax.tick_params(axis='x', colors='white')
-                    ax.tick_params(axis='y', colors='white')
-                    ax.yaxis.label.set_color('white')
-                    ax.xaxis.label.set_color('white')
-                    ax.title.set_color('white')
+                    for j, rec in enumerate(result["recommendations"], 1):
+                        st.markdown(f"{j}. [{rec['title']}]({rec['url']})")
                     
-                    st.pyplot(fig)
-                
-                # Show precision metrics
-                st.markdown("#### Mean Precision")
-                precision_data = {
-                    'K value': k_values,
-                    'Mean Precision': [results["overall"][f"mean_precision@{k}"] for k in k_values]
-                }
-                precision_df = pd.DataFrame(precision_data)
-                st.dataframe(precision_df, hide_index=True, use_container_width=True)
-                
-                # Create Mean Precision chart
-                fig, ax = plt.subplots(figsize=(10, 4))
-                ax.bar([f'Precision@{k}' for k in k_values], 
-                       [results["overall"][f"mean_precision@{k}"] for k in k_values],
-                       color='#4c71b6')
-                ax.set_ylim(0, 1)
-                ax.set_ylabel('Score')
-                ax.set_title('Mean Precision')
-                ax.spines['top'].set_visible(False)
-                ax.spines['right'].set_visible(False)
-                
-                # Set the figure background to be transparent
-                fig.patch.set_alpha(0)
-                ax.set_facecolor('none')
-                ax.tick_params(axis='x', colors='white')
-                ax.tick_params(axis='y', colors='white')
-                ax.yaxis.label.set_color('white')
-                ax.xaxis.label.set_color('white')
-                ax.title.set_color('white')
-                
-                st.pyplot(fig)
-                
-                # Detailed evaluation for specific k
-                st.markdown("### Per-Query Evaluation")
-                
-                selected_k = st.selectbox("Select k for detailed query evaluation:", options=k_values)
-                detailed_results = evaluator.detailed_evaluation(k=selected_k) if hasattr(evaluator, 'detailed_evaluation') else None
-                
-                if detailed_results:
-                    for i, result in enumerate(detailed_results):
-                        with st.expander(f"Query {i+1}: {result['query'][:100]}..."):
-                            st.markdown(f"""
-                            * **Recall@{selected_k}**: {result['recall@' + str(selected_k)]:.4f}
-                            * **Precision@{selected_k}**: {result['precision@' + str(selected_k)]:.4f}
-                            * **AP@{selected_k}**: {result['ap@' + str(selected_k)]:.4f}
-                            
-                            **Recommendations:**
-                            """)
-                            
-                            for j, rec in enumerate(result["recommendations"], 1):
-                                st.markdown(f"{j}. [{rec['title']}]({rec['url']})")
-                            
-                            st.markdown("**Relevant Items in Test Set:**")
-                            for j, item in enumerate(result["relevant_items"], 1):
-                                st.markdown(f"{j}. {item}")
-                else:
-                    # Extract per-query results from the results dictionary
-                    if "per_query" in results:
-                        for i, (query, query_result) in enumerate(results["per_query"].items(), 1):
-                            query_short = query[:100] + "..." if len(query) > 100 else query
-                            with st.expander(f"Query {i}: {query_short}"):
-                                st.markdown(f"""
-                                * **Recall@{selected_k}**: {query_result['metrics'].get(f'recall@{selected_k}', 0):.4f}
-                                * **Precision@{selected_k}**: {query_result['metrics'].get(f'precision@{selected_k}', 0):.4f}
-                                * **AP@{selected_k}**: {query_result['metrics'].get(f'ap@{selected_k}', 0):.4f}
-                                
-                                **Recommendations:**
-                                """)
-                                
-                                for j, title in enumerate(query_result["recommended_titles"][:selected_k], 1):
-                                    # Format with URL if available
-                                    if isinstance(query_result["recommendations"][j-1], dict) and "url" in query_result["recommendations"][j-1]:
-                                        url = query_result["recommendations"][j-1]["url"]
-                                        st.markdown(f"{j}. [{title}]({url})")
-                                    else:
-                                        st.markdown(f"{j}. {title}")
-                                
-                                st.markdown("**Relevant Items in Test Set:**")
-                                for j, item in enumerate(query_result["relevant_items"], 1):
-                                    st.markdown(f"{j}. {item}")
+                    st.markdown("**Relevant Items in Test Set:**")
+                    for j, item in enumerate(result["relevant_items"], 1):
+                        st.markdown(f"{j}. {item}")
+        else:
+            # Extract per-query results from the results dictionary
+            if "per_query" in results:
+                for i, (query, query_result) in enumerate(results["per_query"].items(), 1):
+                    query_short = query[:100] + "..." if len(query) > 100 else query
+                    with st.expander(f"Query {i}: {query_short}"):
+                        st.markdown(f"""
+                        * **Recall@{selected_k}**: {query_result['metrics'].get(f'recall@{selected_k}', 0):.4f}
+                        * **Precision@{selected_k}**: {query_result['metrics'].get(f'precision@{selected_k}', 0):.4f}
+                        * **AP@{selected_k}**: {query_result['metrics'].get(f'ap@{selected_k}', 0):.4f}
+                        
+                        **Recommendations:**
+                        """)
+                        
+                        for j, title in enumerate(query_result["recommended_titles"][:selected_k], 1):
+                            # Format with URL if available
+                            if isinstance(query_result["recommendations"][j-1], dict) and "url" in query_result["recommendations"][j-1]:
+                                url = query_result["recommendations"][j-1]["url"]
+                                st.markdown(f"{j}. [{title}]({url})")
+                            else:
+                                st.markdown(f"{j}. {title}")
+                        
+                        st.markdown("**Relevant Items in Test Set:**")
+                        for j, item in enumerate(query_result["relevant_items"], 1):
+                            st.markdown(f"{j}. {item}")
 
 # Tab 3: About
 with tab3:
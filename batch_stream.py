@@ -0,0 +1,190 @@
+"""
+Full-duplex NDJSON streaming for bulk recommendation requests.
+
+The request body is read as newline-delimited JSON while results are being
+written back, one chunk per micro-batch, in input order. Three tasks are
+connected by bounded queues:
+
+    request body -> reader -> lines -> batcher -> chunks -> sender -> client
+
+A batch is processed when it is full, or when no new line has arrived for
+`flush_interval` seconds (so a slow producer still gets timely results).
+The queues bound the memory held per stream. When the client reads slowly,
+sending blocks, the queues fill up, and the reader stops pulling the request
+body, which pushes back on the upload through the server's flow control.
+
+Starlette's StreamingResponse is not used because, on ASGI servers before
+spec 2.4, it listens for disconnects by consuming `receive`, which would
+swallow request body chunks.
+"""
+
+import json
+import asyncio
+import logging
+from typing import Callable, List, Dict, Any
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class NDJSONBatchStream(Response):
+    media_type = "application/x-ndjson"
+
+    def __init__(self, process_batch: Callable[[List[Dict[str, Any]]], bytes],
+                 batch_size: int = 32, flush_interval: float = 0.05,
+                 max_pending_batches: int = 2, max_line_bytes: int = 1024 * 1024,
+                 headers: Dict[str, str] = None, on_complete: Callable[[int], None] = None):
+        """
+        Initialize the stream.
+
+        Args:
+            process_batch: Blocking function turning parsed lines into the NDJSON
+                           output for the batch; run in the threadpool. Lines that
+                           failed to parse are passed as {"error": message}. If it
+                           raises, each line of the batch gets an
+                           {"index": ..., "id": ..., "error": ...} line instead
+                           (index is the line's position in the input) and the
+                           stream goes on.
+            batch_size: Maximum lines per micro-batch
+            flush_interval: Seconds to wait for more lines before processing a
+                            partial batch
+            max_pending_batches: Processed batches buffered for a slow client
+            max_line_bytes: Longest accepted input line
+            headers: Extra response headers
+            on_complete: Called with the number of processed lines when the stream ends
+        """
+        self.status_code = 200
+        self.background = None
+        self.init_headers(headers)
+        self.process_batch = process_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending_batches = max_pending_batches
+        self.max_line_bytes = max_line_bytes
+        self.on_complete = on_complete
+
+    def _parse_line(self, line: bytes) -> Dict[str, Any]:
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            return {"error": f"Invalid JSON: {e}"}
+        if not isinstance(item, dict):
+            return {"error": "Each line must be a JSON object"}
+        return item
+
+    async def _read_lines(self, receive: Receive, lines: asyncio.Queue, disconnected: asyncio.Event) -> None:
+        """Split the request body into parsed lines, then wait for a disconnect."""
+        buffer = b""
+        skipping = False  # Discarding the rest of an oversized line
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                return
+            buffer += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            *complete, buffer = buffer.split(b"\n")
+            if not more_body:
+                complete.append(buffer)
+                buffer = b""
+
+            for line in complete:
+                if skipping:
+                    skipping = False
+                elif line.strip():
+                    await lines.put(self._parse_line(line))
+
+            if len(buffer) > self.max_line_bytes:
+                # Drop the oversized line; the error takes its place in the output
+                if not skipping:
+                    await lines.put({"error": f"Line longer than {self.max_line_bytes} bytes"})
+                skipping = True
+                buffer = b""
+
+        await lines.put(_END)
+
+        # Keep listening so a client that goes away stops the processing
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                return
+
+    async def _process(self, batch: List[Dict[str, Any]], first_index: int) -> bytes:
+        """Process a batch in the threadpool, turning a failure into one error line per line of the batch."""
+        try:
+            return await run_in_threadpool(self.process_batch, batch)
+        except Exception as e:
+            logger.error(f"Error processing lines {first_index}-{first_index + len(batch) - 1} of the stream: {e}")
+            lines = [
+                json.dumps({"index": first_index + offset, "id": item.get("id"), "error": f"Batch failed: {e}"})
+                for offset, item in enumerate(batch)
+            ]
+            return ("\n".join(lines) + "\n").encode("utf-8")
+
+    async def _batch_lines(self, lines: asyncio.Queue, chunks: asyncio.Queue) -> None:
+        """Group lines into micro-batches and process them in order."""
+        processed = 0
+        finished = False
+        try:
+            while not finished:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        timeout = self.flush_interval if batch else None
+                        item = await asyncio.wait_for(lines.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+
+                if batch:
+                    await chunks.put(await self._process(batch, processed))
+                    processed += len(batch)
+        except Exception as e:
+            logger.error(f"Error processing recommendation stream: {e}")
+
+        # End the response, even if a batch failed
+        await chunks.put(_END)
+        if self.on_complete is not None:
+            self.on_complete(processed)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        lines = asyncio.Queue(maxsize=2 * self.batch_size)
+        chunks = asyncio.Queue(maxsize=self.max_pending_batches)
+        disconnected = asyncio.Event()
+
+        reader = asyncio.create_task(self._read_lines(receive, lines, disconnected))
+        batcher = asyncio.create_task(self._batch_lines(lines, chunks))
+        disconnect_wait = asyncio.create_task(disconnected.wait())
+
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            while True:
+                next_chunk = asyncio.ensure_future(chunks.get())
+                done, _ = await asyncio.wait({next_chunk, disconnect_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if next_chunk not in done:
+                    next_chunk.cancel()
+                    logger.info("Client disconnected; stopping the recommendation stream")
+                    return
+
+                chunk = next_chunk.result()
+                if chunk is _END:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            for task in (reader, batcher, disconnect_wait):
+                task.cancel()
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the SHL Assessment Recommendation System.
+
+Run the full suite from the repository root with:
+
+    python -m bench.run_all
+"""
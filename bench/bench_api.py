@@ -0,0 +1,74 @@
+"""
+Concurrency benchmark for the FastAPI app, driven in-process through an
+ASGI transport so the numbers exclude network and server overhead.
+"""
+
+import os
+import time
+import asyncio
+from typing import List, Dict, Any
+
+import httpx
+
+from bench.common import summarize
+
+# Every benchmark request comes from one client; measure the API without per-client limits
+os.environ.setdefault("SHL_RATE_LIMIT", "0")
+os.environ.setdefault("SHL_MAX_CONCURRENT", "0")
+
+
+async def _run_level(app, queries: List[str], concurrency: int, total_requests: int,
+                     max_results: int) -> Dict[str, Any]:
+    """Send total_requests to /recommend with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def send(i: int):
+            nonlocal errors
+            payload = {"query": queries[i % len(queries)], "max_results": max_results}
+            async with semaphore:
+                start_time = time.perf_counter()
+                response = await client.post("/recommend", json=payload)
+                latencies.append(time.perf_counter() - start_time)
+                if response.status_code != 200:
+                    errors += 1
+        
+        start_time = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - start_time
+    
+    result = summarize(latencies)
+    result.update({
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": total_requests / elapsed if elapsed > 0 else 0.0
+    })
+    return result
+
+
+def measure_api_concurrency(queries: List[str], concurrency_levels: List[int] = [1, 4, 16],
+                            requests_per_level: int = 64, max_results: int = 10) -> Dict[str, Any]:
+    """
+    Measure /recommend latency percentiles and throughput at several concurrency levels.
+    
+    Args:
+        queries: Queries to cycle through
+        concurrency_levels: Numbers of concurrent in-flight requests to test
+        requests_per_level: Requests sent at each level
+        max_results: max_results sent with each request
+        
+    Returns:
+        Dictionary mapping "c<level>" to latency/throughput summary
+    """
+    from api import app
+    
+    # Warm up once so the first level doesn't pay for lazy initialization
+    asyncio.run(_run_level(app, queries, 1, 1, max_results))
+    
+    return {
+        f"c{level}": asyncio.run(_run_level(app, queries, level, requests_per_level, max_results))
+        for level in concurrency_levels
+    }
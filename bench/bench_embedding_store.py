@@ -0,0 +1,93 @@
+"""
+Index load benchmark: pickled LangChain docstore (index.pkl) against the
+memory-mapped embedding store (embeddings.bin).
+
+The catalog is replicated to several sizes (with unique titles and text per
+copy) and saved in both formats; each load reads index.faiss plus the
+document store, as the engine does at start-up.
+"""
+
+import os
+import uuid
+import pickle
+import tempfile
+import numpy as np
+from typing import List, Dict, Any
+
+import faiss
+from langchain.schema import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from bench.common import summarize, time_call
+from embedding_store import STORE_FILE, EmbeddingStore, write_embedding_store
+
+
+def _replicate(embeddings: np.ndarray, metadatas: List[Dict[str, Any]], texts: List[str], copies: int):
+    """Repeat the catalog, making the title and text of every copy unique."""
+    replicated_metadatas = []
+    replicated_texts = []
+    for copy in range(copies):
+        for metadata, text in zip(metadatas, texts):
+            replicated_metadatas.append(dict(metadata, title=f"{metadata['title']} #{copy}",
+                                             doc_index=len(replicated_metadatas)))
+            replicated_texts.append(f"{text} #{copy}")
+    return np.tile(np.asarray(embeddings, dtype=np.float32), (copies, 1)), replicated_metadatas, replicated_texts
+
+
+def _load_pickle(index_dir: str) -> None:
+    faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    with open(os.path.join(index_dir, "index.pkl"), 'rb') as f:
+        pickle.load(f)
+
+
+def _load_store(index_dir: str) -> None:
+    faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    EmbeddingStore(os.path.join(index_dir, STORE_FILE))
+
+
+def measure_index_load(embeddings: np.ndarray, metadatas: List[Dict[str, Any]], texts: List[str],
+                       copies: List[int] = (1, 10, 100), repeats: int = 5) -> Dict[str, Any]:
+    """
+    Time loading a saved index with each document store format.
+
+    Args:
+        embeddings: Catalog embeddings (N x d)
+        metadatas: Catalog document metadata
+        texts: Catalog document text
+        copies: Catalog sizes to measure, as multiples of the catalog
+        repeats: Timed loads per measurement
+
+    Returns:
+        Per-size load timings and file sizes
+    """
+    results = {}
+    for count in copies:
+        size_embeddings, size_metadatas, size_texts = _replicate(embeddings, metadatas, texts, count)
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = faiss.IndexFlatL2(size_embeddings.shape[1])
+            index.add(size_embeddings)
+            faiss.write_index(index, os.path.join(index_dir, "index.faiss"))
+
+            # Same layout as FAISS.save_local
+            ids = [str(uuid.uuid4()) for _ in size_texts]
+            docstore = InMemoryDocstore({
+                doc_id: Document(page_content=text, metadata=metadata)
+                for doc_id, text, metadata in zip(ids, size_texts, size_metadatas)
+            })
+            with open(os.path.join(index_dir, "index.pkl"), 'wb') as f:
+                pickle.dump((docstore, dict(enumerate(ids))), f)
+
+            store_path = os.path.join(index_dir, STORE_FILE)
+            write_embedding_store(store_path, size_embeddings, size_metadatas, size_texts)
+            float16_path = os.path.join(index_dir, "embeddings_f16.bin")
+            write_embedding_store(float16_path, size_embeddings, size_metadatas, size_texts, dtype="float16")
+
+            results[str(len(size_texts))] = {
+                "pickle": summarize(time_call(lambda: _load_pickle(index_dir), repeats)),
+                "store": summarize(time_call(lambda: _load_store(index_dir), repeats)),
+                "pickle_bytes": os.path.getsize(os.path.join(index_dir, "index.pkl")),
+                "store_bytes": os.path.getsize(store_path),
+                "store_float16_bytes": os.path.getsize(float16_path)
+            }
+
+    return results
@@ -0,0 +1,156 @@
+"""
+Pipeline benchmarks: cold start, index build time and per-stage latency
+of a recommendation, as recorded by the engine's stage timers (query
+preprocessing, encoding, dense and lexical search, fusion, filter
+extraction, filtering) plus response serialization.
+"""
+
+import sys
+import json
+import time
+import subprocess
+from typing import List, Dict, Any, Sequence
+
+from bench.common import summarize, time_call, peak_rss_mb
+
+
+def measure_cold_start() -> Dict[str, Any]:
+    """
+    Measure engine start-up in a fresh interpreter.
+    
+    Runs in a subprocess so that imports (torch, transformers), model
+    loading and index initialization are all paid from scratch.
+    
+    Returns:
+        Dictionary with import, initialization and first-query timings
+    """
+    output = subprocess.check_output(
+        [sys.executable, "-m", "bench.bench_pipeline", "--cold-start-child"],
+        text=True
+    )
+    # The child prints its result as the last line; anything before is log noise
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _cold_start_child() -> None:
+    """Entry point for the cold start subprocess."""
+    start_time = time.perf_counter()
+    from recommend_engine import SHLRecommendationEngine
+    import_s = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    engine = SHLRecommendationEngine()
+    init_s = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    engine.recommend_with_auto_filter("Java developer", top_k=10)
+    first_query_s = time.perf_counter() - start_time
+    
+    print(json.dumps({
+        "import_s": import_s,
+        "init_s": init_s,
+        "first_query_s": first_query_s,
+        "total_s": import_s + init_s + first_query_s,
+        "peak_rss_mb": peak_rss_mb()
+    }))
+
+
+def measure_index_build(engine, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Measure building the vector index from scratch, bypassing the embedding cache.
+    
+    Args:
+        engine: Initialized SHLRecommendationEngine
+        repeats: Number of builds to time
+        
+    Returns:
+        Dictionary of document encoding and FAISS construction timings
+    """
+    from langchain_community.vectorstores import FAISS
+    
+    texts, metadatas = engine._build_documents()
+    
+    encode_samples = []
+    build_samples = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        embeddings = engine.embedding_model.embed_documents(texts)
+        encode_samples.append(time.perf_counter() - start_time)
+        
+        start_time = time.perf_counter()
+        FAISS.from_embeddings(list(zip(texts, embeddings)), engine.embedding_model, metadatas=metadatas)
+        build_samples.append(time.perf_counter() - start_time)
+    
+    return {
+        "documents": len(texts),
+        "encode_documents": summarize(encode_samples),
+        "faiss_build": summarize(build_samples)
+    }
+
+
+def measure_stages(engine, queries: List[str], top_k: int = 10, repeats: int = 5,
+                   modes: Sequence[str] = ("dense", "hybrid")) -> Dict[str, Any]:
+    """
+    Measure each stage of recommend_with_auto_filter plus response serialization.
+    
+    Runs the engine's own pipeline and reads the time it records per stage in
+    shl_stage_duration_seconds (see metrics.time_stage), so the stages reported
+    are exactly the ones a request goes through. A request's time in a stage is
+    the growth of that stage's histogram sum across the request.
+    
+    Args:
+        engine: Initialized SHLRecommendationEngine
+        queries: Queries to run
+        top_k: Number of results requested
+        repeats: Number of passes over the queries
+        modes: Retrieval modes to measure
+        
+    Returns:
+        Dictionary mapping retrieval mode to a dictionary of stage name to latency summary
+    """
+    from metrics import STAGE_SECONDS
+    from serialization import fragment_object, recommendation_fragments
+    
+    retrieval_mode = engine.retrieval_mode
+    results = {}
+    try:
+        for mode in modes:
+            if mode == "hybrid" and engine.lexical_index is None:
+                continue
+            engine.retrieval_mode = mode
+            samples = {}
+            
+            for _ in range(repeats):
+                for query in queries:
+                    before = STAGE_SECONDS.snapshots()
+                    end_to_end_start = time.perf_counter()
+                    
+                    recommendations = engine.recommend_with_auto_filter(query, top_k=top_k)
+                    
+                    # Response body as /recommend builds it
+                    start_time = time.perf_counter()
+                    fragment_object(
+                        "recommendations",
+                        recommendation_fragments(recommendations, engine.catalog_index),
+                        {"query": query, "source": "text"}
+                    )
+                    samples.setdefault("serialization", []).append(time.perf_counter() - start_time)
+                    samples.setdefault("end_to_end", []).append(time.perf_counter() - end_to_end_start)
+                    
+                    for (stage,), snapshot in STAGE_SECONDS.snapshots().items():
+                        previous = before.get((stage,), {"count": 0, "sum": 0.0})
+                        if snapshot["count"] > previous["count"]:
+                            samples.setdefault(stage, []).append(snapshot["sum"] - previous["sum"])
+            
+            results[mode] = {stage: summarize(stage_samples) for stage, stage_samples in samples.items()}
+    finally:
+        engine.retrieval_mode = retrieval_mode
+    
+    return results
+
+
+if __name__ == "__main__":
+    if "--cold-start-child" in sys.argv:
+        _cold_start_child()
+    else:
+        print(json.dumps(measure_cold_start(), indent=4))
@@ -0,0 +1,185 @@
+"""
+Start-up and memory benchmark: `uvicorn api:app --workers N` (every worker
+loads the engine) against `serve.py` (the engine is loaded and warmed up once,
+then workers are forked).
+
+For each mode the server is started on a free port and timed until all
+workers report "Application startup complete". The first requests are then
+timed (including lazy initialization a worker still has to do), followed by
+warm requests, and the RSS and PSS (proportional set size, which splits
+shared pages between the processes sharing them) of the master and every
+worker are read from /proc.
+
+Usage:
+    python -m bench.bench_preload [--workers 4] [--requests 40]
+"""
+
+import os
+import sys
+import time
+import socket
+import signal
+import logging
+import argparse
+import threading
+import subprocess
+from typing import List, Dict, Any
+
+import httpx
+
+from bench.common import summarize, environment_info, write_results, RESULTS_DIR
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+READY_LINE = "Application startup complete"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _memory_mb(pid: int) -> Dict[str, float]:
+    """RSS and PSS of a process in MB."""
+    memory = {"rss_mb": 0.0, "pss_mb": 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    memory["rss_mb"] = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    memory["pss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return memory
+
+
+def _workers(pid: int) -> List[int]:
+    """Worker processes of a server: its children, except multiprocessing's resource tracker."""
+    workers = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # The parent pid follows the (parenthesized) command name
+                if int(f.read().rsplit(")", 1)[1].split()[1]) != pid:
+                    continue
+            with open(f"/proc/{entry}/cmdline", 'rb') as f:
+                if b"resource_tracker" not in f.read():
+                    workers.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return workers
+
+
+def measure_server(command: List[str], workers: int, port: int, requests: int,
+                   timeout: float = 600) -> Dict[str, Any]:
+    """
+    Start a server command and measure its start-up, first and warm requests, and memory.
+
+    Returns:
+        Dictionary of start-up seconds, request latency summaries and per-process memory
+    """
+    start_time = time.perf_counter()
+    # All benchmark requests come from one client, so per-client rate limits are off
+    env = dict(os.environ, SHL_RATE_LIMIT="0", SHL_MAX_CONCURRENT="0")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+
+    ready = threading.Event()
+    ready_count = 0
+
+    def read_output():
+        nonlocal ready_count
+        for line in process.stdout:
+            if READY_LINE in line:
+                ready_count += 1
+                if ready_count >= workers:
+                    ready.set()
+
+    threading.Thread(target=read_output, daemon=True).start()
+    try:
+        if not ready.wait(timeout):
+            raise RuntimeError(f"{' '.join(command)} did not start {workers} workers within {timeout}s")
+        startup_s = time.perf_counter() - start_time
+
+        url = f"http://127.0.0.1:{port}/recommend"
+        payload = {"query": "Java developer who can collaborate with business teams", "max_results": 10}
+
+        def timed_request() -> float:
+            request_start = time.perf_counter()
+            # A new connection per request spreads requests across workers
+            httpx.post(url, json=payload, timeout=120).raise_for_status()
+            return time.perf_counter() - request_start
+
+        # The first requests can land on workers that still initialize lazily
+        first = [timed_request() for _ in range(workers * 2)]
+        warm = [timed_request() for _ in range(requests)]
+
+        worker_memory = [_memory_mb(pid) for pid in _workers(process.pid)]
+        master_memory = _memory_mb(process.pid)
+        return {
+            "startup_s": startup_s,
+            "first_requests": summarize(first),
+            "warm_requests": summarize(warm),
+            "master": master_memory,
+            "workers": worker_memory,
+            "total_pss_mb": master_memory["pss_mb"] + sum(memory["pss_mb"] for memory in worker_memory),
+            "mean_worker_rss_mb": sum(memory["rss_mb"] for memory in worker_memory) / max(1, len(worker_memory))
+        }
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def measure_preload(workers: int = 4, requests: int = 40) -> Dict[str, Any]:
+    """Compare uvicorn's own workers with serve.py's preloaded, forked workers."""
+    results = {}
+
+    port = _free_port()
+    logger.info(f"Measuring uvicorn with {workers} workers...")
+    results["uvicorn_workers"] = measure_server(
+        # Workers importing torch can miss uvicorn's default 5 s health check and get restarted
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--workers", str(workers),
+         "--timeout-worker-healthcheck", "120"],
+        workers, port, requests
+    )
+
+    port = _free_port()
+    logger.info(f"Measuring serve.py with {workers} workers...")
+    results["preload_fork"] = measure_server(
+        [sys.executable, "serve.py", "--port", str(port), "--workers", str(workers)],
+        workers, port, requests
+    )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare start-up time and memory of preloaded and independent workers")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="Warm requests per server")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/preload_<commit>.json)")
+    args = parser.parse_args()
+
+    results = {"environment": environment_info()}
+    results["preload"] = measure_preload(args.workers, args.requests)
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"preload_{results['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    write_results(results, output_path)
+
+    for mode, result in results["preload"].items():
+        logger.info(f"{mode}: start-up {result['startup_s']:.1f}s, first request p95 "
+                    f"{result['first_requests']['p95_ms']:.0f} ms, mean worker RSS "
+                    f"{result['mean_worker_rss_mb']:.0f} MB, total PSS {result['total_pss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
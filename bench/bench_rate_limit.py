@@ -0,0 +1,111 @@
+"""
+Rate limiting benchmark: latency of an interactive client while a batch
+client saturates /recommend, without and with per-client limits.
+
+Both clients are driven in-process through an ASGI transport and identified
+by API key. The batch client keeps `batch_concurrency` requests in flight
+and backs off for the Retry-After time when it gets a 429; the interactive
+client sends one request at a time at a fixed interval.
+"""
+
+import os
+import time
+import asyncio
+from typing import List, Dict, Any
+
+import httpx
+
+from bench.common import summarize
+
+# The API's own limits would apply to both runs; this benchmark adds its own
+os.environ.setdefault("SHL_RATE_LIMIT", "0")
+os.environ.setdefault("SHL_MAX_CONCURRENT", "0")
+
+BATCH_KEY = "bench-batch"
+INTERACTIVE_KEY = "bench-interactive"
+
+
+async def _run_clients(app, queries: List[str], duration_s: float, batch_concurrency: int,
+                       interactive_interval_s: float, max_results: int) -> Dict[str, Any]:
+    """Run the batch and interactive clients against an app for duration_s seconds."""
+    interactive_latencies = []
+    batch_latencies = []
+    rejected = {BATCH_KEY: 0, INTERACTIVE_KEY: 0}
+    deadline = time.perf_counter() + duration_s
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def request(key: str, i: int) -> httpx.Response:
+            payload = {"query": queries[i % len(queries)], "max_results": max_results}
+            return await client.post("/recommend", json=payload, headers={"X-API-Key": key})
+
+        async def batch_worker(worker: int):
+            i = worker
+            while time.perf_counter() < deadline:
+                start_time = time.perf_counter()
+                response = await request(BATCH_KEY, i)
+                i += batch_concurrency
+                if response.status_code == 429:
+                    rejected[BATCH_KEY] += 1
+                    await asyncio.sleep(min(response.json().get("retry_after", 1.0), 1.0))
+                else:
+                    batch_latencies.append(time.perf_counter() - start_time)
+
+        async def interactive_client():
+            i = 0
+            while time.perf_counter() < deadline:
+                start_time = time.perf_counter()
+                response = await request(INTERACTIVE_KEY, i)
+                i += 1
+                if response.status_code == 429:
+                    rejected[INTERACTIVE_KEY] += 1
+                else:
+                    interactive_latencies.append(time.perf_counter() - start_time)
+                await asyncio.sleep(interactive_interval_s)
+
+        await asyncio.gather(interactive_client(), *(batch_worker(w) for w in range(batch_concurrency)))
+
+    return {
+        "interactive": summarize(interactive_latencies),
+        "batch": summarize(batch_latencies),
+        "batch_throughput_rps": len(batch_latencies) / duration_s,
+        "rejected": rejected
+    }
+
+
+def measure_rate_limiting(queries: List[str], duration_s: float = 10, batch_concurrency: int = 16,
+                          interactive_interval_s: float = 0.1, batch_rate: float = 5,
+                          batch_concurrency_quota: int = 2, max_results: int = 10) -> Dict[str, Any]:
+    """
+    Compare interactive latency under batch load without and with rate limiting.
+
+    Args:
+        queries: Queries to cycle through
+        duration_s: Length of each run
+        batch_concurrency: Requests the batch client keeps in flight
+        interactive_interval_s: Pause between interactive requests
+        batch_rate: Requests per second allowed to the batch client when limiting
+        batch_concurrency_quota: Requests in flight allowed to the batch client when limiting
+        max_results: max_results sent with each request
+
+    Returns:
+        Dictionary with "unlimited" and "limited" runs: interactive and batch latency
+        summaries, batch throughput and rejected request counts
+    """
+    from api import app
+    from rate_limiter import RateLimitMiddleware
+
+    limited_app = RateLimitMiddleware(app, rate=0, concurrency=0, quotas={
+        BATCH_KEY: {"rate": batch_rate, "burst": batch_rate, "concurrency": batch_concurrency_quota},
+        INTERACTIVE_KEY: {"rate": 10, "burst": 20, "concurrency": 4}
+    })
+
+    # Warm up once so the first run doesn't pay for lazy initialization
+    asyncio.run(_run_clients(app, queries, 1, 1, interactive_interval_s, max_results))
+
+    return {
+        "unlimited": asyncio.run(_run_clients(app, queries, duration_s, batch_concurrency,
+                                              interactive_interval_s, max_results)),
+        "limited": asyncio.run(_run_clients(limited_app, queries, duration_s, batch_concurrency,
+                                            interactive_interval_s, max_results))
+    }
@@ -0,0 +1,213 @@
+"""
+Scaling load test: recommendation latency, throughput and memory across
+synthetic catalog sizes and concurrency levels.
+
+For each catalog size a synthetic catalog is generated (scraper.generate_synthetic_catalog)
+and served by a fresh engine in a subprocess, so start-up time and memory are
+measured per size. The engine is then driven with a Zipfian query workload
+(bench.workload) at each concurrency level. Catalogs, indexes and embeddings
+are kept in bench/results/scaling/ and reused by later runs.
+
+Usage:
+    python -m bench.bench_scaling [--sizes 1000 10000 50000] [--concurrency 1 8 32] [--requests 500]
+
+Results go to bench/results/scaling_<commit>.json, with latency, throughput
+and memory curves in a .png next to it.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+from bench.common import RESULTS_DIR, summarize, current_rss_mb, peak_rss_mb, environment_info, write_results
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCALING_DIR = os.path.join(RESULTS_DIR, "scaling")
+
+
+def _run_level(engine, queries: List[str], concurrency: int, top_k: int) -> Dict[str, Any]:
+    """Run every query with at most `concurrency` in flight and summarize latency."""
+    def run(query: str) -> float:
+        start_time = time.perf_counter()
+        engine.recommend_with_auto_filter(query, top_k=top_k)
+        return time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(run, queries))
+    elapsed = time.perf_counter() - start_time
+
+    result = summarize(latencies)
+    result.update({
+        "concurrency": concurrency,
+        "throughput_qps": len(queries) / elapsed if elapsed > 0 else 0.0
+    })
+    return result
+
+
+def _scaling_child(options: Dict[str, Any]) -> None:
+    """Entry point for the per-size subprocess; prints its result as the last line."""
+    from recommend_engine import SHLRecommendationEngine
+    from bench.workload import generate_workload, workload_stats
+
+    index_cached = os.path.exists(os.path.join(options["index_dir"], "manifest.json"))
+    rss_before_mb = current_rss_mb()
+    start_time = time.perf_counter()
+    engine = SHLRecommendationEngine(
+        data_path=options["catalog_path"],
+        faiss_index_path=options["index_dir"],
+        embeddings_path=os.path.join(SCALING_DIR, "embeddings.pkl"),
+        model_name=options["model_name"]
+    )
+    init_s = time.perf_counter() - start_time
+    rss_after_init_mb = current_rss_mb()
+
+    queries = generate_workload(
+        engine.assessments, options["requests"], distinct=options["distinct_queries"],
+        zipf_exponent=options["zipf_exponent"], seed=options["seed"]
+    )
+
+    # Warm up so the first level doesn't pay for lazy initialization
+    for query in queries[:10]:
+        engine.recommend_with_auto_filter(query, top_k=options["top_k"])
+
+    levels = {
+        f"c{concurrency}": _run_level(engine, queries, concurrency, options["top_k"])
+        for concurrency in options["concurrency"]
+    }
+
+    print(json.dumps({
+        "assessments": len(engine.assessments),
+        "index_cached": index_cached,
+        "init_s": init_s,
+        "rss_before_init_mb": rss_before_mb,
+        "rss_after_init_mb": rss_after_init_mb,
+        "rss_after_load_mb": current_rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "workload": workload_stats(queries),
+        "levels": levels
+    }))
+
+
+def measure_scaling(sizes: List[int] = (1000, 10000, 50000), concurrency_levels: List[int] = (1, 8, 32),
+                    requests: int = 500, distinct_queries: int = 1000, zipf_exponent: float = 1.1,
+                    top_k: int = 10, seed: int = 42,
+                    model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> Dict[str, Any]:
+    """
+    Measure latency, throughput and memory for each catalog size and concurrency level.
+
+    Args:
+        sizes: Synthetic catalog sizes
+        concurrency_levels: Numbers of concurrent in-flight requests
+        requests: Requests per concurrency level
+        distinct_queries: Distinct queries in the workload
+        zipf_exponent: Skew of query popularity
+        top_k: Recommendations per request
+        seed: Seed for the catalogs and the workload
+        model_name: Embedding model
+
+    Returns:
+        Dictionary mapping catalog size to its start-up, memory and per-level results
+    """
+    from scraper import generate_synthetic_catalog
+
+    os.makedirs(SCALING_DIR, exist_ok=True)
+    results = {}
+    for size in sizes:
+        catalog_path = os.path.join(SCALING_DIR, f"catalog_{size}_{seed}.json")
+        if not os.path.exists(catalog_path):
+            generate_synthetic_catalog(size, catalog_path, seed=seed)
+
+        options = {
+            "catalog_path": catalog_path,
+            "index_dir": os.path.join(SCALING_DIR, f"index_{size}_{seed}"),
+            "model_name": model_name,
+            "requests": requests,
+            "distinct_queries": distinct_queries,
+            "zipf_exponent": zipf_exponent,
+            "concurrency": list(concurrency_levels),
+            "top_k": top_k,
+            "seed": seed
+        }
+        logger.info(f"Measuring a catalog of {size} assessments...")
+        output = subprocess.check_output(
+            [sys.executable, "-m", "bench.bench_scaling", "--child", json.dumps(options)],
+            text=True
+        )
+        # The child prints its result as the last line; anything before is log noise
+        results[str(size)] = json.loads(output.strip().splitlines()[-1])
+
+    return results
+
+
+def plot_scaling(results: Dict[str, Any], output_path: str) -> None:
+    """Plot p95 latency, throughput and memory against catalog size."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    sizes = sorted(results, key=int)
+    x = [int(size) for size in sizes]
+    levels = list(results[sizes[0]]["levels"]) if sizes else []
+
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    for level in levels:
+        axes[0].plot(x, [results[size]["levels"][level]["p95_ms"] for size in sizes], marker='o', label=level)
+        axes[1].plot(x, [results[size]["levels"][level]["throughput_qps"] for size in sizes], marker='o', label=level)
+    axes[2].plot(x, [results[size]["rss_after_init_mb"] for size in sizes], marker='o', label="after start-up")
+    axes[2].plot(x, [results[size]["peak_rss_mb"] for size in sizes], marker='o', label="peak")
+
+    for ax, title, label in zip(axes, ["p95 latency", "Throughput", "Memory"],
+                                ["p95 latency (ms)", "Requests/s", "RSS (MB)"]):
+        ax.set_xscale("log")
+        ax.set_title(title)
+        ax.set_xlabel("Catalog size (assessments)")
+        ax.set_ylabel(label)
+        ax.grid(True, linestyle='--', alpha=0.7)
+        ax.legend()
+
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the engine across catalog sizes and concurrency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument("--distinct-queries", type=int, default=1000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of query popularity")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/scaling_<commit>.json)")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _scaling_child(json.loads(args.child))
+        return
+
+    results = {"environment": environment_info()}
+    results["scaling"] = measure_scaling(
+        args.sizes, args.concurrency, args.requests, args.distinct_queries, args.zipf,
+        args.top_k, args.seed, args.model
+    )
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"scaling_{results['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    write_results(results, output_path)
+    plot_scaling(results["scaling"], os.path.splitext(output_path)[0] + ".png")
+    logger.info(f"Scaling results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
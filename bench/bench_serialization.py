@@ -0,0 +1,89 @@
+"""
+Serialization and compression benchmark for recommendation responses.
+
+Compares, per response size, building one Pydantic model per result and
+rendering it with the standard JSON encoder against joining the
+pre-serialized assessment fragments, and measures the time and size of
+gzip and Brotli compression of the resulting body.
+"""
+
+import gzip
+from typing import List, Dict, Any
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from bench.common import summarize, time_call
+from catalog_index import CatalogIndex
+from compression import BROTLI_AVAILABLE
+from serialization import fragment_response, recommendation_fragments
+
+
+def _pydantic_body(recommendations: List[Dict[str, Any]]) -> bytes:
+    """Serialize a /recommend response the way the API did before fragments."""
+    from api import AssessmentResponse, RecommendationResponse
+
+    response = RecommendationResponse(
+        recommendations=[
+            AssessmentResponse(
+                title=rec["title"],
+                url=rec["url"],
+                remote_testing_support=rec["remote_testing_support"],
+                adaptive_irt_support=rec["adaptive_irt_support"],
+                duration=rec["duration"],
+                test_type=rec["test_type"]
+            )
+            for rec in recommendations
+        ],
+        query="benchmark query",
+        source="text"
+    )
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def _fragment_body(recommendations: List[Dict[str, Any]], catalog_index: CatalogIndex) -> bytes:
+    """Serialize a /recommend response from pre-serialized fragments."""
+    return fragment_response(
+        "recommendations",
+        recommendation_fragments(recommendations, catalog_index),
+        {"query": "benchmark query", "source": "text"}
+    ).body
+
+
+def measure_serialization(assessments: List[Dict[str, Any]], sizes: List[int] = (1, 10, 100, 1000),
+                          repeats: int = 200) -> Dict[str, Any]:
+    """
+    Time response serialization and compression for several response sizes.
+
+    Args:
+        assessments: Catalog entries; results cycle through them
+        sizes: Numbers of results per response
+        repeats: Timed calls per measurement
+
+    Returns:
+        Per-size timings and body sizes
+    """
+    catalog_index = CatalogIndex(assessments)
+    results = {}
+
+    for size in sizes:
+        recommendations = [
+            dict(assessments[i % len(assessments)], similarity_score=0.5) for i in range(size)
+        ]
+        body = _fragment_body(recommendations, catalog_index)
+        result = {
+            "pydantic": summarize(time_call(lambda: _pydantic_body(recommendations), repeats)),
+            "fragments": summarize(time_call(lambda: _fragment_body(recommendations, catalog_index), repeats)),
+            "body_bytes": len(body),
+            "gzip": summarize(time_call(lambda: gzip.compress(body, compresslevel=6), repeats)),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=6))
+        }
+
+        if BROTLI_AVAILABLE:
+            import brotli
+            result["brotli"] = summarize(time_call(lambda: brotli.compress(body, quality=4), repeats))
+            result["brotli_bytes"] = len(brotli.compress(body, quality=4))
+
+        results[str(size)] = result
+
+    return results
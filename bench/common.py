@@ -0,0 +1,96 @@
+"""
+Shared helpers for the benchmark suite: timing, percentile summaries,
+memory measurement and machine-readable result files. The summary and
+peak-RSS helpers live in perf_stats.py, which the evaluator uses too.
+"""
+
+import os
+import json
+import time
+import platform
+import subprocess
+from typing import List, Dict, Any, Callable
+
+# Shared with the evaluator; re-exported for the benchmarks
+from perf_stats import summarize, peak_rss_mb
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def load_benchmark_queries(test_data_path: str = "data/test_data.json") -> List[str]:
+    """Load the evaluation queries plus a few short keyword queries."""
+    queries = []
+    if os.path.exists(test_data_path):
+        with open(test_data_path, 'r', encoding='utf-8') as f:
+            queries.extend(json.load(f).get("queries", []))
+    
+    queries.extend([
+        "Java 8",
+        "SQL Server developer, remote testing, under 30 minutes",
+        "Personality questionnaire for a COO",
+        "Numerical reasoning test for bank assistants"
+    ])
+    return queries
+
+
+def time_call(func: Callable, repeats: int) -> List[float]:
+    """Call func repeatedly and return the duration of each call in seconds."""
+    samples = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start_time)
+    return samples
+
+
+def current_rss_mb() -> float:
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def git_commit() -> str:
+    """Short hash of the checked-out commit, or 'unknown' outside git."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def environment_info() -> Dict[str, Any]:
+    """Describe the machine the benchmark ran on."""
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def write_results(results: Dict[str, Any], output_path: str = None) -> str:
+    """
+    Write benchmark results as JSON.
+    
+    Args:
+        results: Benchmark results (must contain "environment")
+        output_path: Destination file (defaults to bench/results/<commit>.json)
+        
+    Returns:
+        Path of the written file
+    """
+    if output_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(RESULTS_DIR, f"{results['environment']['commit']}.json")
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4)
+    return output_path
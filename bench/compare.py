@@ -0,0 +1,85 @@
+"""
+Compare two benchmark result files and flag latency regressions.
+
+Usage:
+    python -m bench.compare bench/results/<base>.json bench/results/<head>.json [--threshold 10]
+
+Exits with status 1 when any timing metric regresses by more than the
+threshold percentage.
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Any
+
+# Metrics where larger values are worse
+TIMING_SUFFIXES = ("_ms", "_s", "_mb")
+# Metrics where larger values are better
+THROUGHPUT_SUFFIXES = ("_rps", "_qps")
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names, keeping numeric leaves."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> bool:
+    """
+    Print a comparison table of the metrics present in both runs.
+    
+    Args:
+        base: Baseline results
+        head: Results to check
+        threshold: Allowed regression in percent
+        
+    Returns:
+        True if any metric regressed beyond the threshold
+    """
+    base_flat = flatten({k: v for k, v in base.items() if k != "environment"})
+    head_flat = flatten({k: v for k, v in head.items() if k != "environment"})
+    
+    print(f"base: {base['environment']['commit']}  head: {head['environment']['commit']}")
+    print(f"{'metric':<55} {'base':>12} {'head':>12} {'change':>9}")
+    
+    regressed = False
+    for name in sorted(set(base_flat) & set(head_flat)):
+        base_value, head_value = base_flat[name], head_flat[name]
+        change = (head_value - base_value) / base_value * 100 if base_value else 0.0
+        
+        marker = ""
+        if name.endswith(TIMING_SUFFIXES) and change > threshold:
+            marker = "  REGRESSION"
+        elif name.endswith(THROUGHPUT_SUFFIXES) and change < -threshold:
+            marker = "  REGRESSION"
+        regressed = regressed or bool(marker)
+        
+        print(f"{name:<55} {base_value:>12.2f} {head_value:>12.2f} {change:>+8.1f}%{marker}")
+    
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+    
+    with open(args.base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, 'r', encoding='utf-8') as f:
+        head = json.load(f)
+    
+    sys.exit(1 if compare(base, head, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
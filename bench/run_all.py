@@ -0,0 +1,73 @@
+"""
+Run the full benchmark suite and write machine-readable results.
+
+Usage:
+    python -m bench.run_all [--output PATH] [--concurrency 1 4 16] [--requests 64]
+
+Results go to bench/results/<commit>.json by default; compare two runs with
+bench.compare.
+"""
+
+import argparse
+import logging
+
+from bench.common import load_benchmark_queries, environment_info, peak_rss_mb, write_results
+from bench.bench_pipeline import measure_cold_start, measure_index_build, measure_stages
+from bench.bench_api import measure_api_concurrency
+from bench.bench_serialization import measure_serialization
+from bench.bench_embedding_store import measure_index_load
+from bench.bench_rate_limit import measure_rate_limiting
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation pipeline")
+    parser.add_argument("--output", default=None, help="Result file (default: bench/results/<commit>.json)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the queries for stage timings")
+    parser.add_argument("--skip-cold-start", action="store_true")
+    args = parser.parse_args()
+    
+    queries = load_benchmark_queries()
+    results = {"environment": environment_info()}
+    
+    if not args.skip_cold_start:
+        logger.info("Measuring cold start...")
+        results["cold_start"] = measure_cold_start()
+    
+    # Importing the API initializes the shared engine used by the remaining benchmarks
+    from api import recommendation_engine
+    
+    logger.info("Measuring index build...")
+    results["index_build"] = measure_index_build(recommendation_engine)
+    
+    logger.info("Measuring per-stage latency...")
+    results["stages"] = measure_stages(recommendation_engine, queries, repeats=args.repeats)
+    
+    logger.info("Measuring API latency under concurrency...")
+    results["api"] = measure_api_concurrency(queries, args.concurrency, args.requests)
+    
+    logger.info("Measuring interactive latency under batch load, without and with rate limits...")
+    results["rate_limit"] = measure_rate_limiting(queries)
+    
+    logger.info("Measuring response serialization and compression...")
+    results["serialization"] = measure_serialization(recommendation_engine.assessments)
+    
+    logger.info("Measuring index load (pickled docstore vs embedding store)...")
+    results["index_load"] = measure_index_load(
+        recommendation_engine.document_embeddings,
+        recommendation_engine.document_metadatas,
+        recommendation_engine.document_texts
+    )
+    
+    results["peak_rss_mb"] = peak_rss_mb()
+    
+    output_path = write_results(results, args.output)
+    logger.info(f"Benchmark results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Synthetic query workloads for load tests.
+
+Builds a pool of distinct queries from a catalog (keyword searches, title
+lookups, natural-language requests with duration/remote constraints and
+job-description-like paragraphs) and samples a request stream from it with
+Zipfian popularity, so a few queries repeat often and most are rare, as in
+production traffic.
+"""
+
+import random
+from collections import Counter
+import numpy as np
+from typing import List, Dict, Any
+
+from scraper import SYNTHETIC_ROLES, SYNTHETIC_LEVELS
+
+QUERY_TEMPLATES = [
+    "{skill}",
+    "{title}",
+    "{skill} {level}",
+    "{skill} developer, remote testing, under {minutes} minutes",
+    "Looking for a {test_type} assessment for {role} candidates",
+    "Need a {test_type} test for a {level} {role} that takes at most {minutes} minutes",
+    "We are hiring a {level} {role}. The role needs strong {skill} skills and good communication. "
+    "Candidates should complete the assessment within {minutes} minutes, ideally adaptive.",
+]
+
+
+def _query_pool(assessments: List[Dict[str, Any]], distinct: int, rng: random.Random) -> List[str]:
+    """Generate up to `distinct` distinct queries about catalog assessments."""
+    pool = []
+    seen = set()
+    attempts = 0
+    while len(pool) < distinct and attempts < distinct * 20:
+        attempts += 1
+        assessment = rng.choice(assessments)
+        title = assessment["title"]
+        query = rng.choice(QUERY_TEMPLATES).format(
+            skill=title.split(" (")[0].split(" - ")[0],
+            title=title,
+            level=rng.choice(SYNTHETIC_LEVELS).lower(),
+            minutes=rng.choice([15, 20, 30, 40, 45, 60, 90]),
+            test_type=assessment.get("test_type", "technical").lower(),
+            role=rng.choice(SYNTHETIC_ROLES).lower()
+        )
+        if query not in seen:
+            seen.add(query)
+            pool.append(query)
+    return pool
+
+
+def generate_workload(assessments: List[Dict[str, Any]], count: int, distinct: int = 1000,
+                      zipf_exponent: float = 1.1, seed: int = 42) -> List[str]:
+    """
+    Generate a request stream with Zipfian query repetition.
+
+    Args:
+        assessments: Catalog the queries are about
+        count: Number of requests
+        distinct: Number of distinct queries in the pool
+        zipf_exponent: Skew of query popularity (0 is uniform; higher repeats the top queries more)
+        seed: Random seed
+
+    Returns:
+        List of `count` queries in request order
+    """
+    rng = random.Random(seed)
+    pool = _query_pool(assessments, distinct, rng)
+    if not pool:
+        return []
+
+    # The query at popularity rank r is requested with probability proportional to 1 / r^s
+    weights = 1.0 / np.arange(1, len(pool) + 1) ** zipf_exponent
+    choices = np.random.default_rng(seed).choice(len(pool), size=count, p=weights / weights.sum())
+    return [pool[choice] for choice in choices]
+
+
+def workload_stats(queries: List[str]) -> Dict[str, Any]:
+    """Describe how repetitive a request stream is."""
+    if not queries:
+        return {"requests": 0, "distinct": 0, "top10_share": 0.0}
+    counts = Counter(queries)
+    return {
+        "requests": len(queries),
+        "distinct": len(counts),
+        "top10_share": sum(count for _, count in counts.most_common(10)) / len(queries)
+    }
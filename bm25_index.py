@@ -0,0 +1,152 @@
+"""
+Compact BM25 inverted index for lexical retrieval over assessment documents.
+
+Postings are stored in CSR form: one offsets array indexing into flat
+arrays of document ids and precomputed BM25 term weights, so a query is a
+handful of array slices and a vectorized accumulate. The index is saved as
+a single .npz file (no pickle) next to the FAISS index.
+"""
+
+import re
+import logging
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Keeps tokens like "c++", "c#", ".net", "html5" and "8.0" intact
+TOKEN_PATTERN = re.compile(r'[a-z0-9#+]+(?:\.[a-z0-9#+]+)*|\.[a-z]+')
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have",
+    "in", "is", "it", "its", "me", "my", "of", "on", "or", "our", "that", "the", "their",
+    "this", "to", "we", "who", "will", "with", "you", "your"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, num_docs: int):
+        """
+        Initialize the index from its arrays (use build() or load() instead).
+
+        Args:
+            terms: Sorted vocabulary
+            offsets: Start of each term's postings (length len(terms) + 1)
+            doc_ids: Document id of each posting
+            weights: Precomputed BM25 weight of each posting
+            num_docs: Number of indexed documents
+        """
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+        self.vocabulary = {term: i for i, term in enumerate(terms.tolist())}
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Build an index over the given documents.
+
+        Args:
+            texts: Document texts; document ids are their positions
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+
+        Returns:
+            BM25Index
+        """
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if len(texts) else 0.0
+
+        # Group postings by term
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids = []
+        weights = []
+        num_docs = len(texts)
+
+        for i, term in enumerate(terms):
+            term_postings = postings[term]
+            offsets[i + 1] = offsets[i] + len(term_postings)
+
+            df = len(term_postings)
+            idf = np.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in term_postings:
+                length_norm = k1 * (1.0 - b + b * doc_lengths[doc_id] / avg_length) if avg_length else k1
+                doc_ids.append(doc_id)
+                weights.append(idf * tf * (k1 + 1.0) / (tf + length_norm))
+
+        logger.info(f"Built BM25 index with {len(terms)} terms over {num_docs} documents")
+        return cls(
+            np.array(terms, dtype=str),
+            offsets,
+            np.array(doc_ids, dtype=np.int32),
+            np.array(weights, dtype=np.float32),
+            num_docs
+        )
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Find the documents with the highest BM25 score for a query.
+
+        Args:
+            query: Query text
+            k: Maximum number of results
+
+        Returns:
+            List of (document id, score) pairs, best first, excluding zero scores
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term, query_tf in Counter(tokenize(query)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # Document ids are unique within a term's postings, so fancy-index add is safe
+            scores[self.doc_ids[start:end]] += query_tf * self.weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        if candidates.size > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates]
+
+    def save(self, path: str) -> None:
+        """Save the index arrays to an .npz file."""
+        np.savez(
+            path,
+            terms=self.terms,
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            num_docs=np.array([self.num_docs], dtype=np.int64)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["terms"],
+                data["offsets"],
+                data["doc_ids"],
+                data["weights"],
+                int(data["num_docs"][0])
+            )
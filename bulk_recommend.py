@@ -0,0 +1,297 @@
+"""
+Offline bulk recommendation for large query files (e.g. nightly requisition runs).
+
+Reads queries from JSONL or CSV, splits them into fixed-size shards and
+processes the shards in a pool of worker processes. Every worker memory-maps
+the same saved FAISS index (so its pages are shared instead of copied) and
+batch-encodes its queries. Each finished shard is written atomically to a
+work directory, so a failed or interrupted run resumes from the shards that
+are still missing. Results are merged into JSONL or Parquet.
+
+Usage:
+    python bulk_recommend.py --input requisitions.csv --output results.parquet --workers 4
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Engine of the current worker process
+_engine = None
+
+
+def read_queries(path: str, query_field: str = "query", id_field: str = "id") -> List[Dict[str, Any]]:
+    """
+    Read queries from a JSONL or CSV file.
+
+    Args:
+        path: Input file (.jsonl/.ndjson or .csv)
+        query_field: Field holding the query text
+        id_field: Field holding the query id (defaults to the row number)
+
+    Returns:
+        List of {"id", "query"} dictionaries in file order
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    elif path.endswith(".csv"):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            records = list(csv.DictReader(f))
+    else:
+        raise ValueError(f"Unsupported input format: {path} (expected .jsonl or .csv)")
+
+    return [
+        {"id": record.get(id_field, row), "query": str(record.get(query_field) or "")}
+        for row, record in enumerate(records)
+    ]
+
+
+def _shard_path(work_dir: str, shard: int) -> str:
+    return os.path.join(work_dir, f"shard_{shard:05d}.jsonl")
+
+
+def _init_worker(engine_kwargs: Dict[str, Any], threads_per_worker: int) -> None:
+    """Create the engine of a worker process over the memory-mapped index."""
+    global _engine
+    import torch
+    torch.set_num_threads(threads_per_worker)
+
+    from recommend_engine import SHLRecommendationEngine
+    _engine = SHLRecommendationEngine(**engine_kwargs, mmap_index=True)
+
+
+def _process_shard(shard: int, rows: List[Dict[str, Any]], work_dir: str, top_k: int,
+                   batch_size: int) -> Tuple[int, int, float]:
+    """
+    Recommend assessments for one shard and write its results file.
+
+    A failed batch fails the whole shard: no results file is written, so the
+    next run processes the shard again.
+
+    Returns:
+        Tuple of the shard number, number of queries and processing seconds
+    """
+    start_time = time.perf_counter()
+    output_path = _shard_path(work_dir, shard)
+    temp_path = f"{output_path}.tmp"
+
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                results = _engine.recommend_batch([row["query"] for row in batch], top_k=top_k)
+                for row, recommendations in zip(batch, results):
+                    f.write(json.dumps({"id": row["id"], "query": row["query"], "recommendations": recommendations}) + "\n")
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+    # The shard counts as done only once its complete file is in place
+    os.replace(temp_path, output_path)
+    return shard, len(rows), time.perf_counter() - start_time
+
+
+def _prepare_work_dir(work_dir: str, run_info: Dict[str, Any]) -> None:
+    """Create the work directory, discarding shards from a run with different inputs or settings."""
+    os.makedirs(work_dir, exist_ok=True)
+    manifest_path = os.path.join(work_dir, "manifest.json")
+
+    previous = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    if previous != run_info:
+        if previous is not None:
+            logger.info("Input or settings changed since the last run; starting over")
+        for name in os.listdir(work_dir):
+            if name.startswith("shard_"):
+                os.remove(os.path.join(work_dir, name))
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(run_info, f, indent=4)
+
+
+def merge_shards(work_dir: str, num_shards: int, output_path: str) -> int:
+    """
+    Merge shard results, in order, into the output file.
+
+    JSONL output has one line per query; Parquet output has one row per
+    (query, recommendation) with a rank column.
+
+    Returns:
+        Number of queries written
+    """
+    count = 0
+    if output_path.endswith(".parquet"):
+        import pandas as pd
+
+        rows = []
+        for shard in range(num_shards):
+            with open(_shard_path(work_dir, shard), 'r', encoding='utf-8') as f:
+                for line in f:
+                    result = json.loads(line)
+                    count += 1
+                    for rank, recommendation in enumerate(result["recommendations"], start=1):
+                        rows.append({"id": str(result["id"]), "query": result["query"], "rank": rank, **recommendation})
+        pd.DataFrame(rows).to_parquet(output_path, index=False)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for shard in range(num_shards):
+                with open(_shard_path(work_dir, shard), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        out.write(line)
+                        count += 1
+    return count
+
+
+def run_bulk(input_path: str, output_path: str, work_dir: str = None, workers: int = None,
+             shard_size: int = 1000, batch_size: int = 64, top_k: int = 10,
+             query_field: str = "query", id_field: str = "id",
+             engine_kwargs: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Recommend assessments for every query in a file, resuming a previous run if possible.
+
+    Args:
+        input_path: JSONL or CSV file of queries
+        output_path: Result file (.jsonl or .parquet)
+        work_dir: Directory for shard results (default: <output>.shards)
+        workers: Worker processes (default: CPU count)
+        shard_size: Queries per shard (the unit of resumption)
+        batch_size: Queries encoded together
+        top_k: Recommendations per query
+        query_field: Input field holding the query text
+        id_field: Input field holding the query id
+        engine_kwargs: Arguments for SHLRecommendationEngine (data and index paths, model)
+
+    Returns:
+        Run summary with query counts and throughput
+    """
+    from recommend_engine import SHLRecommendationEngine
+
+    engine_kwargs = engine_kwargs or {}
+    work_dir = work_dir or f"{output_path}.shards"
+    workers = workers or os.cpu_count() or 1
+
+    rows = read_queries(input_path, query_field, id_field)
+    num_shards = (len(rows) + shard_size - 1) // shard_size
+
+    # Build (or validate) the saved index once, before workers map it
+    engine = SHLRecommendationEngine(**engine_kwargs)
+    index_version = engine.index_version
+    del engine
+
+    input_stat = os.stat(input_path)
+    _prepare_work_dir(work_dir, {
+        "input": os.path.abspath(input_path),
+        "input_size": input_stat.st_size,
+        "input_mtime": input_stat.st_mtime,
+        "shard_size": shard_size,
+        "top_k": top_k,
+        "query_field": query_field,
+        "id_field": id_field,
+        "index_version": index_version
+    })
+
+    pending = [shard for shard in range(num_shards) if not os.path.exists(_shard_path(work_dir, shard))]
+    logger.info(f"{len(rows)} queries in {num_shards} shards; {num_shards - len(pending)} already done")
+
+    start_time = time.perf_counter()
+    processed = 0
+    shard_seconds = 0.0
+    failed = []
+    if pending:
+        pool_size = min(workers, len(pending))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // pool_size)
+        with ProcessPoolExecutor(max_workers=pool_size,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(engine_kwargs, threads_per_worker)) as executor:
+            futures = {
+                executor.submit(
+                    _process_shard, shard, rows[shard * shard_size:(shard + 1) * shard_size],
+                    work_dir, top_k, batch_size
+                ): shard
+                for shard in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    shard, count, seconds = future.result()
+                    processed += count
+                    shard_seconds += seconds
+                    logger.info(f"Shard {shard} done: {count} queries in {seconds:.1f}s ({count / seconds:.1f} queries/s)")
+                except Exception as e:
+                    failed.append(futures[future])
+                    logger.error(f"Shard {futures[future]} failed: {e}")
+    elapsed = time.perf_counter() - start_time
+
+    summary = {
+        "queries": len(rows),
+        "shards": num_shards,
+        "shards_resumed": num_shards - len(pending),
+        "shards_failed": sorted(failed),
+        "queries_processed": processed,
+        "seconds": elapsed,
+        # End to end, including worker start-up and model loading
+        "throughput_qps": processed / elapsed if elapsed > 0 else 0.0,
+        # Per worker, while processing shards
+        "worker_qps": processed / shard_seconds if shard_seconds > 0 else 0.0
+    }
+
+    if failed:
+        logger.error(f"{len(failed)} shards failed; run the same command again to resume")
+    else:
+        merge_shards(work_dir, num_shards, output_path)
+        logger.info(f"Wrote results for {len(rows)} queries to {output_path}")
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend SHL assessments for a file of queries")
+    parser.add_argument("--input", required=True, help="JSONL or CSV file of queries")
+    parser.add_argument("--output", required=True, help="Result file (.jsonl or .parquet)")
+    parser.add_argument("--work-dir", default=None, help="Shard directory used to resume (default: <output>.shards)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--query-field", default="query")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--data-path", default="data/shl_assessments.json")
+    parser.add_argument("--index-path", default="data/faiss_index")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    summary = run_bulk(
+        args.input, args.output,
+        work_dir=args.work_dir,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        batch_size=args.batch_size,
+        top_k=args.top_k,
+        query_field=args.query_field,
+        id_field=args.id_field,
+        engine_kwargs={
+            "data_path": args.data_path,
+            "faiss_index_path": args.index_path,
+            "model_name": args.model
+        }
+    )
+    print(json.dumps(summary, indent=4))
+    sys.exit(1 if summary["shards_failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+In-memory indexes for browsing and looking up the assessment catalog.
+
+Built once when the catalog is loaded:
+- a packed bitmap (one bit per assessment) for every test type and for the
+  remote testing and adaptive/IRT flags, so combining filters is a few
+  vectorized ANDs over N/8 bytes;
+- assessment positions sorted by duration, so a duration range is two
+  binary searches;
+- dictionaries from URL and from lowercase title to position.
+
+The positions matching a filter combination are cached, so every page after
+the first is a slice. The catalog version (a hash of its content) is used
+as the ETag of catalog responses, and every assessment's response JSON is
+serialized once here (see serialization.py).
+"""
+
+import re
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from serialization import dumps, assessment_fragment
+
+
+def _duration_minutes(duration: str) -> float:
+    """Minutes in a duration string such as "30 minutes" (inf if unknown)."""
+    match = re.search(r'(\d+)', duration or "")
+    return float(match.group(1)) if match else float('inf')
+
+
+class CatalogIndex:
+    def __init__(self, assessments: List[Dict[str, Any]], cache_size: int = 256):
+        """
+        Build the indexes over a catalog.
+
+        Args:
+            assessments: Catalog entries; an assessment's id is its position
+            cache_size: Number of filter combinations whose matches are cached
+        """
+        self.assessments = assessments
+        self.size = len(assessments)
+        self.version = hashlib.sha256(
+            json.dumps(assessments, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:16]
+
+        # Durations, and positions ordered by duration for range queries
+        durations = np.array([_duration_minutes(a.get('duration', '')) for a in assessments], dtype=np.float64)
+        self.duration_order = np.argsort(durations, kind="stable")
+        self.sorted_durations = durations[self.duration_order]
+
+        # One packed bitmap per test type and flag
+        self._all = self._pack(np.ones(self.size, dtype=bool))
+        test_types = np.array([a.get('test_type', 'N/A').lower() for a in assessments], dtype=object)
+        self.type_bitmaps = {
+            test_type: self._pack(test_types == test_type) for test_type in sorted(set(test_types))
+        }
+        self.remote_bitmap = self._pack(np.array(
+            [a.get('remote_testing_support', 'No') == 'Yes' for a in assessments], dtype=bool))
+        self.adaptive_bitmap = self._pack(np.array(
+            [a.get('adaptive_irt_support', 'No') == 'Yes' for a in assessments], dtype=bool))
+
+        # Exact lookups
+        self.by_url_index = {a['url']: i for i, a in enumerate(assessments)}
+        self.by_title_index = {a['title'].strip().lower(): i for i, a in enumerate(assessments)}
+
+        # Pre-serialized JSON of each assessment, as recommended and as browsed
+        self.fragments = [assessment_fragment(a) for a in assessments]
+        self.catalog_fragments = [
+            fragment[:-1] + b',"id":' + dumps(i) + b',"description":' + dumps(a.get('description')) + b'}'
+            for i, (a, fragment) in enumerate(zip(assessments, self.fragments))
+        ]
+
+        self.cache_size = cache_size
+        self._matches: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def _duration_bitmap(self, min_duration: Optional[float], max_duration: Optional[float]) -> np.ndarray:
+        """Bitmap of assessments whose duration is within [min_duration, max_duration]."""
+        start = 0 if min_duration is None else int(np.searchsorted(self.sorted_durations, min_duration, side="left"))
+        end = self.size if max_duration is None else int(np.searchsorted(self.sorted_durations, max_duration, side="right"))
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.duration_order[start:end]] = True
+        return self._pack(mask)
+
+    def _flag_bitmap(self, bitmap: np.ndarray, value: bool) -> np.ndarray:
+        return bitmap if value else ~bitmap & self._all
+
+    def matching_ids(self, test_type: str = None, min_duration: float = None, max_duration: float = None,
+                     remote: bool = None, adaptive: bool = None) -> np.ndarray:
+        """
+        Find the assessments matching every given filter (None means any).
+
+        Args:
+            test_type: Test type, case-insensitive
+            min_duration: Minimum duration in minutes
+            max_duration: Maximum duration in minutes
+            remote: Required remote testing support
+            adaptive: Required adaptive/IRT support
+
+        Returns:
+            Matching assessment ids in catalog order
+        """
+        key = (test_type.lower() if test_type else None, min_duration, max_duration, remote, adaptive)
+        with self._lock:
+            ids = self._matches.get(key)
+            if ids is not None:
+                self._matches.move_to_end(key)
+                return ids
+
+        bitmap = self._all.copy()
+        if test_type:
+            bitmap &= self.type_bitmaps.get(key[0], np.zeros_like(self._all))
+        if min_duration is not None or max_duration is not None:
+            bitmap &= self._duration_bitmap(min_duration, max_duration)
+        if remote is not None:
+            bitmap &= self._flag_bitmap(self.remote_bitmap, remote)
+        if adaptive is not None:
+            bitmap &= self._flag_bitmap(self.adaptive_bitmap, adaptive)
+        ids = np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+        with self._lock:
+            self._matches[key] = ids
+            while len(self._matches) > self.cache_size:
+                self._matches.popitem(last=False)
+        return ids
+
+    def page(self, offset: int = 0, limit: int = 20, **filters) -> Tuple[List[int], int]:
+        """
+        Get one page of the assessments matching the filters (see matching_ids).
+
+        Returns:
+            Tuple of the assessment ids on the page and the total number of matches
+        """
+        ids = self.matching_ids(**filters)
+        return ids[offset:offset + limit].tolist(), len(ids)
+
+    def by_url(self, url: str) -> Optional[int]:
+        """Id of the assessment with the given URL, or None."""
+        return self.by_url_index.get(url)
+
+    def by_title(self, title: str) -> Optional[int]:
+        """Id of the assessment with the given title (case-insensitive), or None."""
+        return self.by_title_index.get(title.strip().lower())
@@ -0,0 +1,223 @@
+"""
+Named catalogs served from one process.
+
+Business units can be served different assessment subsets or their own
+catalogs. Each named catalog gets its own engine (catalog, FAISS index, BM25
+index and neighbor graph, saved under its own index directory), but every
+engine shares the default engine's embedding model and re-ranker, so the
+models are loaded once per process.
+
+Catalogs are loaded on first use and kept in least-recently-used order.
+When the estimated memory of the loaded catalogs exceeds the cap, idle
+catalogs (no request in flight) are evicted, least recently used first;
+the default catalog is never evicted.
+
+Catalogs are configured in a JSON file (SHL_CATALOGS in the API) mapping
+each name to SHLRecommendationEngine parameters, e.g.
+
+    {
+        "finance": {"assessment_urls": ["https://www.shl.com/...", "..."]},
+        "acme": {"data_path": "data/catalogs/acme.json", "retrieval_mode": "hybrid"}
+    }
+
+A catalog without "data_path" is a subset of the default catalog; without
+"faiss_index_path" its index is saved under data/catalogs/<name>/faiss_index.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any
+
+import numpy as np
+
+from metrics import CATALOG_LOADS, CATALOG_EVICTIONS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG = "default"
+
+# Parameters that must match the shared model, so catalogs can't set them
+SHARED_PARAMETERS = ("model_name", "model_backend", "embedding_model", "reranker")
+
+
+def engine_memory_bytes(engine) -> int:
+    """
+    Approximate memory held by an engine's catalog and indexes (the shared models excluded).
+
+    Counts the document embeddings, the FAISS index vectors, the BM25 postings
+    and the neighbor graph, which dominate an engine's footprint as the
+    catalog grows.
+    """
+    total = 0
+    arrays = [engine.document_embeddings, engine.neighbor_ids, engine.neighbor_scores]
+    if engine.lexical_index is not None:
+        arrays += [engine.lexical_index.offsets, engine.lexical_index.doc_ids, engine.lexical_index.weights]
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            total += array.nbytes
+
+    # The flat FAISS index keeps its own copy of the vectors (unless memory-mapped)
+    if engine.vectorstore is not None and not engine.mmap_index:
+        index = engine.vectorstore.index
+        total += index.ntotal * index.d * 4
+
+    # Catalog text and metadata, at roughly their JSON size
+    total += sum(len(text) for text in engine.document_texts)
+    total += len(json.dumps(engine.assessments))
+    return total
+
+
+class CatalogRegistry:
+    def __init__(self, default_engine, catalogs: Dict[str, Dict[str, Any]] = None,
+                 memory_cap_mb: float = 1024, catalogs_dir: str = "data/catalogs"):
+        """
+        Initialize the registry.
+
+        Args:
+            default_engine: Engine serving the default catalog; its embedding model
+                            and re-ranker are shared with every other catalog
+            catalogs: Mapping of catalog name to SHLRecommendationEngine parameters
+            memory_cap_mb: Estimated memory (see engine_memory_bytes) above which
+                           idle catalogs are evicted
+            catalogs_dir: Directory for the indexes of catalogs that don't set
+                          faiss_index_path
+        """
+        self.default_engine = default_engine
+        self.catalogs = {DEFAULT_CATALOG: {}}
+        self.memory_cap_bytes = memory_cap_mb * 1024 * 1024
+        self.catalogs_dir = catalogs_dir
+
+        for name, config in (catalogs or {}).items():
+            if name == DEFAULT_CATALOG:
+                raise ValueError(f"Catalog name '{DEFAULT_CATALOG}' is reserved")
+            ignored = [parameter for parameter in SHARED_PARAMETERS if parameter in config]
+            if ignored:
+                logger.warning(f"Catalog {name}: ignoring {', '.join(ignored)} (the model is shared)")
+            self.catalogs[name] = {key: value for key, value in config.items() if key not in SHARED_PARAMETERS}
+
+        self._engines: "OrderedDict[str, Any]" = OrderedDict([(DEFAULT_CATALOG, default_engine)])
+        self._memory = {DEFAULT_CATALOG: engine_memory_bytes(default_engine)}
+        self._in_flight: Dict[str, int] = {}
+        self._load_locks = {name: threading.Lock() for name in self.catalogs}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, default_engine, path: str = None, memory_cap_mb: float = 1024) -> "CatalogRegistry":
+        """Create a registry from a JSON catalog configuration file (only the default catalog if there is none)."""
+        catalogs = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                catalogs = json.load(f)
+            logger.info(f"Loaded {len(catalogs)} catalog configurations from {path}")
+        return cls(default_engine, catalogs, memory_cap_mb=memory_cap_mb)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.catalogs
+
+    def names(self) -> List[str]:
+        """Names of the configured catalogs."""
+        return list(self.catalogs)
+
+    def loaded(self) -> Dict[str, float]:
+        """Loaded catalogs, least recently used first, with their estimated memory in MB."""
+        with self._lock:
+            return {name: self._memory[name] / (1024 * 1024) for name in self._engines}
+
+    def _create_engine(self, name: str):
+        """Build the engine of a catalog, sharing the default engine's models."""
+        from recommend_engine import SHLRecommendationEngine
+
+        default = self.default_engine
+        config = dict(self.catalogs[name])
+        config.setdefault("data_path", default.data_path)
+        config.setdefault("faiss_index_path", os.path.join(self.catalogs_dir, name, "faiss_index"))
+        config.setdefault("embeddings_path", default.embeddings_path)
+        return SHLRecommendationEngine(
+            model_name=default.model_name,
+            model_backend=default.model_backend,
+            embedding_model=default.embedding_model,
+            reranker=default.reranker,
+            **config
+        )
+
+    def get(self, name: str = None):
+        """
+        Get the engine of a catalog, loading it if needed.
+
+        Args:
+            name: Catalog name (None for the default catalog)
+
+        Returns:
+            The catalog's engine
+
+        Raises:
+            KeyError: If the catalog is not configured
+        """
+        name = name or DEFAULT_CATALOG
+        if name not in self.catalogs:
+            raise KeyError(name)
+
+        with self._lock:
+            engine = self._engines.get(name)
+            if engine is not None:
+                self._engines.move_to_end(name)
+                return engine
+
+        # One load per catalog at a time; other catalogs stay available meanwhile
+        with self._load_locks[name]:
+            with self._lock:
+                engine = self._engines.get(name)
+                if engine is not None:
+                    self._engines.move_to_end(name)
+                    return engine
+
+            logger.info(f"Loading catalog {name}...")
+            engine = self._create_engine(name)
+            memory = engine_memory_bytes(engine)
+            CATALOG_LOADS.inc(catalog=name)
+            logger.info(f"Loaded catalog {name} ({len(engine.assessments)} assessments, "
+                        f"~{memory / (1024 * 1024):.1f} MB)")
+
+            with self._lock:
+                self._engines[name] = engine
+                self._memory[name] = memory
+                self._evict(keep=name)
+            return engine
+
+    def _evict(self, keep: str) -> None:
+        """Evict idle catalogs, least recently used first, until under the memory cap (caller holds the lock)."""
+        for name in list(self._engines):
+            if sum(self._memory[loaded] for loaded in self._engines) <= self.memory_cap_bytes:
+                return
+            if name in (DEFAULT_CATALOG, keep) or self._in_flight.get(name):
+                continue
+            engine = self._engines.pop(name)
+            freed = self._memory.pop(name)
+            engine.close()
+            CATALOG_EVICTIONS.inc(catalog=name)
+            logger.info(f"Evicted idle catalog {name} (~{freed / (1024 * 1024):.1f} MB)")
+
+    @contextmanager
+    def acquire(self, name: str = None):
+        """
+        Use a catalog's engine, keeping it from being evicted until the block exits.
+
+        Raises:
+            KeyError: If the catalog is not configured
+        """
+        name = name or DEFAULT_CATALOG
+        if name not in self.catalogs:
+            raise KeyError(name)
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
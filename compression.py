@@ -0,0 +1,75 @@
+"""
+Negotiated response compression for the API.
+
+Compresses responses with Brotli when the client accepts "br" and the
+brotli package is installed, otherwise with gzip when the client accepts
+it. Small responses are sent uncompressed. Streaming responses are
+flushed per chunk, so each chunk reaches the client as soon as it is sent.
+"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Encodings listed in an Accept-Encoding header, excluding those with q=0."""
+    encodings = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 4):
+        super().__init__(app, minimum_size)
+        self._compressor = brotli.Compressor(quality=quality)
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self._compressor.process(body)
+        if more_body:
+            return compressed + self._compressor.flush()
+        return compressed + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6,
+                 brotli_quality: int = 4):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application to wrap
+            minimum_size: Responses smaller than this many bytes are not compressed
+            gzip_level: gzip compression level (1-9)
+            brotli_quality: Brotli quality (0-11); low values keep latency down
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = _accepted_encodings(Headers(scope=scope).get("Accept-Encoding", ""))
+        if BROTLI_AVAILABLE and "br" in encodings:
+            responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+        elif "gzip" in encodings:
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        await responder(scope, receive, send)
@@ -0,0 +1,56 @@
+"""
+Diversity-aware re-ranking with maximal marginal relevance (MMR).
+
+Works on the catalog embedding matrix already held by the engine, so no
+text is re-encoded: pairwise similarities for the candidates come from one
+matrix product, and the greedy selection keeps a running "most similar
+already-selected item" vector, costing O(N^2 d + N k) for N candidates.
+"""
+
+import numpy as np
+
+# Upper bound on candidates, which keeps the N x N similarity matrix small
+MAX_MMR_CANDIDATES = 200
+
+
+def mmr_select(relevance: np.ndarray, candidate_vectors: np.ndarray, k: int,
+               lambda_: float = 0.7) -> np.ndarray:
+    """
+    Greedily order candidates by maximal marginal relevance.
+
+    Args:
+        relevance: Relevance of each candidate to the query (higher is better)
+        candidate_vectors: Normalized embedding of each candidate (N x d)
+        k: Number of candidates to select
+        lambda_: Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        Positions of the selected candidates, in selection order
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)[:MAX_MMR_CANDIDATES]
+    candidate_vectors = np.asarray(candidate_vectors, dtype=np.float32)[:MAX_MMR_CANDIDATES]
+    num_candidates = relevance.shape[0]
+    k = min(k, num_candidates)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Cosine similarity between every pair of candidates
+    similarity = candidate_vectors @ candidate_vectors.T
+
+    selected = np.empty(k, dtype=np.int64)
+    available = np.ones(num_candidates, dtype=bool)
+    max_similarity = np.full(num_candidates, -np.inf, dtype=np.float32)
+
+    for step in range(k):
+        if step == 0:
+            scores = relevance.copy()
+        else:
+            scores = lambda_ * relevance - (1.0 - lambda_) * max_similarity
+        scores[~available] = -np.inf
+
+        choice = int(np.argmax(scores))
+        selected[step] = choice
+        available[choice] = False
+        np.maximum(max_similarity, similarity[:, choice], out=max_similarity)
+
+    return selected
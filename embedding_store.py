@@ -0,0 +1,350 @@
+"""
+Binary embedding store saved next to the FAISS index.
+
+Replaces LangChain's pickled docstore (index.pkl) with a versioned,
+memory-mappable file, so the document metadata, text and embeddings load
+without unpickling arbitrary objects and without copying:
+
+    header          64 bytes: magic, format version, matrix dtype, column
+                    count, rows, dimension, index version, section offsets
+    column table    48 bytes per column: name, kind, data offset
+    matrix          rows x dim float32 or float16, row-major (64-byte aligned)
+    columns         one array of rows values per metadata field: uint32 ids
+                    into the string table, or int64
+    string table    count, count + 1 uint64 offsets, UTF-8 bytes
+
+Strings are deduplicated and decoded only when a row is read. The row
+number is the FAISS position and is returned as the "doc_index" metadata.
+
+Run as a script to convert an index saved with an index.pkl docstore:
+
+    python embedding_store.py --index data/faiss_index [--float16] [--model NAME]
+
+The conversion also writes the index manifest with the index version
+computed from the model name and the stored document text, so the engine
+loads the converted index instead of rebuilding it (as long as the
+catalog and model are unchanged).
+"""
+
+import os
+import json
+import mmap
+import hashlib
+import struct
+import logging
+import argparse
+import numpy as np
+from typing import List, Dict, Any
+
+from langchain_community.docstore.base import Docstore
+from langchain.schema import Document
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STORE_FILE = "embeddings.bin"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_MAGIC = b"SHLEMBS\x00"
+_HEADER = struct.Struct("<8sHBBIQII16sQQ")
+_COLUMN = struct.Struct("<32sIIQ")
+_DTYPES = {0: np.float32, 1: np.float16}
+_STR_COLUMN = 0
+_INT_COLUMN = 1
+_MISSING = 0xFFFFFFFF
+_TEXT_COLUMN = "_text"
+
+
+def _align(offset: int, alignment: int) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def compute_index_version(model_name: str, model_backend: str, texts: List[str]) -> str:
+    """
+    Compute a version identifier for an index over the given texts.
+
+    The version covers the model name (and non-default backend) and the exact
+    document text, so it changes whenever either the model or the catalog changes.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(model_name.encode('utf-8'))
+    if model_backend != "torch":
+        hasher.update(f"@{model_backend}".encode('utf-8'))
+    for text in texts:
+        hasher.update(b'\x00')
+        hasher.update(text.encode('utf-8'))
+    return hasher.hexdigest()[:16]
+
+
+def read_index_version(index_dir: str) -> str:
+    """Index version recorded in an index directory's manifest, or None if there is none."""
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get("index_version")
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(index_dir: str, index_version: str, model_name: str, model_backend: str,
+                   documents: int) -> None:
+    """Record which model and catalog the index in a directory was built from."""
+    with open(os.path.join(index_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            "index_version": index_version,
+            "model_name": model_name,
+            "model_backend": model_backend,
+            "documents": documents
+        }, f, indent=4)
+
+
+def write_embedding_store(path: str, embeddings: np.ndarray, metadatas: List[Dict[str, Any]],
+                          texts: List[str], index_version: str = "", dtype: str = "float32") -> None:
+    """
+    Write an embedding store.
+
+    Args:
+        path: Output file
+        embeddings: Document embeddings (N x d), in FAISS order
+        metadatas: Metadata of each document; values must be strings or integers
+                   ("doc_index" is not stored, it is the row number)
+        texts: Text of each document
+        index_version: Version of the index the store belongs to (at most 16 characters)
+        dtype: Matrix precision, "float32" or "float16"
+    """
+    dtype_code = {"float32": 0, "float16": 1}[dtype]
+    matrix = np.ascontiguousarray(embeddings, dtype=_DTYPES[dtype_code])
+    rows, dim = matrix.shape
+    if len(metadatas) != rows or len(texts) != rows:
+        raise ValueError(f"Got {rows} embeddings, {len(metadatas)} metadata entries and {len(texts)} texts")
+
+    # Metadata fields in first-seen order, plus the document text
+    names = []
+    for metadata in metadatas:
+        for name in metadata:
+            if name != "doc_index" and name not in names:
+                names.append(name)
+    values = {name: [metadata.get(name) for metadata in metadatas] for name in names}
+    values[_TEXT_COLUMN] = list(texts)
+
+    strings = {}
+    columns = []
+    for name, column_values in values.items():
+        if all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in column_values):
+            columns.append((name, _INT_COLUMN, np.asarray(column_values, dtype=np.int64)))
+            continue
+        ids = np.empty(rows, dtype=np.uint32)
+        for row, value in enumerate(column_values):
+            if value is None:
+                ids[row] = _MISSING
+            elif isinstance(value, (str, int, np.integer)):
+                ids[row] = strings.setdefault(str(value), len(strings))
+            else:
+                raise ValueError(f"Unsupported value for metadata field {name!r}: {type(value).__name__}")
+        columns.append((name, _STR_COLUMN, ids))
+
+    encoded = [string.encode('utf-8') for string in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    string_offsets[1:] = np.cumsum([len(data) for data in encoded])
+
+    # Lay out the sections
+    matrix_offset = _align(_HEADER.size + _COLUMN.size * len(columns), 64)
+    offset = matrix_offset + matrix.nbytes
+    column_offsets = []
+    for _, _, data in columns:
+        offset = _align(offset, 8)
+        column_offsets.append(offset)
+        offset += data.nbytes
+    strings_offset = _align(offset, 8)
+
+    header = _HEADER.pack(
+        _MAGIC, FORMAT_VERSION, dtype_code, 0, len(columns), rows, dim, 0,
+        (index_version or "").encode('ascii')[:16], matrix_offset, strings_offset
+    )
+
+    # Write atomically so a reader never maps a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for (name, kind, _), column_offset in zip(columns, column_offsets):
+            f.write(_COLUMN.pack(name.encode('utf-8'), kind, 0, column_offset))
+        for section_offset, data in [(matrix_offset, matrix)] + [
+            (column_offset, data) for (_, _, data), column_offset in zip(columns, column_offsets)
+        ]:
+            f.write(b"\x00" * (section_offset - f.tell()))
+            f.write(data.tobytes())
+        f.write(b"\x00" * (strings_offset - f.tell()))
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(string_offsets.tobytes())
+        f.write(b"".join(encoded))
+    os.replace(tmp_path, path)
+
+
+class EmbeddingStore:
+    def __init__(self, path: str):
+        """
+        Memory-map an embedding store written by write_embedding_store().
+
+        Args:
+            path: Store file
+
+        Raises:
+            ValueError: If the file is not an embedding store, has an unsupported
+                        format version or is truncated
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._buffer)
+        if size < _HEADER.size:
+            raise ValueError(f"{path} is truncated")
+
+        (magic, version, dtype_code, _, num_columns, rows, dim, _,
+         index_version, matrix_offset, strings_offset) = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not an embedding store")
+        if version != FORMAT_VERSION or dtype_code not in _DTYPES:
+            raise ValueError(f"{path} has unsupported format version {version} (dtype {dtype_code})")
+
+        self.index_version = index_version.rstrip(b"\x00").decode('ascii')
+        self.dtype = np.dtype(_DTYPES[dtype_code])
+        if strings_offset + 8 > size or matrix_offset + rows * dim * self.dtype.itemsize > size:
+            raise ValueError(f"{path} is truncated")
+
+        # Read-only views of the mapped file
+        self.embeddings = np.frombuffer(self._buffer, self.dtype, rows * dim, matrix_offset).reshape(rows, dim)
+
+        self._columns = {}
+        for position in range(num_columns):
+            name, kind, _, offset = _COLUMN.unpack_from(self._buffer, _HEADER.size + position * _COLUMN.size)
+            dtype = np.int64 if kind == _INT_COLUMN else np.uint32
+            self._columns[name.rstrip(b"\x00").decode('utf-8')] = (
+                kind, np.frombuffer(self._buffer, dtype, rows, offset)
+            )
+
+        (num_strings,) = struct.unpack_from("<Q", self._buffer, strings_offset)
+        self._string_offsets = np.frombuffer(self._buffer, np.uint64, num_strings + 1, strings_offset + 8)
+        self._strings_start = strings_offset + 8 + 8 * (num_strings + 1)
+        if self._strings_start + int(self._string_offsets[-1]) > size:
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    @property
+    def fields(self) -> List[str]:
+        """Names of the stored metadata fields."""
+        return [name for name in self._columns if name != _TEXT_COLUMN]
+
+    def _value(self, name: str, row: int):
+        kind, data = self._columns[name]
+        if kind == _INT_COLUMN:
+            return int(data[row])
+        string_id = int(data[row])
+        if string_id == _MISSING:
+            return None
+        start = self._strings_start + int(self._string_offsets[string_id])
+        end = self._strings_start + int(self._string_offsets[string_id + 1])
+        return self._buffer[start:end].decode('utf-8')
+
+    def text(self, row: int) -> str:
+        """Text of the document at a row."""
+        return self._value(_TEXT_COLUMN, row)
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Metadata of the document at a row, including its doc_index."""
+        metadata = {}
+        for name in self.fields:
+            value = self._value(name, row)
+            if value is not None:
+                metadata[name] = value
+        metadata["doc_index"] = row
+        return metadata
+
+    def column(self, name: str) -> List[Any]:
+        """Every value of one metadata field, in row order."""
+        return [self._value(name, row) for row in range(len(self))]
+
+
+class StoreDocstore(Docstore):
+    """LangChain docstore that builds documents from an embedding store on lookup; ids are row numbers."""
+
+    def __init__(self, store: EmbeddingStore):
+        self.store = store
+
+    def search(self, search: int):
+        row = int(search)
+        if not 0 <= row < len(self.store):
+            return f"ID {search} not found."
+        return Document(page_content=self.store.text(row), metadata=self.store.metadata(row))
+
+
+def convert_faiss_index(index_dir: str, output_path: str = None, dtype: str = "float32",
+                        model_name: str = DEFAULT_MODEL_NAME, model_backend: str = "torch") -> str:
+    """
+    Write the embedding store for an index saved with a pickled docstore (index.pkl).
+
+    Only convert index directories written by this project: the pickle is loaded.
+    If the directory has no manifest, one is written with the index version
+    computed from the model and the stored document text, which the engine
+    checks before loading a saved index.
+
+    Args:
+        index_dir: Directory with index.faiss and index.pkl
+        output_path: Store file (default: <index_dir>/embeddings.bin)
+        dtype: Matrix precision, "float32" or "float16"
+        model_name: Embedding model the index was built with
+        model_backend: Inference backend of the model
+
+    Returns:
+        Path of the written store
+    """
+    import pickle
+    import faiss
+
+    output_path = output_path or os.path.join(index_dir, STORE_FILE)
+
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    embeddings = index.reconstruct_n(0, index.ntotal)
+    with open(os.path.join(index_dir, "index.pkl"), 'rb') as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    documents = [docstore.search(index_to_docstore_id[position]) for position in range(index.ntotal)]
+    texts = [document.page_content for document in documents]
+
+    index_version = read_index_version(index_dir)
+    if not index_version:
+        index_version = compute_index_version(model_name, model_backend, texts)
+        write_manifest(index_dir, index_version, model_name, model_backend, len(texts))
+        logger.info(f"Wrote the index manifest (version {index_version}, model {model_name})")
+
+    write_embedding_store(
+        output_path,
+        embeddings,
+        [dict(document.metadata) for document in documents],
+        texts,
+        index_version,
+        dtype
+    )
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a saved FAISS index's pickled docstore to an embedding store")
+    parser.add_argument("--index", default="data/faiss_index", help="Directory of the saved FAISS index")
+    parser.add_argument("--output", default=None, help="Store file (default: <index>/embeddings.bin)")
+    parser.add_argument("--float16", action="store_true", help="Store the embedding matrix as float16")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Embedding model the index was built with")
+    parser.add_argument("--model-backend", default="torch", help="Inference backend of the model")
+    args = parser.parse_args()
+
+    output_path = convert_faiss_index(args.index, args.output, "float16" if args.float16 else "float32",
+                                      args.model, args.model_backend)
+    store = EmbeddingStore(output_path)
+    logger.info(f"Wrote {len(store)} documents ({store.embeddings.shape[1]}-dim {store.dtype}) to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
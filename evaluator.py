@@ -7,22 +7,43 @@ using standard information retrieval metrics including MAP@k and Recall@k.
 
 import os
 import json
+import time
+import argparse
 import numpy as np
 import logging
 import pandas as pd
 import matplotlib.pyplot as plt
 from typing import List, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 from recommend_engine import SHLRecommendationEngine
+from perf_stats import summarize, peak_rss_mb
 import re
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Page furniture and a repeated company blurb, as found in queries extracted
+# from job pages, for measuring query preprocessing
+PAGE_HEADER = [
+    "Home", "Careers", "About Us", "Products", "Contact",
+    "We use cookies to give you the best experience on our website. Accept all cookies",
+    "Skip to main content"
+]
+COMPANY_BLURB = ("Join a community that is shaping the future of work! We are a global team that "
+                 "believes in the power of people, and our culture is built on curiosity and collaboration.")
+PAGE_FOOTER = [
+    "Apply now", "Share this job", "Follow us on LinkedIn",
+    "We are an equal opportunity employer and value diversity at our company.",
+    "Privacy Policy", "Terms of Use", "© 2024 All rights reserved."
+]
+
 class RecommendationEvaluator:
     def __init__(self, test_data_path="data/test_data.json", 
                  recommendation_engine=None,
-                 output_dir="evaluation_results"):
+                 output_dir="evaluation_results",
+                 create_engine=True):
         """
         Initialize the evaluator with test data and recommendation engine.
         
@@ -30,6 +51,8 @@ class RecommendationEvaluator:
             test_data_path: Path to test data JSON file
             recommendation_engine: Instance of recommendation engine (if None, will create one)
             output_dir: Directory to save evaluation results
+            create_engine: Whether to create an engine when none is provided (experiments
+                           and model comparisons build their own)
         """
         self.test_data_path = test_data_path
         self.output_dir = output_dir
@@ -41,7 +64,7 @@ class RecommendationEvaluator:
         self.test_data = self._load_test_data()
         
         # Initialize recommendation engine if not provided
-        if recommendation_engine is None:
+        if recommendation_engine is None and create_engine:
             logger.info("Initializing recommendation engine...")
             self.engine = SHLRecommendationEngine()
         else:
@@ -262,7 +285,8 @@ class RecommendationEvaluator:
         # Initialize results dictionary
         results = {
             "overall": {f"mean_precision@{k}": 0.0 for k in k_values},
-            "per_query": {}
+            "per_query": {},
+            "performance": summarize([])
         }
         
         # Add other metrics to overall results
@@ -281,6 +305,9 @@ class RecommendationEvaluator:
         # Track non-empty recommendations count
         valid_query_count = 0
         
+        # Track per-query recommendation latency
+        latencies = []
+        
         # Evaluate each query
         for query in self.test_data["queries"]:
             # Skip if no ground truth for this query
@@ -293,7 +320,9 @@ class RecommendationEvaluator:
             
             # Get recommendations from engine
             max_k = max(k_values)
+            start_time = time.perf_counter()
             recommendations = self.engine.recommend(query, top_k=max_k)
+            latencies.append(time.perf_counter() - start_time)
             
             # Skip if no recommendations
             if not recommendations:
@@ -376,6 +405,8 @@ class RecommendationEvaluator:
                 results["overall"][f"mean_recall@{k}"] = metrics_sum[k]["recall"] / valid_query_count
                 results["overall"][f"map@{k}"] = metrics_sum[k]["ap"] / valid_query_count
         
+        results["performance"] = summarize(latencies)
+        
         # Print overall results if verbose
         if verbose:
             print("\nOverall Evaluation Results:")
@@ -552,41 +583,302 @@ class RecommendationEvaluator:
             with open(os.path.join(viz_dir, "query_mapping.json"), "w", encoding="utf-8") as f:
                 json.dump(query_mapping, f, indent=4)
             
-    def run_optimization_experiments(self, experiment_configs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def run_optimization_experiments(self, experiment_configs: List[Dict[str, Any]],
+                                     k_values: List[int] = [3, 5, 10],
+                                     max_workers: int = None,
+                                     throughput_repeats: int = 3) -> Dict[str, Any]:
         """
         Run optimization experiments with different recommendation engine configurations.
         
+        Each configuration gets its own engine, built and evaluated in a separate
+        process. Configurations sharing a model and catalog reuse one set of
+        document embeddings through the engine's on-disk embedding cache.
+        
         Args:
             experiment_configs: List of experiment configurations
-                               (each is a dict of parameters for SHLRecommendationEngine)
+                               (each is a dict of parameters for SHLRecommendationEngine,
+                               plus an optional "name")
+            k_values: List of k values to evaluate at
+            max_workers: Number of worker processes (defaults to one per CPU)
+            throughput_repeats: Number of passes over the test queries when
+                               measuring throughput
                                
         Returns:
             Dictionary of experiment results
         """
-        experiment_results = {}
-        
+        experiments = []
         for i, config in enumerate(experiment_configs, 1):
+            config = dict(config)
             experiment_name = config.pop("name", f"Experiment_{i}")
-            logger.info(f"Running experiment: {experiment_name}")
             
-            # Initialize engine with configuration
-            engine = SHLRecommendationEngine(**config)
+            # Give every experiment its own index so parallel runs don't overwrite each other
+            config.setdefault(
+                "faiss_index_path",
+                os.path.join(self.output_dir, "experiments", experiment_name, "faiss_index")
+            )
+            experiments.append((experiment_name, config))
+        
+        if not experiments:
+            return {}
+        
+        # Run the first experiment for each (model, catalog) pair before the rest,
+        # so later experiments find its embeddings in the cache instead of re-encoding
+        first_wave, second_wave = [], []
+        seen_pairs = set()
+        for experiment_name, config in experiments:
+            pair = (config.get("model_name"), config.get("data_path"))
+            if pair in seen_pairs:
+                second_wave.append((experiment_name, config))
+            else:
+                seen_pairs.add(pair)
+                first_wave.append((experiment_name, config))
+        
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(experiments)))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // max_workers)
+        
+        experiment_results = {}
+        
+        # Fresh spawned processes keep torch state isolated and peak memory per experiment
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 max_tasks_per_child=1) as executor:
+            for wave in (first_wave, second_wave):
+                futures = {
+                    executor.submit(
+                        _run_experiment, config, self.test_data_path, self.output_dir,
+                        k_values, throughput_repeats, threads_per_worker
+                    ): (experiment_name, config)
+                    for experiment_name, config in wave
+                }
+                
+                for future, (experiment_name, config) in futures.items():
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.error(f"Experiment {experiment_name} failed: {e}")
+                        continue
+                    
+                    # Store results
+                    experiment_results[experiment_name] = {
+                        "config": config,
+                        "results": outcome["overall"],
+                        "performance": outcome["performance"]
+                    }
+                    
+                    # Print key metrics
+                    performance = outcome["performance"]
+                    logger.info(f"  Results for {experiment_name}:")
+                    logger.info(f"    MAP@{k_values[0]}: {outcome['overall'][f'map@{k_values[0]}']:.4f}")
+                    logger.info(f"    Mean Recall@{k_values[0]}: {outcome['overall'][f'mean_recall@{k_values[0]}']:.4f}")
+                    logger.info(f"    p95 latency: {performance['p95_ms']:.1f} ms, "
+                                f"throughput: {performance['throughput_qps']:.1f} q/s, "
+                                f"peak RSS: {performance['peak_rss_mb']:.0f} MB")
+        
+        return experiment_results
+    
+    def compare_models(self, models: List[Dict[str, Any]], k_values: List[int] = [3, 5, 10],
+                       max_workers: int = 1, throughput_repeats: int = 3) -> Dict[str, Any]:
+        """
+        Compare embedding models and inference backends on quality against cost.
+        
+        Each model is evaluated as an optimization experiment with its index
+        cached under <output_dir>/models/, so re-running a comparison only builds
+        indexes for new models. Results are saved to model_comparison.json, and a
+        table and a Pareto chart (MAP@k against query encode latency and memory)
+        are added to the report.
+        
+        Args:
+            models: Model configurations: "model_name", optional "backend"
+                    ("torch", "onnx" or "openvino") and "name", plus any other
+                    SHLRecommendationEngine parameters
+            k_values: List of k values to evaluate at; the first is used for the chart
+            max_workers: Number of worker processes (defaults to 1, so that latency
+                         is measured without other models competing for the CPU)
+            throughput_repeats: Number of passes over the test queries when
+                               measuring throughput and encode latency
+                               
+        Returns:
+            Dictionary of experiment results, each with a "pareto_optimal" flag
+        """
+        experiment_configs = []
+        for model in models:
+            config = dict(model)
+            config["model_backend"] = config.pop("backend", "torch")
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{config['model_name']}_{config['model_backend']}")
+            config.setdefault("name", slug)
+            config.setdefault("faiss_index_path", os.path.join(self.output_dir, "models", slug, "faiss_index"))
+            experiment_configs.append(config)
+        
+        results = self.run_optimization_experiments(
+            experiment_configs, k_values=k_values, max_workers=max_workers,
+            throughput_repeats=throughput_repeats
+        )
+        
+        # A model is Pareto-optimal if no other model is both faster to encode and more accurate
+        k = k_values[0]
+        pareto = _pareto_front({
+            name: (result["performance"]["encode"]["mean_ms"], result["results"][f"map@{k}"])
+            for name, result in results.items()
+        })
+        for name, result in results.items():
+            result["pareto_optimal"] = name in pareto
+        
+        results_path = os.path.join(self.output_dir, "model_comparison.json")
+        with open(results_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        logger.info(f"Model comparison saved to {results_path}")
+        
+        self._generate_model_comparison_report(results, k, os.path.join(self.output_dir, "report"))
+        return results
+    
+    def _generate_model_comparison_report(self, results: Dict[str, Any], k: int, report_dir: str) -> None:
+        """Generate the model comparison table and Pareto chart."""
+        viz_dir = os.path.join(report_dir, "visualizations")
+        os.makedirs(viz_dir, exist_ok=True)
+        
+        # Comparison table
+        report_path = os.path.join(report_dir, "model_comparison.md")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("# Embedding Model Comparison\n\n")
+            f.write(f"| Model | Backend | MAP@{k} | Recall@{k} | Encode p50 (ms) | Encode p95 (ms) "
+                    f"| Query p95 (ms) | Index (MB) | Peak RSS (MB) | Pareto |\n")
+            f.write("|---|---|---|---|---|---|---|---|---|---|\n")
+            for name, result in results.items():
+                performance = result["performance"]
+                f.write(
+                    f"| {result['config']['model_name']} | {result['config']['model_backend']} "
+                    f"| {result['results'][f'map@{k}']:.4f} | {result['results'][f'mean_recall@{k}']:.4f} "
+                    f"| {performance['encode']['p50_ms']:.1f} | {performance['encode']['p95_ms']:.1f} "
+                    f"| {performance['p95_ms']:.1f} | {performance['index_size_mb']:.1f} "
+                    f"| {performance['peak_rss_mb']:.0f} | {'yes' if result['pareto_optimal'] else ''} |\n"
+                )
+        
+        if not results:
+            return
+        
+        # Pareto chart: quality against encode latency and against memory
+        names = list(results.keys())
+        quality = [results[name]["results"][f"map@{k}"] for name in names]
+        costs = {
+            "Mean query encode latency (ms)": [results[name]["performance"]["encode"]["mean_ms"] for name in names],
+            "Peak RSS (MB)": [results[name]["performance"]["peak_rss_mb"] for name in names]
+        }
+        index_sizes = np.array([results[name]["performance"]["index_size_mb"] for name in names])
+        marker_sizes = 40 + 260 * index_sizes / max(index_sizes.max(), 1e-9)
+        
+        fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+        for ax, (label, cost) in zip(axes, costs.items()):
+            front = _pareto_front({name: (c, q) for name, c, q in zip(names, cost, quality)})
+            front_points = sorted((c, q) for name, c, q in zip(names, cost, quality) if name in front)
             
-            # Run evaluation
-            results = self.evaluate(verbose=False)
+            ax.scatter(cost, quality, s=marker_sizes, alpha=0.6)
+            ax.step([c for c, _ in front_points], [q for _, q in front_points],
+                    where='post', color='tab:red', linestyle='--', label='Pareto front')
+            for name, c, q in zip(names, cost, quality):
+                ax.annotate(name, (c, q), textcoords="offset points", xytext=(5, 5), fontsize=8)
             
-            # Store results
-            experiment_results[experiment_name] = {
-                "config": config,
-                "results": results["overall"]
+            ax.set_xlabel(label)
+            ax.set_ylabel(f"MAP@{k}")
+            ax.set_ylim(0, 1)
+            ax.grid(True, linestyle='--', alpha=0.7)
+            ax.legend()
+        
+        fig.suptitle(f"Embedding Models: MAP@{k} vs Cost (marker size = index size)")
+        fig.savefig(os.path.join(viz_dir, "model_pareto.png"), dpi=300, bbox_inches='tight')
+        plt.close(fig)
+        logger.info(f"Model comparison report saved to {report_path}")
+    
+    def _write_noisy_test_data(self) -> str:
+        """
+        Write a copy of the test set with every query wrapped in page boilerplate.
+        
+        Returns:
+            Path of the noisy test data file
+        """
+        noisy_data = {"queries": [], "ground_truth": {}}
+        for query in self.test_data.get("queries", []):
+            noisy_query = "\n".join(PAGE_HEADER + [COMPANY_BLURB, query, COMPANY_BLURB] + PAGE_FOOTER)
+            noisy_data["queries"].append(noisy_query)
+            if query in self.test_data.get("ground_truth", {}):
+                noisy_data["ground_truth"][noisy_query] = self.test_data["ground_truth"][query]
+        
+        noisy_path = os.path.join(self.output_dir, "noisy_test_data.json")
+        with open(noisy_path, 'w', encoding='utf-8') as f:
+            json.dump(noisy_data, f, indent=4)
+        return noisy_path
+    
+    def compare_query_preprocessing(self, k_values: List[int] = [3, 5, 10],
+                                    throughput_repeats: int = 3) -> Dict[str, Any]:
+        """
+        Measure the latency and quality effect of query preprocessing.
+        
+        The engine is evaluated with preprocessing on and off, on the test set
+        and on a copy of it whose queries are wrapped in navigation, cookie
+        banner, footer and repeated company blurb text. Results are saved to
+        query_preprocessing.json and a table is added to the report.
+        
+        Args:
+            k_values: List of k values to evaluate at; the first is used in the table
+            throughput_repeats: Number of passes over the test queries when
+                               measuring throughput and encode latency
+                               
+        Returns:
+            Dictionary mapping test set ("clean" or "noisy") to the results with
+            preprocessing "on" and "off"
+        """
+        configs = [
+            {"name": "Preprocessing_On", "query_preprocessing": True},
+            {"name": "Preprocessing_Off", "query_preprocessing": False}
+        ]
+        test_sets = {"clean": self.test_data_path, "noisy": self._write_noisy_test_data()}
+        
+        results = {}
+        for test_set, test_data_path in test_sets.items():
+            evaluator = RecommendationEvaluator(
+                test_data_path=test_data_path,
+                output_dir=self.output_dir,
+                create_engine=False
+            )
+            # One process at a time, so the encode latencies are comparable
+            experiment_results = evaluator.run_optimization_experiments(
+                configs, k_values=k_values, max_workers=1, throughput_repeats=throughput_repeats
+            )
+            results[test_set] = {
+                "on": experiment_results.get("Preprocessing_On"),
+                "off": experiment_results.get("Preprocessing_Off")
             }
-            
-            # Print key metrics
-            logger.info(f"  Results for {experiment_name}:")
-            logger.info(f"    MAP@3: {results['overall']['map@3']:.4f}")
-            logger.info(f"    Mean Recall@3: {results['overall']['mean_recall@3']:.4f}")
         
-        return experiment_results
+        results_path = os.path.join(self.output_dir, "query_preprocessing.json")
+        with open(results_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        logger.info(f"Query preprocessing comparison saved to {results_path}")
+        
+        # Comparison table
+        k = k_values[0]
+        report_dir = os.path.join(self.output_dir, "report")
+        os.makedirs(report_dir, exist_ok=True)
+        report_path = os.path.join(report_dir, "query_preprocessing.md")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("# Query Preprocessing\n\n")
+            f.write(f"| Test set | Preprocessing | MAP@{k} | Recall@{k} | Words encoded (mean) "
+                    f"| Encode mean (ms) | Encode p95 (ms) | Query p95 (ms) |\n")
+            f.write("|---|---|---|---|---|---|---|---|\n")
+            for test_set, modes in results.items():
+                for mode, result in modes.items():
+                    if result is None:
+                        continue
+                    performance = result["performance"]
+                    f.write(
+                        f"| {test_set} | {mode} | {result['results'][f'map@{k}']:.4f} "
+                        f"| {result['results'][f'mean_recall@{k}']:.4f} | {performance['encoded_words']:.1f} "
+                        f"| {performance['encode']['mean_ms']:.1f} | {performance['encode']['p95_ms']:.1f} "
+                        f"| {performance['p95_ms']:.1f} |\n"
+                    )
+        logger.info(f"Query preprocessing report saved to {report_path}")
+        
+        return results
     
     def save_evaluation_results(self, results: Dict[str, Any]) -> None:
         """Save evaluation results to file."""
@@ -596,15 +888,128 @@ class RecommendationEvaluator:
             json.dump(results, f, indent=4)
             
         logger.info(f"Evaluation results saved to {results_path}")
+
+
+def _pareto_front(points: Dict[str, Tuple[float, float]]) -> List[str]:
+    """
+    Names of the Pareto-optimal points.
+    
+    Args:
+        points: Mapping of name to (cost, quality); lower cost and higher quality are better
         
+    Returns:
+        Names of the points not dominated by any other point, cheapest first
+    """
+    front = []
+    best_quality = -np.inf
+    for name, (cost, quality) in sorted(points.items(), key=lambda item: (item[1][0], -item[1][1])):
+        if quality > best_quality:
+            front.append(name)
+            best_quality = quality
+    return front
+
+
+def _directory_size_mb(path: str) -> float:
+    """Total size of the files in a directory in MB."""
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def _run_experiment(config: Dict[str, Any], test_data_path: str, output_dir: str,
+                    k_values: List[int], throughput_repeats: int,
+                    threads_per_worker: int) -> Dict[str, Any]:
+    """
+    Build an engine for one experiment configuration and measure it.
+    
+    Runs in a worker process of run_optimization_experiments.
+    
+    Returns:
+        Dictionary with the overall quality metrics and performance measurements
+    """
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    
+    # Initialize engine with configuration
+    start_time = time.perf_counter()
+    engine = SHLRecommendationEngine(**config)
+    init_seconds = time.perf_counter() - start_time
+    rss_after_init_mb = peak_rss_mb()
+    
+    # Run evaluation
+    evaluator = RecommendationEvaluator(
+        test_data_path=test_data_path,
+        recommendation_engine=engine,
+        output_dir=output_dir
+    )
+    results = evaluator.evaluate(k_values=k_values, verbose=False)
+    
+    # Measure sequential throughput over the test queries
+    queries = evaluator.test_data.get("queries", [])
+    throughput_qps = 0.0
+    if queries and throughput_repeats > 0:
+        start_time = time.perf_counter()
+        for _ in range(throughput_repeats):
+            for query in queries:
+                engine.recommend(query, top_k=max(k_values))
+        elapsed = time.perf_counter() - start_time
+        throughput_qps = len(queries) * throughput_repeats / elapsed if elapsed > 0 else 0.0
+    
+    # Measure query encoding alone (the model's share of the latency), including
+    # the preprocessing that decides what is encoded
+    encode_latencies = []
+    for _ in range(max(1, throughput_repeats)):
+        for query in queries:
+            start_time = time.perf_counter()
+            engine.embedding_model.embed_query(engine.preprocess_query(query))
+            encode_latencies.append(time.perf_counter() - start_time)
+    encoded_words = [len(engine.preprocess_query(query).split()) for query in queries]
+    
+    performance = dict(results["performance"])
+    performance.update({
+        "encode": summarize(encode_latencies),
+        "encoded_words": float(np.mean(encoded_words)) if encoded_words else 0.0,
+        "index_size_mb": _directory_size_mb(engine.faiss_index_path),
+        "embedding_dim": int(engine.document_embeddings.shape[1]) if engine.document_embeddings is not None else 0,
+        "init_seconds": init_seconds,
+        "throughput_qps": throughput_qps,
+        "rss_after_init_mb": rss_after_init_mb,
+        "peak_rss_mb": peak_rss_mb()
+    })
+    
+    return {"overall": results["overall"], "performance": performance}
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the SHL recommendation engine")
+    parser.add_argument("--compare-models", nargs="+", default=None, metavar="MODEL",
+                        help="Compare these sentence-transformer models instead of evaluating the default engine")
+    parser.add_argument("--backends", nargs="+", default=["torch"],
+                        help="Inference backends to compare each model on (torch, onnx, openvino)")
+    parser.add_argument("--compare-preprocessing", action="store_true",
+                        help="Compare query preprocessing on and off, on clean and boilerplate-wrapped queries")
+    args = parser.parse_args()
+    
     # Create evaluator
     evaluator = RecommendationEvaluator(
         test_data_path="data/test_data.json",
-        output_dir="evaluation_results"
+        output_dir="evaluation_results",
+        create_engine=not (args.compare_models or args.compare_preprocessing)
     )
     
+    if args.compare_preprocessing:
+        evaluator.compare_query_preprocessing()
+        raise SystemExit(0)
+    
+    if args.compare_models:
+        evaluator.compare_models([
+            {"model_name": model_name, "backend": backend}
+            for model_name in args.compare_models
+            for backend in args.backends
+        ])
+        raise SystemExit(0)
+    
     # Run evaluation
     results = evaluator.evaluate(k_values=[3, 5, 10])
     
@@ -614,7 +1019,7 @@ if __name__ == "__main__":
     # Save results
     evaluator.save_evaluation_results(results)
     
-    # Example optimization experiments (uncomment to run)
+    # Example optimization experiments (uncomment to run; each runs in its own process)
     # experiment_configs = [
     #     {
     #         "name": "Default_Model",
@@ -623,6 +1028,16 @@ if __name__ == "__main__":
     #     {
     #         "name": "MPNet_Model",
     #         "model_name": "sentence-transformers/all-mpnet-base-v2"
+    #     },
+    #     {
+    #         "name": "Hybrid_BM25_RRF",
+    #         "retrieval_mode": "hybrid"
+    #     },
+    #     {
+    #         "name": "Hybrid_BM25_Weighted",
+    #         "retrieval_mode": "hybrid",
+    #         "fusion": "weighted",
+    #         "lexical_weight": 0.3
     #     }
     # ]
     # optimization_results = evaluator.run_optimization_experiments(experiment_configs)
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Per-result explanations computed from precomputed term sets.
+
+When the catalog is loaded, the title and the description and test type of
+every assessment are tokenized into sets of normalized terms. Explaining a
+result is then a few set intersections with the query's terms plus a
+breakdown of the scores retrieval already computed: no model calls, so an
+explanation costs microseconds per result. The engine adds which of the
+query's filters each result satisfies (see
+SHLRecommendationEngine.explain).
+"""
+
+import re
+from typing import List, Dict, Any, Iterable, Optional
+
+from query_preprocessor import WORD_RE
+
+# Words that carry no meaning for matching queries to assessments
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "for", "to", "in", "on", "at", "by", "with", "from",
+    "as", "is", "are", "be", "was", "were", "been", "it", "its", "this", "that", "these", "those",
+    "i", "me", "my", "we", "our", "you", "your", "they", "their", "who", "what", "which", "can",
+    "could", "should", "would", "will", "also", "about", "some", "any", "all", "more", "most",
+    "very", "into", "than", "then", "there", "so", "not", "no", "yes", "do", "does", "have", "has",
+    "am", "if", "them", "he", "she", "her", "his", "up", "out", "each", "other", "such",
+    # Words every query or assessment uses
+    "assessment", "assessments", "test", "tests", "candidate", "candidates", "looking", "want",
+    "need", "needs", "hire", "hiring", "role", "job", "company", "give", "find", "suggest",
+    "option", "options", "new", "minute", "minutes", "min", "mins", "hour", "hours", "long",
+    "completed", "complete", "within", "under", "max", "maximum", "required", "shl"
+}
+
+
+def normalize_term(word: str) -> str:
+    """Lowercase a word and reduce a plural to its singular form."""
+    word = word.lower()
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "is", "us")):
+        return word[:-1]
+    return word
+
+
+def term_set(text: str) -> frozenset:
+    """Normalized content terms of a text."""
+    return frozenset(
+        normalize_term(word) for word in WORD_RE.findall((text or "").lower())
+        if len(word) > 1 and word not in STOPWORDS
+    )
+
+
+def highlight_terms(text: str, terms: Iterable[str], marker: str = "**") -> str:
+    """
+    Wrap the words of a text whose normalized form is in `terms` in a marker.
+
+    Args:
+        text: Text to highlight
+        terms: Normalized terms (see normalize_term)
+        marker: String placed before and after each matching word (Markdown bold by default)
+
+    Returns:
+        The text with matching words highlighted
+    """
+    terms = set(terms)
+    if not terms or not text:
+        return text or ""
+    return re.sub(
+        r"[A-Za-z0-9][A-Za-z0-9+#]*",
+        lambda match: f"{marker}{match.group(0)}{marker}" if normalize_term(match.group(0)) in terms else match.group(0),
+        text
+    )
+
+
+class ResultExplainer:
+    def __init__(self, assessments: List[Dict[str, Any]], skill_terms: Iterable[str] = ()):
+        """
+        Precompute the term sets of a catalog.
+
+        Args:
+            assessments: Catalog assessments; an assessment's id is its position
+            skill_terms: Terms reported as matched skills rather than keywords
+                         (see query_preprocessor.catalog_terms)
+        """
+        self.title_terms = [term_set(a.get("title", "")) for a in assessments]
+        self.content_terms = [
+            term_set(f"{a.get('description', '')} {a.get('test_type', '')}") | title_terms
+            for a, title_terms in zip(assessments, self.title_terms)
+        ]
+        self.skill_terms = {normalize_term(term) for term in skill_terms}
+
+    def query_terms(self, query: str) -> Dict[str, str]:
+        """
+        Content terms of a query.
+
+        Returns:
+            Mapping of normalized term to the word used in the query, in query order
+        """
+        terms = {}
+        for word in WORD_RE.findall(query.lower()):
+            if len(word) > 1 and word not in STOPWORDS:
+                terms.setdefault(normalize_term(word), word)
+        return terms
+
+    def explain(self, query_terms: Dict[str, str], recommendation: Dict[str, Any],
+                assessment_id: Optional[int]) -> Dict[str, Any]:
+        """
+        Explain one recommendation.
+
+        Args:
+            query_terms: Terms of the query (see query_terms)
+            recommendation: Recommendation with its retrieval scores
+            assessment_id: Catalog position of the recommended assessment
+                           (None if it is not in the catalog)
+
+        Returns:
+            Dictionary with the "matched_skills" and "matched_keywords" (as written
+            in the query), the normalized "matched_terms" (for highlighting),
+            the terms found in the title ("title_matches") and the "scores"
+        """
+        if assessment_id is None:
+            title_terms = term_set(recommendation.get("title", ""))
+            content_terms = title_terms | term_set(recommendation.get("test_type", ""))
+        else:
+            title_terms = self.title_terms[assessment_id]
+            content_terms = self.content_terms[assessment_id]
+
+        matched = [term for term in query_terms if term in content_terms]
+
+        # Scores retrieval computed; embeddings are normalized, so cosine = 1 - d^2 / 2
+        scores = {"semantic_similarity": 1.0 - recommendation.get("similarity_score", 2.0) / 2.0}
+        if "fusion_score" in recommendation:
+            scores["fusion"] = recommendation["fusion_score"]
+        if "rerank_score" in recommendation:
+            scores["rerank"] = recommendation["rerank_score"]
+        scores["term_overlap"] = len(matched) / len(query_terms) if query_terms else 0.0
+
+        return {
+            "matched_skills": [query_terms[term] for term in matched if term in self.skill_terms],
+            "matched_keywords": [query_terms[term] for term in matched if term not in self.skill_terms],
+            "matched_terms": matched,
+            "title_matches": [query_terms[term] for term in matched if term in title_terms],
+            "scores": {name: float(value) for name, value in scores.items()}
+        }
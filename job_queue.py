@@ -0,0 +1,367 @@
+"""
+Background job queue for slow (URL-based) recommendation requests.
+
+Jobs are persisted in a local SQLite database and processed by a pool of
+worker threads, so a request returns a job id immediately and the client
+polls for the result. Every process using the same database file (e.g. the
+workers of `uvicorn --workers N` or serve.py) shares one queue:
+
+- Identical requests submitted while a matching job is still queued or
+  running get that job's id instead of a new job; the check and the insert
+  run in one write transaction on the stored request key.
+- A process claims a queued job with a conditional UPDATE, so exactly one
+  process runs it, and holds it under a lease that it renews while the job
+  runs. A job whose lease expires (its process died) is claimed again by
+  the next process that polls, up to max_attempts times. A supervisor that
+  sees a worker die (serve.py) re-queues its jobs right away instead.
+- Finished jobs older than the retention period are purged periodically.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+import logging
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+from metrics import JOBS_SUBMITTED, JOBS_FINISHED
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Columns added after the first release of the jobs table (migrated on open)
+LEASE_COLUMNS = {"worker": "TEXT", "lease_until": "REAL", "attempts": "INTEGER NOT NULL DEFAULT 0"}
+
+
+def worker_id(pid: int = None) -> str:
+    """Identify a process (this one by default) among those sharing a job database."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+class JobStore:
+    def __init__(self, path: str = "data/jobs.db"):
+        """
+        Open (or create) the job database.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._open()
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                request_key TEXT NOT NULL,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+        for column, definition in LEASE_COLUMNS.items():
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        # Jobs a process left running before leases existed can be claimed right away
+        self._connection.execute("UPDATE jobs SET lease_until = 0 WHERE status = ? AND lease_until IS NULL", (RUNNING,))
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_request_key ON jobs (request_key, status)")
+
+    def _open(self) -> None:
+        """Open the connection (again in a forked process, which must not share its parent's)."""
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+
+    def _transaction(self, statements):
+        """Run a function on the connection in an immediate (write-locked) transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._connection)
+                self._connection.execute("COMMIT")
+                return result
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def create_or_join(self, request_key: str, request: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Create a queued job, unless an identical one is still queued or running.
+
+        Returns:
+            The job id and whether a new job was created
+        """
+        def statements(connection):
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE request_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (request_key, QUEUED, RUNNING)
+            ).fetchone()
+            if row is not None:
+                return row[0], False
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            connection.execute(
+                "INSERT INTO jobs (id, request_key, request, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, request_key, json.dumps(request), QUEUED, now, now)
+            )
+            return job_id, True
+        return self._transaction(statements)
+
+    def claim(self, worker: str, lease_seconds: float, max_attempts: int) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Claim the oldest job that is queued or whose lease has expired.
+
+        Jobs whose lease expired, or that were released by a dead worker, after
+        max_attempts claims are marked failed instead (their runs keep killing
+        the worker).
+
+        Returns:
+            (job id, request) of the claimed job, or None if there is none
+        """
+        def statements(connection):
+            now = time.time()
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE (status = ? OR (status = ? AND lease_until < ?)) AND attempts >= ?",
+                (FAILED, "The job's worker stopped before finishing it", now, QUEUED, RUNNING, now, max_attempts)
+            )
+            row = connection.execute(
+                "SELECT id, request FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (RUNNING, worker, now + lease_seconds, now, row[0])
+            )
+            return row[0], json.loads(row[1])
+        return self._transaction(statements)
+
+    def renew(self, job_ids: List[str], worker: str, lease_seconds: float) -> None:
+        """Extend the leases this worker holds on running jobs."""
+        if not job_ids:
+            return
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self._lock:
+            self._connection.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE worker = ? AND status = ? AND id IN ({placeholders})",
+                (time.time() + lease_seconds, worker, RUNNING, *job_ids)
+            )
+
+    def release_worker(self, worker: str) -> int:
+        """
+        Re-queue the running jobs of a worker known to be dead, without waiting for their leases to expire.
+
+        Returns:
+            Number of re-queued jobs
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE worker = ? AND status = ?",
+                (QUEUED, time.time(), worker, RUNNING)
+            )
+        return cursor.rowcount
+
+    def finish(self, job_id: str, worker: str, status: str, result: Dict[str, Any] = None,
+               error: str = None) -> bool:
+        """
+        Record the outcome of a job this worker holds.
+
+        Returns:
+            False if the job's lease was lost (another worker has claimed it since)
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, worker, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job as a dictionary, or None if it doesn't exist."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, status, result, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] else None,
+            "error": row[3],
+            "created_at": row[4],
+            "updated_at": row[5]
+        }
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete finished jobs last updated more than older_than_seconds ago."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, time.time() - older_than_seconds)
+            )
+        return cursor.rowcount
+
+
+class JobQueue:
+    def __init__(self, store: JobStore, handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 workers: int = 4, retention_seconds: float = 7 * 24 * 3600, lease_seconds: float = 60,
+                 poll_interval: float = 1.0, purge_interval: float = 3600, max_attempts: int = 3,
+                 start: bool = True):
+        """
+        Initialize the queue.
+
+        Args:
+            store: Persistent job store
+            handler: Blocking function computing a job's result from its request;
+                     an exception marks the job as failed with its message
+            workers: Worker threads
+            retention_seconds: How long finished jobs are kept
+            lease_seconds: How long a claimed job stays with this process without a
+                           renewal (renewed every lease_seconds / 3 while it runs)
+            poll_interval: Seconds between checks for jobs submitted by other processes
+                           or left behind by dead ones
+            purge_interval: Seconds between purges of expired jobs
+            max_attempts: Claims after which a job whose worker keeps dying is failed
+            start: Whether to start processing now; a process that forks workers
+                   defers this to the workers by calling start() there
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self.max_attempts = max_attempts
+        self._reset()
+
+        # A forked worker gets its own threads and database connection, and no running jobs
+        queue_ref = weakref.ref(self)
+        def after_fork():
+            queue = queue_ref()
+            if queue is not None:
+                queue.store._open()
+                queue._reset()
+        os.register_at_fork(after_in_child=after_fork)
+
+        if start:
+            self.start()
+
+    def _reset(self) -> None:
+        """Set up this process's (not yet started) dispatcher state."""
+        self.worker = worker_id()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recommend-job")
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dispatcher = None
+
+    def start(self) -> None:
+        """Start claiming and running jobs in this process (once)."""
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            self._dispatcher = threading.Thread(target=self._dispatch, name="recommend-job-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    @staticmethod
+    def request_key(request: Dict[str, Any]) -> str:
+        """Identify identical requests."""
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def submit(self, request: Dict[str, Any]) -> str:
+        """
+        Queue a job, or join an identical job that is still queued or running.
+
+        Returns:
+            Job id
+        """
+        job_id, created = self.store.create_or_join(self.request_key(request), request)
+        JOBS_SUBMITTED.inc(deduplicated="false" if created else "true")
+        if created:
+            self._wake.set()
+        return job_id
+
+    def _dispatch(self) -> None:
+        """Claim jobs while worker threads are free, renew leases and purge expired jobs."""
+        last_renewal = last_purge = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now - last_purge >= self.purge_interval:
+                    purged = self.store.purge(self.retention_seconds)
+                    if purged:
+                        logger.info(f"Purged {purged} expired jobs")
+                    last_purge = now
+
+                if now - last_renewal >= self.lease_seconds / 3:
+                    with self._lock:
+                        running = list(self._running)
+                    self.store.renew(running, self.worker, self.lease_seconds)
+                    last_renewal = now
+
+                while True:
+                    with self._lock:
+                        if len(self._running) >= self.workers:
+                            break
+                    claimed = self.store.claim(self.worker, self.lease_seconds, self.max_attempts)
+                    if claimed is None:
+                        break
+                    job_id, request = claimed
+                    with self._lock:
+                        self._running.add(job_id)
+                    self._executor.submit(self._run, job_id, request)
+            except Exception as e:
+                logger.error(f"Job dispatcher error: {e}")
+
+            self._wake.wait(min(self.poll_interval, self.lease_seconds / 3))
+            self._wake.clear()
+
+    def _run(self, job_id: str, request: Dict[str, Any]) -> None:
+        """Process one claimed job on a worker thread."""
+        try:
+            try:
+                result = self.handler(request)
+                status, error = SUCCEEDED, None
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                result, status, error = None, FAILED, str(e)
+
+            if self.store.finish(job_id, self.worker, status, result=result, error=error):
+                JOBS_FINISHED.inc(status=status)
+            else:
+                logger.warning(f"Job {job_id} finished after its lease was lost; dropping this result")
+        except Exception as e:
+            logger.error(f"Could not record the outcome of job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+            # A worker thread is free again
+            self._wake.set()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status and, once finished, its result or error."""
+        return self.store.get(job_id)
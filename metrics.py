@@ -0,0 +1,325 @@
+"""
+Lightweight in-process metrics for the SHL Assessment Recommendation System.
+
+Provides thread-safe counters and histograms that can be rendered in the
+Prometheus text exposition format, plus a `time_stage` context manager for
+timing hot-path stages of the recommendation pipeline.
+
+Metrics live in process memory. When several worker processes serve the
+API (serve.py or `uvicorn --workers N`), set SHL_METRICS_DIR to an empty
+directory shared by the workers: each worker then writes its metrics there
+every second (see MultiprocessMetrics) and /metrics, whichever worker
+answers it, reports the sum over all workers, including ones that have
+exited, so counters never go backwards.
+"""
+
+import os
+import json
+import time
+import uuid
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, List, Dict, Tuple, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets in seconds (1 ms .. 10 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    """Format label pairs as {name="value",...}."""
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Unlabeled counters are exported as 0 before the first increment
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0.0}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value for the given label values."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def reset(self) -> None:
+        """Forget every value."""
+        with self._lock:
+            self._values = {} if self.labelnames else {(): 0.0}
+
+    def dump(self) -> list:
+        """JSON-serializable values, for merging into another process's render."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def render(self, others: Sequence[list] = ()) -> List[str]:
+        """Render the counter, adding the values dumped by other processes."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for dumped in others:
+            for key, value in dumped:
+                key = tuple(key)
+                values[key] = values.get(key, 0.0) + value
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation for the given label values."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """Count and sum of observations for the given label values."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": series[2], "sum": series[1]}
+
+    def snapshots(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Count and sum of observations of every label set seen so far."""
+        with self._lock:
+            return {key: {"count": s[2], "sum": s[1]} for key, s in self._series.items()}
+
+    def reset(self) -> None:
+        """Forget every observation."""
+        with self._lock:
+            self._series = {}
+
+    def dump(self) -> list:
+        """JSON-serializable series, for merging into another process's render."""
+        with self._lock:
+            return [[list(key), list(s[0]), s[1], s[2]] for key, s in self._series.items()]
+
+    def render(self, others: Sequence[list] = ()) -> List[str]:
+        """Render the histogram, adding the series dumped by other processes."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: [list(s[0]), s[1], s[2]] for key, s in self._series.items()}
+        for dumped in others:
+            for key, bucket_counts, total, count in dumped:
+                # Series recorded with other buckets can't be merged
+                if len(bucket_counts) != len(self.buckets) + 1:
+                    continue
+                merged = series.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], bucket_counts)]
+                merged[1] += total
+                merged[2] += count
+        items = sorted((key, (s[0], s[1], s[2])) for key, s in series.items())
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering returns the existing metric (e.g. on module reload)
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def reset(self) -> None:
+        """Forget every recorded value (e.g. warm-up traffic before workers are forked)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def dump(self) -> Dict[str, list]:
+        """JSON-serializable values of every metric, by metric name."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.dump() for metric in metrics}
+
+    def render(self, others: Sequence[Dict[str, list]] = ()) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            others: Dumps of the same metrics from other processes, added to this one's values
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render([dump[metric.name] for dump in others if metric.name in dump]))
+        return "\n".join(lines) + "\n"
+
+
+class MultiprocessMetrics:
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 1.0):
+        """
+        Share a registry's metrics between the worker processes of one server.
+
+        Args:
+            registry: This process's metrics
+            directory: Directory shared by the workers (empty when the server starts)
+            interval: Seconds between writes of this process's metrics
+        """
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._path = None
+
+    def start(self) -> None:
+        """Start writing this process's metrics (call once per process, after forking)."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Unique per process start, so a reused pid never overwrites an exited worker's totals
+        self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+        self.write()
+        threading.Thread(target=self._write_periodically, name="metrics-writer", daemon=True).start()
+
+    def write(self) -> None:
+        """Write this process's metrics atomically."""
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.dump(), f)
+        os.replace(tmp_path, self._path)
+
+    def _write_periodically(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self._path}: {e}")
+
+    def _other_dumps(self) -> List[Dict[str, Any]]:
+        dumps = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == self._path:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    dumps.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics file {path}: {e}")
+        return dumps
+
+    def render(self) -> str:
+        """Render the metrics summed over every worker (this one's current values included)."""
+        if self._path is None:
+            return self.registry.render()
+        return self.registry.render(self._other_dumps())
+
+
+# Process-wide registry and the metrics shared by the engine and the API
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "shl_stage_duration_seconds",
+    "Time spent in each stage of the recommendation pipeline",
+    ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "shl_request_duration_seconds",
+    "End-to-end API request latency",
+    ["endpoint", "status"]
+)
+CACHE_HITS = REGISTRY.counter("shl_cache_hits_total", "Cache lookups that were served from cache", ["cache"])
+CACHE_MISSES = REGISTRY.counter("shl_cache_misses_total", "Cache lookups that had to be computed", ["cache"])
+UNFILTERED_FALLBACKS = REGISTRY.counter(
+    "shl_unfiltered_fallback_total",
+    "Auto-filtered recommendations that fell back to unfiltered results"
+)
+URL_FETCH_FAILURES = REGISTRY.counter("shl_url_fetch_failures_total", "Failed job description URL fetches")
+RERANK_BUDGET_EXCEEDED = REGISTRY.counter(
+    "shl_rerank_budget_exceeded_total",
+    "Re-ranking requests that were skipped or truncated to fit the latency budget",
+    ["action"]
+)
+SEMANTIC_CACHE_OVERLAP = REGISTRY.histogram(
+    "shl_semantic_cache_overlap",
+    "Fraction of fresh results also present in the semantic cache hit, on verified hits",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+)
+JOBS_SUBMITTED = REGISTRY.counter(
+    "shl_jobs_submitted_total",
+    "Recommendation jobs submitted, by whether they joined an identical in-flight job",
+    ["deduplicated"]
+)
+JOBS_FINISHED = REGISTRY.counter("shl_jobs_finished_total", "Recommendation jobs finished, by status", ["status"])
+COALESCED_REQUESTS = REGISTRY.counter(
+    "shl_coalesced_requests_total",
+    "Calls that waited for an identical in-flight computation instead of running their own",
+    ["operation"]
+)
+RATE_LIMITED = REGISTRY.counter(
+    "shl_rate_limited_requests_total", "Requests rejected with 429, by the limit they exceeded", ["reason"]
+)
+CATALOG_LOADS = REGISTRY.counter("shl_catalog_loads_total", "Catalog engines loaded on demand", ["catalog"])
+CATALOG_EVICTIONS = REGISTRY.counter(
+    "shl_catalog_evictions_total", "Idle catalog engines evicted to stay under the memory cap", ["catalog"]
+)
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Time the enclosed block and record it under the given pipeline stage."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start_time, stage=stage)
@@ -0,0 +1,114 @@
+"""
+Precomputed k-nearest-neighbor graph over the catalog embeddings.
+
+Built offline in one vectorized pass (row blocks of a single similarity
+matrix product, with argpartition for the top k), and saved as a compact
+.npz next to the FAISS index: an N x k int32 array of neighbor ids and an
+N x k float32 array of cosine similarities. Serving "similar assessments"
+is then a row lookup, with no model call or vector search.
+
+Run as a script to (re)build the graph for an existing saved index:
+
+    python neighbor_graph.py --index data/faiss_index --k 10
+"""
+
+import os
+import json
+import logging
+import argparse
+import numpy as np
+from typing import Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_FILE = "neighbors.npz"
+
+
+def build_neighbor_graph(embeddings: np.ndarray, k: int = 10,
+                         block_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k most similar documents for every document.
+
+    Args:
+        embeddings: Normalized document embeddings (N x d)
+        k: Neighbors per document (capped at N - 1)
+        block_size: Rows of the similarity matrix computed at a time, which
+                    bounds memory at block_size x N floats
+
+    Returns:
+        Tuple of neighbor ids (N x k, int32) and cosine similarities
+        (N x k, float32), each row ordered most similar first
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    num_docs = embeddings.shape[0]
+    k = max(0, min(k, num_docs - 1))
+    neighbors = np.empty((num_docs, k), dtype=np.int32)
+    scores = np.empty((num_docs, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    for start in range(0, num_docs, block_size):
+        end = min(start + block_size, num_docs)
+        similarity = embeddings[start:end] @ embeddings.T
+        # A document is not its own neighbor
+        similarity[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+
+        neighbors[start:end] = np.take_along_axis(top, order, axis=1)
+        scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbors, scores
+
+
+def save_neighbor_graph(path: str, neighbors: np.ndarray, scores: np.ndarray, index_version: str) -> None:
+    """Save a neighbor graph with the index version it was built from."""
+    np.savez(path, neighbors=neighbors, scores=scores, index_version=np.array(index_version or ""))
+
+
+def load_neighbor_graph(path: str, index_version: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load a neighbor graph saved with save_neighbor_graph().
+
+    Returns:
+        Tuple of neighbor ids and similarities, or None if the file is missing
+        or was built from a different index version
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if index_version is not None and str(data["index_version"]) != index_version:
+            return None
+        return data["neighbors"], data["scores"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the similar-assessments graph for a saved FAISS index")
+    parser.add_argument("--index", default="data/faiss_index", help="Directory of the saved FAISS index")
+    parser.add_argument("--k", type=int, default=10, help="Neighbors per assessment")
+    args = parser.parse_args()
+
+    import faiss
+
+    index = faiss.read_index(os.path.join(args.index, "index.faiss"))
+    embeddings = index.reconstruct_n(0, index.ntotal)
+
+    index_version = None
+    try:
+        with open(os.path.join(args.index, "manifest.json"), 'r', encoding='utf-8') as f:
+            index_version = json.load(f).get("index_version")
+    except (OSError, ValueError):
+        logger.warning("No index manifest found; the graph will not be tied to an index version")
+
+    neighbors, scores = build_neighbor_graph(embeddings, k=args.k)
+    output_path = os.path.join(args.index, NEIGHBORS_FILE)
+    save_neighbor_graph(output_path, neighbors, scores, index_version)
+    logger.info(f"Saved {neighbors.shape[1]}-nearest-neighbor graph for {neighbors.shape[0]} assessments to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
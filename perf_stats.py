@@ -0,0 +1,40 @@
+"""
+Latency and memory summaries shared by the evaluator and the benchmark suite.
+
+Kept free of heavy imports so that short-lived measurement processes (e.g.
+the evaluator's cold-start child) can use it without loading the engine.
+"""
+
+import resource
+import numpy as np
+from typing import List, Dict
+
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    """
+    Summarize timing samples.
+    
+    Args:
+        samples_s: Durations in seconds
+        
+    Returns:
+        Dictionary of millisecond statistics (mean, p50, p95, p99, max)
+    """
+    if not samples_s:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    
+    samples_ms = np.asarray(samples_s) * 1000
+    return {
+        "count": int(samples_ms.size),
+        "mean_ms": float(samples_ms.mean()),
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "max_ms": float(samples_ms.max())
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB."""
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
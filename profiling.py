@@ -0,0 +1,157 @@
+"""
+Opt-in per-request profiling for the SHL Assessment Recommendation API.
+
+A request is profiled when profiling is enabled and either the client sends
+the `X-Profile: 1` header or the request is picked by random sampling. The
+profile is captured with pyinstrument (a low-overhead sampling profiler)
+when it is installed, falling back to cProfile otherwise, and written to
+disk named after the request id.
+
+Configuration (environment variables):
+    SHL_PROFILING_ENABLED      "1" to honour the X-Profile header
+    SHL_PROFILE_SAMPLE_RATE    Fraction of requests to profile (default 0)
+    SHL_PROFILE_DIR            Directory for profile artifacts (default "profiles")
+    SHL_PROFILE_MAX_FILES      Number of artifacts to keep (default 200)
+    SHL_PROFILE_INTERVAL       Sampling interval in seconds (default 0.001)
+"""
+
+import os
+import re
+import time
+import random
+import logging
+import cProfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+try:
+    from pyinstrument import Profiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+_SAFE_REQUEST_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class RequestProfiler:
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.0,
+                 output_dir: str = "profiles", max_files: int = 200,
+                 interval: float = 0.001):
+        """
+        Initialize the request profiler.
+
+        Args:
+            enabled: Whether clients may request profiling with the X-Profile header
+            sample_rate: Fraction of requests profiled at random (0 disables sampling)
+            output_dir: Directory where profile artifacts are written
+            max_files: Maximum number of artifacts kept; the oldest are deleted
+            interval: Sampling interval of the profiler in seconds
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.interval = interval
+        # Only one profiler can sample the process at a time
+        self._active = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        """Create a profiler configured from SHL_PROFILE_* environment variables."""
+        return cls(
+            enabled=os.getenv("SHL_PROFILING_ENABLED", "0") == "1",
+            sample_rate=float(os.getenv("SHL_PROFILE_SAMPLE_RATE", "0")),
+            output_dir=os.getenv("SHL_PROFILE_DIR", "profiles"),
+            max_files=int(os.getenv("SHL_PROFILE_MAX_FILES", "200")),
+            interval=float(os.getenv("SHL_PROFILE_INTERVAL", "0.001"))
+        )
+
+    def should_profile(self, headers: Mapping[str, str]) -> bool:
+        """Decide whether to profile a request with the given headers."""
+        if self.enabled and headers.get(PROFILE_HEADER, "") == "1":
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def safe_request_id(request_id: Optional[str]) -> Optional[str]:
+        """Return the request id if it is safe to use in a file name, else None."""
+        if request_id and _SAFE_REQUEST_ID.match(request_id):
+            return request_id
+        return None
+
+    @contextmanager
+    def profile(self, request_id: str):
+        """
+        Profile the enclosed block and save the result under the request id.
+
+        Only the thread that enters the block is sampled, so enter it in the
+        thread doing the work (see run), not around an await of the threadpool.
+        If another request is already being profiled, the block runs unprofiled.
+
+        Yields:
+            Path the artifact will be written to, or None if not profiled
+        """
+        if not self._active.acquire(blocking=False):
+            yield None
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        extension = "html" if PYINSTRUMENT_AVAILABLE else "prof"
+        output_path = os.path.join(self.output_dir, f"{timestamp}_{request_id}.{extension}")
+
+        if PYINSTRUMENT_AVAILABLE:
+            profiler = Profiler(interval=self.interval, async_mode="disabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            yield output_path
+        finally:
+            try:
+                if PYINSTRUMENT_AVAILABLE:
+                    profiler.stop()
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(profiler.output_html())
+                else:
+                    profiler.disable()
+                    profiler.dump_stats(output_path)
+                logger.info(f"Saved profile for request {request_id} to {output_path}")
+                self._prune()
+            except Exception as e:
+                logger.error(f"Error saving profile for request {request_id}: {e}")
+            finally:
+                self._active.release()
+
+    def run(self, request_id: str, fn: Callable, *args) -> Tuple[Any, Optional[str]]:
+        """
+        Call fn(*args) under the profiler, on the calling thread.
+
+        Meant to be run in the threadpool (e.g. with run_in_threadpool), so the
+        thread doing the request's work is the one sampled.
+
+        Returns:
+            fn's result and the path of the saved profile (None if not profiled)
+        """
+        with self.profile(request_id) as profile_path:
+            return fn(*args), profile_path
+
+    def _prune(self) -> None:
+        """Delete the oldest artifacts beyond max_files."""
+        try:
+            files = sorted(
+                (os.path.join(self.output_dir, name) for name in os.listdir(self.output_dir)),
+                key=os.path.getmtime
+            )
+            for path in files[:max(0, len(files) - self.max_files)]:
+                os.remove(path)
+        except Exception as e:
+            logger.warning(f"Error pruning profiles in {self.output_dir}: {e}")
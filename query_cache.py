@@ -0,0 +1,136 @@
+"""
+Semantic cache of recent recommendation results.
+
+Keeps the normalized embeddings of recent queries in a fixed-size ring
+buffer. A lookup is one matrix-vector product against that buffer (a few
+thousand rows at most, so exact search is cheaper than maintaining an
+approximate index), and a hit returns the stored results when the closest
+earlier query is within the cosine threshold and was made with the same
+parameters and filters. A sampled fraction of hits can be verified against
+freshly computed results to measure how much quality the cache costs.
+"""
+
+import time
+import random
+import threading
+import numpy as np
+from typing import List, Dict, Any, Hashable, Optional
+
+from metrics import CACHE_HITS, CACHE_MISSES, SEMANTIC_CACHE_OVERLAP
+
+
+class SemanticQueryCache:
+    def __init__(self, threshold: float = 0.95, capacity: int = 1024,
+                 ttl_seconds: float = 3600, verify_rate: float = 0.0):
+        """
+        Initialize the cache. Storage is allocated on the first insert.
+
+        Args:
+            threshold: Minimum cosine similarity between queries for a hit
+            capacity: Maximum number of cached queries (oldest are overwritten)
+            ttl_seconds: Age after which an entry no longer matches
+            verify_rate: Fraction of hits to re-compute for the drift metric
+        """
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.verify_rate = verify_rate
+        self._vectors = None
+        self._context_keys = np.zeros(capacity, dtype=np.int64)
+        self._inserted_at = np.full(capacity, -np.inf)
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * capacity
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context_key(context: Hashable) -> int:
+        return hash(context)
+
+    def lookup(self, embedding, context: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """
+        Find cached results for a query.
+
+        Args:
+            embedding: Normalized query embedding
+            context: Parameters and filters the results depend on; only entries
+                     with an equal context can match
+
+        Returns:
+            Copy of the cached results, or None on a miss
+        """
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        context_key = self._context_key(context)
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query_vector.shape[0]:
+                CACHE_MISSES.inc(cache="semantic_query")
+                return None
+
+            similarity = self._vectors @ query_vector
+            valid = (self._context_keys == context_key) & \
+                    (self._inserted_at >= time.monotonic() - self.ttl_seconds)
+            similarity[~valid] = -np.inf
+            best = int(np.argmax(similarity))
+
+            if similarity[best] < self.threshold:
+                CACHE_MISSES.inc(cache="semantic_query")
+                return None
+
+            CACHE_HITS.inc(cache="semantic_query")
+            return [dict(result) for result in self._results[best]]
+
+    def insert(self, embedding, context: Hashable, results: List[Dict[str, Any]]) -> None:
+        """Store the results of a query, overwriting the oldest entry when full."""
+        query_vector = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query_vector.shape[0]:
+                self._vectors = np.zeros((self.capacity, query_vector.shape[0]), dtype=np.float32)
+                self._inserted_at[:] = -np.inf
+
+            position = self._next % self.capacity
+            self._vectors[position] = query_vector
+            self._context_keys[position] = self._context_key(context)
+            self._inserted_at[position] = time.monotonic()
+            self._results[position] = [dict(result) for result in results]
+            self._next += 1
+
+    def should_verify(self) -> bool:
+        """Decide whether a hit should also be re-computed to measure drift."""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    @staticmethod
+    def record_drift(cached: List[Dict[str, Any]], fresh: List[Dict[str, Any]]) -> float:
+        """
+        Record how many of the fresh results the cache hit would have returned.
+
+        Returns:
+            Overlap between the two result lists (1.0 means identical sets)
+        """
+        fresh_urls = {result["url"] for result in fresh}
+        if not fresh_urls:
+            overlap = 1.0
+        else:
+            overlap = len(fresh_urls & {result["url"] for result in cached}) / len(fresh_urls)
+        SEMANTIC_CACHE_OVERLAP.observe(overlap)
+        return overlap
+
+    def clear(self) -> None:
+        """Drop every cached entry (e.g. after the index is rebuilt)."""
+        with self._lock:
+            self._inserted_at[:] = -np.inf
+            self._results = [None] * self.capacity
+            self._next = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate and size of the cache."""
+        hits = CACHE_HITS.value(cache="semantic_query")
+        misses = CACHE_MISSES.value(cache="semantic_query")
+        with self._lock:
+            size = min(self._next, self.capacity)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size": size
+        }
@@ -0,0 +1,200 @@
+"""
+Query preprocessing before encoding.
+
+Queries built from fetched job pages carry navigation menus, cookie banners
+and footers, and pasted job descriptions repeat company blurbs ("Join a
+community that is shaping the future of work!"). All of it is encoded along
+with the requirements, costs encoder time (attention is quadratic in the
+number of tokens) and pulls the query embedding away from what is asked for.
+
+The preprocessor:
+1. normalizes Unicode and whitespace and splits the text into sentences
+   (at line breaks and sentence punctuation);
+2. drops boilerplate sentences (cookie, legal, navigation, sharing and
+   recruiting-blurb phrases) and, in multi-line text, short lines without
+   sentence punctuation (menu items) that mention no skill, role or duration;
+3. drops repeated sentences;
+4. if the text is still longer than the word cap, keeps the sentences with
+   the most salient phrases (catalog skills, job roles and durations) that
+   fit, in their original order.
+
+If nothing survives, the original query is used.
+"""
+
+import re
+import unicodedata
+from typing import List, Dict, Any, Iterable, Set, Tuple
+
+# Sentences matching any of these are page furniture or recruiting blurbs
+BOILERPLATE_PATTERNS = [
+    r"\bcookies?\b",
+    r"\bprivacy (policy|notice|statement|settings)\b",
+    r"\bterms (of|and) (use|service|conditions)\b",
+    r"\ball rights reserved\b",
+    r"©|\bcopyright\b",
+    r"\bskip to (main )?(content|navigation)\b",
+    r"\b(sign|log) (in|up)\b|\bsubscribe\b|\bcreate an account\b",
+    r"\bfollow us\b|\bshare (this|on)\b|\blike us on\b",
+    r"\b(enable|disabled?) javascript\b|\b(update|upgrade) your browser\b",
+    r"\bback to (top|jobs|search|results)\b",
+    r"\bapply (now|today|for this job)\b|\bsave (this )?job\b",
+    r"\bequal (employment )?opportunit(y|ies) employer\b",
+    r"\bjoin (a|our) (community|team|mission)\b",
+    r"\bshaping the future of\b",
+    r"\bwe are an? (global|leading|fast[- ]growing)\b|\bour (culture|values|mission)\b",
+    r"\b(people science|people answers)\b",
+]
+BOILERPLATE_RE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+ROLE_RE = re.compile(
+    r"\b(developers?|engineers?|analysts?|managers?|administrators?|assistants?|consultants?|"
+    r"designers?|writers?|representatives?|specialists?|associates?|architects?|testers?|"
+    r"accountants?|clerks?|agents?|supervisors?|technicians?|scientists?|directors?|officers?|"
+    r"executives?|graduates?|interns?|leads?|coo|ceo|cfo|cto|qa)\b",
+    re.IGNORECASE
+)
+
+DURATION_RE = re.compile(
+    r"\b\d+(\.\d+)?\s*(-|to)?\s*(\d+\s*)?(min|mins|minutes?|hours?|hrs?)\b|\b(an|one|half an) hour\b",
+    re.IGNORECASE
+)
+
+# Title words that name the kind of product rather than a skill
+GENERIC_TITLE_WORDS = {
+    "new", "level", "entry", "advanced", "solution", "short", "form", "assessment", "test",
+    "job", "focused", "professional", "general", "international", "next", "generation",
+    "interactive", "ability", "the", "and", "for", "of", "shl", "verify", "fix"
+}
+
+# Test types and skills the engine's filters recognize (see extract_filters_from_query)
+BASE_SKILL_TERMS = {
+    "cognitive", "personality", "behavioral", "situational", "technical", "aptitude",
+    "java", "python", "sql", "sales", "leadership", "management", "english", "verbal",
+    "numerical", "reasoning"
+}
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def catalog_terms(assessments: List[Dict[str, Any]]) -> Set[str]:
+    """
+    Skill terms named by a catalog: the distinctive words of assessment titles.
+
+    Args:
+        assessments: Catalog assessments
+
+    Returns:
+        Lowercase terms, including the base skills and test types
+    """
+    terms = set(BASE_SKILL_TERMS)
+    for assessment in assessments:
+        for word in WORD_RE.findall(assessment.get("title", "").lower()):
+            if len(word) > 1 and not word.isdigit() and word not in GENERIC_TITLE_WORDS:
+                terms.add(word)
+    return terms
+
+
+class QueryPreprocessor:
+    def __init__(self, skill_terms: Iterable[str] = (), max_words: int = 128,
+                 min_fragment_words: int = 5):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            skill_terms: Lowercase skill terms (see catalog_terms)
+            max_words: Maximum number of words passed on to the encoder
+            min_fragment_words: In multi-line text, lines shorter than this without
+                                sentence punctuation or salient phrases are dropped
+                                as menu items
+        """
+        self.skill_terms = set(skill_terms) | BASE_SKILL_TERMS
+        self.max_words = max_words
+        self.min_fragment_words = min_fragment_words
+
+    def salient_phrases(self, text: str) -> Dict[str, List[str]]:
+        """
+        Find the skill, role and duration phrases in a text.
+
+        Returns:
+            Dictionary with "skills", "roles" and "durations" lists, in order of appearance
+        """
+        skills = [word for word in WORD_RE.findall(text.lower()) if word in self.skill_terms]
+        roles = [match.group(0).lower() for match in ROLE_RE.finditer(text)]
+        durations = [match.group(0) for match in DURATION_RE.finditer(text)]
+        return {
+            "skills": list(dict.fromkeys(skills)),
+            "roles": list(dict.fromkeys(roles)),
+            "durations": list(dict.fromkeys(durations))
+        }
+
+    def _salience(self, sentence: str) -> int:
+        return sum(len(phrases) for phrases in self.salient_phrases(sentence).values())
+
+    def _sentences(self, text: str) -> List[Tuple[str, bool]]:
+        """
+        Normalize the text and split it into non-empty sentences.
+
+        Returns:
+            (sentence, whether the sentence is a whole line) pairs
+        """
+        text = unicodedata.normalize("NFKC", text)
+        sentences = []
+        for line in text.splitlines():
+            line_sentences = [" ".join(sentence.split()) for sentence in SENTENCE_SPLIT_RE.split(line)]
+            line_sentences = [sentence for sentence in line_sentences if sentence]
+            sentences.extend((sentence, len(line_sentences) == 1) for sentence in line_sentences)
+        return sentences
+
+    def _is_menu_fragment(self, sentence: str) -> bool:
+        return (len(sentence.split()) < self.min_fragment_words
+                and not sentence.endswith((".", "!", "?", ":"))
+                and self._salience(sentence) == 0)
+
+    def process(self, query: str) -> str:
+        """
+        Clean a query for encoding.
+
+        Args:
+            query: Raw query text (typed, pasted or extracted from a page)
+
+        Returns:
+            The query without boilerplate and repetition, capped at max_words words
+        """
+        sentences = self._sentences(query)
+        multi_line = "\n" in query.strip()
+
+        kept = []
+        seen = set()
+        for sentence, whole_line in sentences:
+            if BOILERPLATE_RE.search(sentence):
+                continue
+            if multi_line and whole_line and self._is_menu_fragment(sentence):
+                continue
+            # Repeated sentences add tokens, not information
+            key = " ".join(WORD_RE.findall(sentence.lower()))
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(sentence)
+
+        if not kept:
+            return " ".join(query.split())
+
+        word_counts = [len(sentence.split()) for sentence in kept]
+        if sum(word_counts) <= self.max_words:
+            return " ".join(kept)
+
+        # Over the cap: take the most salient sentences that fit (earlier first on ties)
+        order = sorted(range(len(kept)), key=lambda i: (-self._salience(kept[i]), i))
+        selected = set()
+        budget = self.max_words
+        for i in order:
+            if word_counts[i] <= budget:
+                selected.add(i)
+                budget -= word_counts[i]
+
+        if not selected:
+            # Every sentence is longer than the cap: truncate the most salient one
+            return " ".join(kept[order[0]].split()[:self.max_words])
+        return " ".join(kept[i] for i in sorted(selected))
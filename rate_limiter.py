@@ -0,0 +1,399 @@
+"""
+Per-client rate limiting and concurrency quotas for the API.
+
+Every client gets a token bucket (a steady request rate with bursts up to
+the bucket size) and a cap on its requests in flight, so a batch script
+can't take all of the encoder's time from interactive users. Clients are
+identified by their X-API-Key when that key has a quota in the quotas
+file, otherwise by IP address. A rejected request gets a 429 with a
+Retry-After header; allowed requests carry X-RateLimit-Limit (the bucket
+size, i.e. the most requests a client can make at once) and
+X-RateLimit-Remaining.
+
+State is kept in a backend:
+- LocalRateLimitBackend keeps buckets in process memory (the default; each
+  worker process limits on its own);
+- SQLiteRateLimitBackend keeps them in a SQLite file, so every worker on a
+  host (e.g. the forked workers of serve.py) enforces one shared limit.
+  Its concurrency slots are leased, so a killed worker's slots free up; the
+  lease of a slot is renewed while its request (e.g. a long NDJSON stream)
+  is in flight.
+Any object with the same take/acquire_slot/renew_slot/release_slot methods
+can be used, e.g. one backed by a network store for limits across hosts.
+Backend calls run in the threadpool, off the event loop, unless the backend
+sets `blocking = False`.
+
+Configuration (see rate_limit_settings_from_env):
+    SHL_RATE_LIMIT            requests per second per client (0 disables rate limiting; default 10)
+    SHL_RATE_BURST            bucket size (default 20)
+    SHL_MAX_CONCURRENT        requests in flight per client (0 disables; default 4)
+    SHL_RATE_LIMIT_QUOTAS     JSON file of per-API-key quotas:
+                              {"<key>": {"rate": 50, "burst": 100, "concurrency": 16}}
+    SHL_RATE_LIMIT_DB         SQLite file for limits shared between processes
+    SHL_TRUST_FORWARDED_FOR   "1" to identify clients by X-Forwarded-For (behind a proxy)
+"""
+
+import os
+import json
+import math
+import time
+import asyncio
+import uuid
+import sqlite3
+import logging
+import weakref
+import threading
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from metrics import RATE_LIMITED
+from serialization import dumps
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Paths that are never limited (monitoring and documentation)
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+
+def _refill(tokens: float, updated_at: float, now: float, rate: float, burst: float) -> float:
+    """Tokens in a bucket after refilling it at `rate` per second since updated_at."""
+    return min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _retry_after(tokens: float, cost: float, rate: float) -> float:
+    """Seconds until a bucket holds `cost` tokens."""
+    return (cost - tokens) / rate if rate > 0 else 0.0
+
+
+class LocalRateLimitBackend:
+    # Calls only take an in-process lock, so they are made on the event loop
+    blocking = False
+
+    def __init__(self, max_clients: int = 100000):
+        """
+        Initialize in-process limiter state.
+
+        Args:
+            max_clients: Number of client buckets above which full (idle) buckets are dropped
+        """
+        self.max_clients = max_clients
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # tokens, updated_at, full_at
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """
+        Take tokens from a client's bucket.
+
+        Args:
+            key: Client identity
+            rate: Tokens added per second
+            burst: Bucket size
+            cost: Tokens the request needs
+
+        Returns:
+            (allowed, tokens remaining, seconds until the request would be allowed)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (burst, now, now))
+            tokens = _refill(tokens, updated_at, now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, now + _retry_after(tokens, burst, rate))
+            if len(self._buckets) > self.max_clients:
+                self._prune(now)
+        return allowed, tokens, 0.0 if allowed else _retry_after(tokens, cost, rate)
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have refilled completely; a new bucket starts full anyway (caller holds the lock)."""
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def acquire_slot(self, key: str, limit: int) -> Optional[str]:
+        """
+        Take one of a client's concurrent request slots.
+
+        Returns:
+            A token to release the slot with, or None if all slots are taken
+        """
+        with self._lock:
+            in_use = self._slots.get(key, 0)
+            if in_use >= limit:
+                return None
+            self._slots[key] = in_use + 1
+        return key
+
+    def renew_slot(self, key: str, token: str) -> None:
+        """Keep a slot held by a long request (slots held in memory don't expire)."""
+
+    def release_slot(self, key: str, token: str) -> None:
+        with self._lock:
+            in_use = self._slots.get(key, 0) - 1
+            if in_use > 0:
+                self._slots[key] = in_use
+            else:
+                self._slots.pop(key, None)
+
+
+class SQLiteRateLimitBackend:
+    # Calls wait for the database's write lock
+    blocking = True
+
+    def __init__(self, path: str = "data/rate_limits.db", slot_lease_seconds: float = 300):
+        """
+        Open (or create) a limiter database shared by the processes using the same file.
+
+        Args:
+            path: SQLite database file
+            slot_lease_seconds: Time after which a concurrency slot is freed unless it
+                                was renewed (so the slots of a killed worker free up)
+        """
+        self.path = path
+        self.slot_lease_seconds = slot_lease_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._open()
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS slots (
+                token TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS slots_key ON slots (key, expires_at)")
+
+        # A forked worker needs its own connection
+        backend_ref = weakref.ref(self)
+        def after_fork():
+            backend = backend_ref()
+            if backend is not None:
+                backend._open()
+        os.register_at_fork(after_in_child=after_fork)
+
+    def _open(self) -> None:
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+    def _transaction(self, statements):
+        """Run a function on the connection in an immediate (write-locked) transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._connection)
+                self._connection.execute("COMMIT")
+                return result
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """Take tokens from a client's bucket (see LocalRateLimitBackend.take)."""
+        def statements(connection):
+            # Wall-clock time, as the file is shared between processes
+            now = time.time()
+            row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now)
+            )
+            return allowed, tokens, 0.0 if allowed else _retry_after(tokens, cost, rate)
+        return self._transaction(statements)
+
+    def acquire_slot(self, key: str, limit: int) -> Optional[str]:
+        """Take one of a client's concurrent request slots (see LocalRateLimitBackend.acquire_slot)."""
+        def statements(connection):
+            now = time.time()
+            connection.execute("DELETE FROM slots WHERE key = ? AND expires_at < ?", (key, now))
+            in_use = connection.execute("SELECT COUNT(*) FROM slots WHERE key = ?", (key,)).fetchone()[0]
+            if in_use >= limit:
+                return None
+            token = uuid.uuid4().hex
+            connection.execute(
+                "INSERT INTO slots (token, key, expires_at) VALUES (?, ?, ?)",
+                (token, key, now + self.slot_lease_seconds)
+            )
+            return token
+        return self._transaction(statements)
+
+    def renew_slot(self, key: str, token: str) -> None:
+        """Extend the lease of a slot whose request is still in flight."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE slots SET expires_at = ? WHERE token = ?", (time.time() + self.slot_lease_seconds, token)
+            )
+
+    def release_slot(self, key: str, token: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM slots WHERE token = ?", (token,))
+
+    def purge(self, older_than_seconds: float = 3600) -> int:
+        """Delete buckets not used for older_than_seconds (they would be full again)."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM buckets WHERE updated_at < ?", (time.time() - older_than_seconds,)
+            )
+        return cursor.rowcount
+
+
+def rate_limit_settings_from_env() -> Dict[str, Any]:
+    """RateLimitMiddleware parameters from the SHL_RATE_* environment variables (see module docstring)."""
+    quotas = {}
+    quotas_path = os.getenv("SHL_RATE_LIMIT_QUOTAS")
+    if quotas_path:
+        with open(quotas_path, 'r', encoding='utf-8') as f:
+            quotas = json.load(f)
+        logger.info(f"Loaded rate limit quotas for {len(quotas)} API keys from {quotas_path}")
+
+    db_path = os.getenv("SHL_RATE_LIMIT_DB")
+    return {
+        "rate": float(os.getenv("SHL_RATE_LIMIT", "10")),
+        "burst": float(os.getenv("SHL_RATE_BURST", "20")),
+        "concurrency": int(os.getenv("SHL_MAX_CONCURRENT", "4")),
+        "quotas": quotas,
+        "backend": SQLiteRateLimitBackend(db_path) if db_path else None,
+        "trust_forwarded_for": os.getenv("SHL_TRUST_FORWARDED_FOR", "0") == "1"
+    }
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rate: float = 10, burst: float = 20, concurrency: int = 4,
+                 quotas: Dict[str, Dict[str, float]] = None, backend=None,
+                 exempt_paths: Iterable[str] = EXEMPT_PATHS, api_key_header: str = "X-API-Key",
+                 trust_forwarded_for: bool = False):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application to wrap
+            rate: Requests per second per client (0 disables rate limiting)
+            burst: Requests a client can make at once before being held to `rate`
+            concurrency: Requests in flight per client (0 disables the cap)
+            quotas: Per-API-key overrides of "rate", "burst" and "concurrency"
+            backend: Limiter state (defaults to a LocalRateLimitBackend)
+            exempt_paths: Path prefixes that are never limited
+            api_key_header: Header identifying clients with a quota
+            trust_forwarded_for: Identify other clients by the first X-Forwarded-For
+                                 address instead of the connection's address
+        """
+        self.app = app
+        self.default_quota = {"rate": rate, "burst": burst, "concurrency": concurrency}
+        self.quotas = {key: dict(self.default_quota, **quota) for key, quota in (quotas or {}).items()}
+        self.backend = backend or LocalRateLimitBackend()
+        self.exempt_paths = tuple(exempt_paths)
+        self.api_key_header = api_key_header
+        self.trust_forwarded_for = trust_forwarded_for
+        # Slots with a lease are renewed three times per lease while their request runs
+        lease_seconds = getattr(self.backend, "slot_lease_seconds", None)
+        self.slot_renew_interval = lease_seconds / 3 if lease_seconds else None
+
+    async def _call_backend(self, method, *args):
+        """Call a backend method, in the threadpool unless the backend is non-blocking."""
+        if getattr(self.backend, "blocking", True):
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def _renew_slot_periodically(self, client: str, slot: str) -> None:
+        while True:
+            await asyncio.sleep(self.slot_renew_interval)
+            try:
+                await self._call_backend(self.backend.renew_slot, client, slot)
+            except Exception as e:
+                logger.warning(f"Could not renew a concurrency slot of {client}: {e}")
+
+    def _client(self, scope: Scope) -> Tuple[str, Dict[str, float]]:
+        """Identify the client of a request and get its quota."""
+        headers = Headers(scope=scope)
+        api_key = headers.get(self.api_key_header)
+        # Only keys with a quota identify a client; anything else could be made up to dodge the IP limit
+        if api_key and api_key in self.quotas:
+            return f"key:{api_key}", self.quotas[api_key]
+
+        address = None
+        if self.trust_forwarded_for and headers.get("X-Forwarded-For"):
+            address = headers["X-Forwarded-For"].split(",")[0].strip()
+        elif scope.get("client"):
+            address = scope["client"][0]
+        return f"ip:{address or 'unknown'}", self.default_quota
+
+    async def _reject(self, send: Send, reason: str, retry_after: float, limit: float) -> None:
+        """Send a 429 with a Retry-After hint (whole seconds, at least 1)."""
+        RATE_LIMITED.inc(reason=reason)
+        body = dumps({"detail": f"Too many requests ({reason} limit exceeded)", "retry_after": retry_after})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                (b"x-ratelimit-limit", f"{limit:g}".encode()),
+                (b"x-ratelimit-remaining", b"0")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or scope["path"].startswith(self.exempt_paths)):
+            await self.app(scope, receive, send)
+            return
+
+        client, quota = self._client(scope)
+
+        remaining = None
+        if quota["rate"] > 0:
+            allowed, remaining, retry_after = await self._call_backend(
+                self.backend.take, client, quota["rate"], quota["burst"]
+            )
+            if not allowed:
+                await self._reject(send, "rate", retry_after, quota["burst"])
+                return
+
+        slot = None
+        if quota["concurrency"] > 0:
+            slot = await self._call_backend(self.backend.acquire_slot, client, int(quota["concurrency"]))
+            if slot is None:
+                # A slot frees up when one of the client's requests finishes; ask for a short wait
+                await self._reject(send, "concurrency", 1.0, quota["burst"])
+                return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and remaining is not None:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-ratelimit-limit", f"{quota['burst']:g}".encode()),
+                    (b"x-ratelimit-remaining", str(int(remaining)).encode())
+                ]
+            await send(message)
+
+        renewer = None
+        if slot is not None and self.slot_renew_interval:
+            renewer = asyncio.ensure_future(self._renew_slot_periodically(client, slot))
+        try:
+            # The slot is held until the response has been sent completely (streams included)
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+            if slot is not None:
+                # Release even if the request was cancelled (e.g. the client disconnected)
+                with anyio.CancelScope(shield=True):
+                    await self._call_backend(self.backend.release_slot, client, slot)
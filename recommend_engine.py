@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import weakref
 import numpy as np
 from typing import List, Dict, Any, Tuple
 import pickle
@@ -14,6 +15,22 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
 import joblib
 import regex as re
+import faiss
+from concurrent.futures import ThreadPoolExecutor
+from metrics import time_stage, CACHE_HITS, CACHE_MISSES, UNFILTERED_FALLBACKS
+from bm25_index import BM25Index
+from reranker import CrossEncoderReranker
+from bundle_optimizer import select_bundle
+from diversity import mmr_select, MAX_MMR_CANDIDATES
+from query_cache import SemanticQueryCache
+from catalog_index import CatalogIndex
+from neighbor_graph import NEIGHBORS_FILE, build_neighbor_graph, save_neighbor_graph, load_neighbor_graph
+from embedding_store import (
+    STORE_FILE, EmbeddingStore, StoreDocstore, write_embedding_store,
+    compute_index_version, read_index_version, write_manifest
+)
+from query_preprocessor import QueryPreprocessor, catalog_terms
+from explanations import ResultExplainer
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,27 +40,143 @@ class SHLRecommendationEngine:
     def __init__(self, data_path="data/shl_assessments.json", 
                  embeddings_path="data/embeddings.pkl",
                  faiss_index_path="data/faiss_index",
-                 model_name="sentence-transformers/all-MiniLM-L6-v2"):
+                 model_name="sentence-transformers/all-MiniLM-L6-v2",
+                 model_backend="torch",
+                 retrieval_mode="dense",
+                 fusion="rrf",
+                 lexical_weight=0.3,
+                 hybrid_candidates=50,
+                 reranker_model="cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 rerank_candidates=20,
+                 rerank_budget_ms=300,
+                 mmr_candidates=50,
+                 semantic_cache_threshold=None,
+                 semantic_cache_size=1024,
+                 semantic_cache_verify_rate=0.0,
+                 similar_k=10,
+                 mmap_index=False,
+                 query_preprocessing=True,
+                 max_query_words=128,
+                 assessment_urls=None,
+                 embedding_model=None,
+                 reranker=None):
+        """
+        Initialize the recommendation engine.
+        
+        Args:
+            data_path: Path to the assessment catalog JSON file
+            embeddings_path: Base path for the on-disk document embedding cache
+            faiss_index_path: Directory of the saved vector (and lexical) index
+            model_name: Sentence-transformer model used for embeddings
+            model_backend: Inference backend of the embedding model: "torch", "onnx"
+                           or "openvino" (the latter two need the optimum extras)
+            retrieval_mode: "dense" (FAISS only) or "hybrid" (FAISS + BM25)
+            fusion: How hybrid results are combined: "rrf" (reciprocal rank fusion)
+                    or "weighted" (min-max normalized score blend)
+            lexical_weight: Weight of the BM25 score with weighted fusion
+            hybrid_candidates: Candidates fetched from each retriever before fusion
+            reranker_model: Cross-encoder used when re-ranking is requested
+            rerank_candidates: Number of first-stage candidates passed to the re-ranker
+            rerank_budget_ms: Default per-request latency budget for recommend with re-ranking
+            mmr_candidates: Number of candidates diversified when MMR is requested (at most 200)
+            semantic_cache_threshold: Cosine similarity above which a recent query's results
+                                      are reused (None disables the semantic cache)
+            semantic_cache_size: Number of recent queries kept in the semantic cache
+            semantic_cache_verify_rate: Fraction of semantic cache hits re-computed to
+                                        measure result drift
+            similar_k: Neighbors stored per assessment in the similar-assessments graph
+            mmap_index: Memory-map the saved FAISS index read-only instead of loading it,
+                        so processes serving the same index share its pages
+            query_preprocessing: Strip boilerplate and repetition from queries and cap
+                                 their length before encoding (see query_preprocessor.py)
+            max_query_words: Word cap of preprocessed queries
+            assessment_urls: Only serve the catalog assessments with these URLs
+                             (None serves the whole catalog)
+            embedding_model: Already loaded embedding model to share instead of loading
+                             one (it must be model_name on model_backend)
+            reranker: Already created re-ranker to share instead of creating one
+        """
         self.data_path = data_path
         self.embeddings_path = embeddings_path
         self.faiss_index_path = faiss_index_path
         self.model_name = model_name
+        self.model_backend = model_backend
+        self.retrieval_mode = retrieval_mode
+        self.fusion = fusion
+        self.lexical_weight = lexical_weight
+        self.hybrid_candidates = hybrid_candidates
+        self.rerank_candidates = rerank_candidates
+        self.rerank_budget_ms = rerank_budget_ms
+        self.mmr_candidates = min(mmr_candidates, MAX_MMR_CANDIDATES)
         self.assessments = []
+        self.catalog_index = CatalogIndex([])
         self.vectorstore = None
+        self.embedding_store = None
+        self.lexical_index = None
+        self.document_embeddings = None
+        self.document_texts = []
+        self.document_metadatas = []
+        self.index_version = None
+        self.similar_k = similar_k
+        self.mmap_index = mmap_index
+        self.neighbor_ids = None
+        self.neighbor_scores = None
+        self.query_preprocessing = query_preprocessing
+        self.max_query_words = max_query_words
+        self.assessment_urls = set(assessment_urls) if assessment_urls is not None else None
+        self.query_preprocessor = None
+        self.explainer = None
+        
+        # Runs BM25 lookups while the query is being encoded
+        self._lexical_executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Threads don't survive fork, so forked workers (see serve.py) need their own executor
+        engine_ref = weakref.ref(self)
+        def after_fork():
+            engine = engine_ref()
+            if engine is not None:
+                engine._lexical_executor = ThreadPoolExecutor(max_workers=1)
+        os.register_at_fork(after_in_child=after_fork)
+        
+        # Reuses results for near-duplicate queries
+        self.query_cache = None
+        if semantic_cache_threshold is not None:
+            self.query_cache = SemanticQueryCache(
+                threshold=semantic_cache_threshold,
+                capacity=semantic_cache_size,
+                verify_rate=semantic_cache_verify_rate
+            )
         
         # Ensure directories exist
         os.makedirs(os.path.dirname(data_path), exist_ok=True)
         
-        # Initialize embedding model
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={'device': 'cuda' if torch.cuda.is_available() else 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        # Initialize embedding model (unless one is shared with other engines)
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if embedding_model is None:
+            model_kwargs = {'device': device}
+            if model_backend != "torch":
+                model_kwargs['backend'] = model_backend
+            embedding_model = HuggingFaceEmbeddings(
+                model_name=model_name,
+                model_kwargs=model_kwargs,
+                encode_kwargs={'normalize_embeddings': True}
+            )
+        self.embedding_model = embedding_model
+        
+        # Second-stage re-ranker (model is loaded on first use)
+        self.reranker = reranker or CrossEncoderReranker(reranker_model, device=device)
         
         # Load assessments
         self._load_assessments()
         
+        # Query cleaning before encoding, with the catalog's skills as salient terms
+        skill_terms = catalog_terms(self.assessments)
+        if query_preprocessing:
+            self.query_preprocessor = QueryPreprocessor(skill_terms, max_words=max_query_words)
+        
+        # Per-assessment term sets for explaining results
+        self.explainer = ResultExplainer(self.assessments, skill_terms)
+        
         # Initialize vector store
         self._initialize_vector_store()
         
@@ -53,7 +186,12 @@ class SHLRecommendationEngine:
             if os.path.exists(self.data_path):
                 with open(self.data_path, 'r', encoding='utf-8') as f:
                     self.assessments = json.load(f)
+                if self.assessment_urls is not None:
+                    self.assessments = [a for a in self.assessments if a.get("url") in self.assessment_urls]
                 logger.info(f"Loaded {len(self.assessments)} assessments from {self.data_path}")
+                
+                # Browse and lookup indexes over the catalog
+                self.catalog_index = CatalogIndex(self.assessments)
             else:
                 logger.warning(f"Assessment data file {self.data_path} not found")
         except Exception as e:
@@ -62,13 +200,18 @@ class SHLRecommendationEngine:
     def _initialize_vector_store(self):
         """Initialize the vector store with assessment data."""
         try:
-            # Check if FAISS index already exists
-            if os.path.exists(f"{self.faiss_index_path}.faiss"):
+            texts, self.document_metadatas = self._build_documents()
+            self.document_texts = texts
+            self.index_version = self._compute_index_version(texts)
+            
+            # Load the saved index only if it was built from the same model and catalog
+            # (indexes saved with a pickled docstore are rebuilt; see embedding_store.py to convert them)
+            store_path = os.path.join(self.faiss_index_path, STORE_FILE)
+            if self._saved_index_version() == self.index_version and os.path.exists(store_path):
                 logger.info("Loading existing FAISS index...")
-                self.vectorstore = FAISS.load_local(
-                    self.faiss_index_path,
-                    self.embedding_model
-                )
+                self._load_vector_store(store_path)
+                self.lexical_index = self._load_lexical_index(texts)
+                self._load_neighbor_graph()
                 logger.info("FAISS index loaded successfully")
             else:
                 logger.info("Creating new FAISS index...")
@@ -78,15 +221,71 @@ class SHLRecommendationEngine:
             # Try to create a new one if loading fails
             self._create_vector_store()
     
-    def _create_vector_store(self):
-        """Create a new vector store from assessment data."""
-        try:
-            # Prepare documents for indexing
-            documents = []
-            
-            for assessment in self.assessments:
-                # Create a rich text representation for indexing
-                content = f"""
+    def _load_vector_store(self, store_path: str) -> None:
+        """
+        Load the saved FAISS index with documents served from the embedding store.
+        
+        The store is memory-mapped, so nothing is unpickled and the document
+        embeddings are a view of the mapped file rather than a copy. With
+        mmap_index the FAISS index itself is memory-mapped read-only as well,
+        and the embeddings are a view of its vectors.
+        """
+        store = EmbeddingStore(store_path)
+        if store.index_version != self.index_version or len(store) != len(self.document_metadatas):
+            raise ValueError(f"Embedding store {store_path} does not match the saved index")
+        
+        index_path = os.path.join(self.faiss_index_path, "index.faiss")
+        if self.mmap_index:
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            index = faiss.read_index(index_path, flags)
+            self.document_embeddings = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+            self.document_embeddings.setflags(write=False)
+        else:
+            index = faiss.read_index(index_path)
+            self.document_embeddings = store.embeddings
+            if store.dtype != np.float32:
+                self.document_embeddings = store.embeddings.astype(np.float32)
+        
+        # FAISS positions are store rows
+        self.vectorstore = FAISS(
+            embedding_function=self.embedding_model,
+            index=index,
+            docstore=StoreDocstore(store),
+            index_to_docstore_id={position: position for position in range(len(store))}
+        )
+        self.embedding_store = store
+    
+    def _saved_index_version(self) -> str:
+        """Read the index version recorded next to the saved index, if any."""
+        return read_index_version(self.faiss_index_path)
+    
+    def _load_lexical_index(self, texts: List[str]) -> BM25Index:
+        """Load the saved BM25 index, building it if it is missing."""
+        lexical_path = os.path.join(self.faiss_index_path, "bm25.npz")
+        if os.path.exists(lexical_path):
+            return BM25Index.load(lexical_path)
+        
+        lexical_index = BM25Index.build(texts)
+        lexical_index.save(lexical_path)
+        return lexical_index
+    
+    def _load_neighbor_graph(self) -> None:
+        """Load the saved similar-assessments graph, building it if it is missing or stale."""
+        graph_path = os.path.join(self.faiss_index_path, NEIGHBORS_FILE)
+        graph = load_neighbor_graph(graph_path, self.index_version)
+        if graph is None or graph[0].shape[1] < min(self.similar_k, len(self.document_metadatas) - 1):
+            graph = build_neighbor_graph(self.document_embeddings, k=self.similar_k)
+            save_neighbor_graph(graph_path, graph[0], graph[1], self.index_version)
+        self.neighbor_ids, self.neighbor_scores = graph
+    
+    def _build_documents(self) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Build the text and metadata indexed for each assessment."""
+        texts = []
+        metadatas = []
+        
+        for doc_index, assessment in enumerate(self.assessments):
+            # Create a rich text representation for indexing
+            content = f"""
                 Title: {assessment['title']}
                 Description: {assessment.get('description', '')}
                 Type: {assessment.get('test_type', 'N/A')}
@@ -95,46 +294,127 @@ class SHLRecommendationEngine:
                 Adaptive Testing: {assessment.get('adaptive_irt_support', 'No')}
                 Features: {', '.join(assessment.get('features', []))}
                 """
-                
-                # Create a Document object
-                doc = Document(
-                    page_content=content,
-                    metadata={
-                        "title": assessment['title'],
-                        "url": assessment['url'],
-                        "remote_testing_support": assessment.get('remote_testing_support', 'No'),
-                        "adaptive_irt_support": assessment.get('adaptive_irt_support', 'No'),
-                        "duration": assessment.get('duration', 'N/A'),
-                        "test_type": assessment.get('test_type', 'N/A')
-                    }
-                )
-                
-                documents.append(doc)
             
-            # Create FAISS index
-            self.vectorstore = FAISS.from_documents(
-                documents,
-                self.embedding_model
+            texts.append(content)
+            metadatas.append({
+                "title": assessment['title'],
+                "url": assessment['url'],
+                "remote_testing_support": assessment.get('remote_testing_support', 'No'),
+                "adaptive_irt_support": assessment.get('adaptive_irt_support', 'No'),
+                "duration": assessment.get('duration', 'N/A'),
+                "test_type": assessment.get('test_type', 'N/A'),
+                "doc_index": doc_index
+            })
+        
+        return texts, metadatas
+    
+    def _compute_index_version(self, texts: List[str]) -> str:
+        """
+        Compute a version identifier for an index over the given texts.
+        
+        The version covers the model name (and non-default backend) and the exact
+        document text, so it changes whenever either the model or the catalog changes.
+        """
+        return compute_index_version(self.model_name, self.model_backend, texts)
+    
+    def _embedding_cache_path(self, texts: List[str]) -> str:
+        """
+        Get the on-disk cache file for the embeddings of the given texts.
+        
+        Engines built with the same model over the same catalog (e.g. parallel
+        experiments) share one set of embeddings.
+        """
+        base_path = os.path.splitext(self.embeddings_path)[0]
+        return f"{base_path}_{self._compute_index_version(texts)}.npy"
+    
+    def _get_document_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Encode documents, reusing cached embeddings when available."""
+        cache_path = self._embedding_cache_path(texts)
+        
+        if os.path.exists(cache_path):
+            try:
+                embeddings = np.load(cache_path)
+                if embeddings.shape[0] == len(texts):
+                    logger.info(f"Loaded cached embeddings from {cache_path}")
+                    CACHE_HITS.inc(cache="document_embeddings")
+                    return embeddings
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable embedding cache {cache_path}: {e}")
+        
+        CACHE_MISSES.inc(cache="document_embeddings")
+        with time_stage("encode_documents"):
+            embeddings = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+        
+        # Write atomically so concurrent engines never read a partial file
+        try:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, embeddings)
+            os.replace(tmp_path, cache_path)
+            logger.info(f"Cached {len(texts)} document embeddings to {cache_path}")
+        except Exception as e:
+            logger.warning(f"Could not write embedding cache {cache_path}: {e}")
+        
+        return embeddings
+    
+    def _create_vector_store(self):
+        """Create a new vector store from assessment data."""
+        try:
+            # Prepare documents for indexing
+            texts, metadatas = self._build_documents()
+            embeddings = self._get_document_embeddings(texts)
+            self.index_version = self._compute_index_version(texts)
+            self.document_texts = texts
+            self.document_metadatas = metadatas
+            self.document_embeddings = embeddings
+            
+            # Create FAISS index from the (possibly cached) embeddings
+            self.vectorstore = FAISS.from_embeddings(
+                list(zip(texts, embeddings.tolist())),
+                self.embedding_model,
+                metadatas=metadatas
             )
             
-            # Save the index
-            self.vectorstore.save_local(self.faiss_index_path)
-            logger.info(f"Created and saved FAISS index with {len(documents)} documents")
+            # Build the lexical index over the same document text
+            self.lexical_index = BM25Index.build(texts)
+            
+            # Save the indexes, then record which model and catalog they were built from
+            os.makedirs(self.faiss_index_path, exist_ok=True)
+            faiss.write_index(self.vectorstore.index, os.path.join(self.faiss_index_path, "index.faiss"))
+            write_embedding_store(
+                os.path.join(self.faiss_index_path, STORE_FILE),
+                embeddings, metadatas, texts, self.index_version
+            )
+            self.lexical_index.save(os.path.join(self.faiss_index_path, "bm25.npz"))
+            self._load_neighbor_graph()
+            write_manifest(self.faiss_index_path, self.index_version, self.model_name, self.model_backend, len(texts))
+            logger.info(f"Created and saved FAISS index with {len(texts)} documents")
             
         except Exception as e:
             logger.error(f"Error creating vector store: {e}")
     
-    def recommend(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    def recommend(self, query: str, top_k: int = 10, mode: str = None,
+                  rerank: bool = False, latency_budget_ms: float = None,
+                  diversity_lambda: float = None) -> List[Dict[str, Any]]:
         """
         Get assessment recommendations based on a query.
         
         Args:
             query: The query text (job description or natural language query)
             top_k: Maximum number of recommendations to return
+            mode: Retrieval mode ("dense" or "hybrid"); defaults to the engine's retrieval_mode
+            rerank: Whether to re-score the top candidates with the cross-encoder
+            latency_budget_ms: Total time allowed for the request when re-ranking;
+                               re-ranking is truncated or skipped to stay within it
+                               (defaults to the engine's rerank_budget_ms)
+            diversity_lambda: If set, re-order results with maximal marginal relevance,
+                              trading relevance (1.0) against diversity (0.0)
             
         Returns:
             List of recommended assessments
         """
+        start_time = time.perf_counter()
         try:
             # Ensure we have a valid vector store
             if not self.vectorstore:
@@ -145,27 +425,264 @@ class SHLRecommendationEngine:
                     logger.error("Failed to initialize vector store")
                     return []
             
-            # Get relevant documents
-            relevant_docs = self.vectorstore.similarity_search_with_score(query, k=top_k)
-            
-            # Convert to recommendations
-            recommendations = []
-            for doc, score in relevant_docs:
-                recommendations.append({
-                    "title": doc.metadata["title"],
-                    "url": doc.metadata["url"],
-                    "remote_testing_support": doc.metadata["remote_testing_support"],
-                    "adaptive_irt_support": doc.metadata["adaptive_irt_support"],
-                    "duration": doc.metadata["duration"],
-                    "test_type": doc.metadata["test_type"],
-                    "similarity_score": float(score)
-                })
-                
-            return recommendations
+            # Fetch a deeper candidate list when a second stage will re-order it
+            candidate_k = top_k
+            if rerank:
+                candidate_k = max(candidate_k, self.rerank_candidates)
+            if diversity_lambda is not None:
+                candidate_k = max(candidate_k, self.mmr_candidates)
+            
+            use_hybrid = (mode or self.retrieval_mode) == "hybrid" and self.lexical_index is not None
+            
+            # Retrieval and re-ranking see the cleaned query; filters still read the original
+            search_query = self.preprocess_query(query)
+            
+            # Start the BM25 lookup so it overlaps with encoding
+            lexical_future = None
+            if use_hybrid:
+                lexical_future = self._lexical_executor.submit(
+                    self._lexical_search, search_query, max(candidate_k, self.hybrid_candidates)
+                )
+            
+            # Encode the query
+            with time_stage("encode"):
+                query_embedding = self.embedding_model.embed_query(search_query)
+            
+            # Reuse the results of a near-duplicate query with the same parameters and filters
+            cached = None
+            if self.query_cache is not None:
+                with time_stage("semantic_cache_lookup"):
+                    cache_context = (
+                        self.index_version, use_hybrid, top_k, rerank, diversity_lambda,
+                        tuple(sorted(self.extract_filters_from_query(query).items()))
+                    )
+                    cached = self.query_cache.lookup(query_embedding, cache_context)
+                if cached is not None and not self.query_cache.should_verify():
+                    if lexical_future is not None:
+                        lexical_future.cancel()
+                    return cached
+            
+            if use_hybrid:
+                candidates = self._hybrid_candidates(query_embedding, candidate_k, lexical_future)
+            else:
+                candidates = self._dense_candidates(query_embedding, candidate_k)
+            
+            if rerank:
+                budget_ms = self.rerank_budget_ms if latency_budget_ms is None else latency_budget_ms
+                remaining_ms = budget_ms - (time.perf_counter() - start_time) * 1000
+                candidates = self._rerank_candidates(search_query, candidates, remaining_ms)
+            
+            if diversity_lambda is not None:
+                candidates = self._diversify_candidates(candidates, top_k, diversity_lambda)
+            
+            results = [recommendation for _, recommendation in candidates[:top_k]]
+            
+            if cached is not None:
+                # Sampled hit: compare what the cache returned against the fresh results
+                self.query_cache.record_drift(cached, results)
+            elif self.query_cache is not None:
+                self.query_cache.insert(query_embedding, cache_context, results)
+            
+            return results
             
         except Exception as e:
             logger.error(f"Error during recommendation: {e}")
             return []
+    
+    def close(self) -> None:
+        """Release the engine's worker thread (the engine must not be used afterwards)."""
+        self._lexical_executor.shutdown(wait=False)
+    
+    def preprocess_query(self, query: str) -> str:
+        """
+        Clean a query for encoding (unchanged if query preprocessing is off).
+        
+        Args:
+            query: The query text
+            
+        Returns:
+            The text that is encoded for the query
+        """
+        if self.query_preprocessor is None:
+            return query
+        with time_stage("preprocess"):
+            return self.query_preprocessor.process(query)
+    
+    def similar_assessments(self, doc_index: int, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the assessments most similar to a catalog assessment.
+        
+        Served from the precomputed neighbor graph, so no text is encoded or searched.
+        
+        Args:
+            doc_index: Position of the assessment in the catalog
+            top_k: Maximum number of similar assessments (at most similar_k)
+            
+        Returns:
+            List of similar assessments, most similar first, or None if
+            doc_index is not in the catalog
+        """
+        if self.neighbor_ids is None or not 0 <= doc_index < len(self.neighbor_ids):
+            return None
+        
+        return [
+            # Report the squared L2 distance, like recommend() does
+            self._to_recommendation(self.document_metadatas[neighbor], 2.0 - 2.0 * float(score))
+            for neighbor, score in zip(self.neighbor_ids[doc_index, :top_k], self.neighbor_scores[doc_index, :top_k])
+        ]
+    
+    def _to_recommendation(self, metadata: Dict[str, Any], score: float) -> Dict[str, Any]:
+        """Convert indexed document metadata into a recommendation dictionary."""
+        return {
+            "title": metadata["title"],
+            "url": metadata["url"],
+            "remote_testing_support": metadata["remote_testing_support"],
+            "adaptive_irt_support": metadata["adaptive_irt_support"],
+            "duration": metadata["duration"],
+            "test_type": metadata["test_type"],
+            "similarity_score": float(score)
+        }
+    
+    def _dense_candidates(self, query_embedding: List[float], k: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Get (document index, recommendation) pairs from FAISS for an encoded query."""
+        # Get relevant documents
+        with time_stage("search"):
+            relevant_docs = self.vectorstore.similarity_search_with_score_by_vector(query_embedding, k=k)
+        
+        # Convert to recommendations
+        return [
+            (doc.metadata["doc_index"], self._to_recommendation(doc.metadata, score))
+            for doc, score in relevant_docs
+        ]
+    
+    def _lexical_search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Run a timed BM25 search (called on the lexical executor thread)."""
+        with time_stage("lexical_search"):
+            return self.lexical_index.search(query, k)
+    
+    def _hybrid_candidates(self, query_embedding: List[float], k: int,
+                           lexical_future) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Get (document index, recommendation) pairs by fusing FAISS and BM25 results.
+        
+        The BM25 lookup (lexical_future) is started by the caller on a worker
+        thread so it runs while the query is encoded. Results keep the FAISS
+        distance as similarity_score and add the fused score as fusion_score.
+        """
+        candidate_k = max(k, self.hybrid_candidates)
+        
+        # Get relevant documents
+        with time_stage("search"):
+            relevant_docs = self.vectorstore.similarity_search_with_score_by_vector(query_embedding, k=candidate_k)
+        
+        dense_results = [(doc.metadata["doc_index"], float(score)) for doc, score in relevant_docs]
+        lexical_results = lexical_future.result()
+        
+        with time_stage("fusion"):
+            fused = self._fuse_results(dense_results, lexical_results)[:k]
+            
+            # Report the dense distance for every result, including lexical-only matches
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            doc_indices = [doc_index for doc_index, _ in fused]
+            distances = np.sum((self.document_embeddings[doc_indices] - query_vector) ** 2, axis=1)
+            
+            candidates = []
+            for (doc_index, fused_score), distance in zip(fused, distances):
+                recommendation = self._to_recommendation(self.document_metadatas[doc_index], distance)
+                recommendation["fusion_score"] = fused_score
+                candidates.append((doc_index, recommendation))
+        
+        return candidates
+    
+    def _rerank_candidates(self, query: str, candidates: List[Tuple[int, Dict[str, Any]]],
+                           budget_ms: float) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Re-order candidates by cross-encoder score within a latency budget.
+        
+        Candidates the budget allowed to be scored are sorted by rerank_score and
+        placed first; any remaining candidates follow in their first-stage order.
+        """
+        doc_indices = [doc_index for doc_index, _ in candidates]
+        scores = self.reranker.score(
+            query,
+            doc_indices,
+            [self.document_texts[doc_index] for doc_index in doc_indices],
+            budget_ms
+        )
+        
+        scored = []
+        unscored = []
+        for doc_index, recommendation in candidates:
+            if doc_index in scores:
+                recommendation["rerank_score"] = scores[doc_index]
+                scored.append((doc_index, recommendation))
+            else:
+                unscored.append((doc_index, recommendation))
+        
+        scored.sort(key=lambda candidate: candidate[1]["rerank_score"], reverse=True)
+        return scored + unscored
+    
+    def _diversify_candidates(self, candidates: List[Tuple[int, Dict[str, Any]]], top_k: int,
+                              diversity_lambda: float) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Re-order candidates with maximal marginal relevance using the cached catalog vectors.
+        
+        Relevance is the re-rank score (min-max normalized) when present, otherwise
+        the cosine similarity recovered from the FAISS distance.
+        """
+        if len(candidates) <= 1 or self.document_embeddings is None:
+            return candidates
+        
+        with time_stage("diversify"):
+            candidates = candidates[:MAX_MMR_CANDIDATES]
+            recommendations = [recommendation for _, recommendation in candidates]
+            
+            if all("rerank_score" in rec for rec in recommendations):
+                relevance = np.array([rec["rerank_score"] for rec in recommendations], dtype=np.float32)
+                spread = relevance.max() - relevance.min()
+                relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+            else:
+                # Embeddings are normalized, so cosine = 1 - d^2 / 2
+                relevance = np.array([1.0 - rec["similarity_score"] / 2.0 for rec in recommendations], dtype=np.float32)
+            
+            vectors = self.document_embeddings[[doc_index for doc_index, _ in candidates]]
+            order = mmr_select(relevance, vectors, top_k, lambda_=diversity_lambda)
+        
+        return [candidates[position] for position in order]
+    
+    def _fuse_results(self, dense_results: List[Tuple[int, float]],
+                      lexical_results: List[Tuple[int, float]],
+                      rrf_k: int = 60) -> List[Tuple[int, float]]:
+        """
+        Combine dense (distance, lower is better) and lexical (score, higher is better) results.
+        
+        Returns:
+            List of (document index, fused score) pairs, best first
+        """
+        fused = {}
+        
+        if self.fusion == "weighted":
+            def normalize(values):
+                values = np.asarray(values, dtype=np.float32)
+                spread = values.max() - values.min() if values.size else 0.0
+                return (values - values.min()) / spread if spread > 0 else np.ones_like(values)
+            
+            if dense_results:
+                # Negate distances so that higher is better before normalizing
+                dense_scores = normalize([-distance for _, distance in dense_results])
+                for (doc_index, _), score in zip(dense_results, dense_scores):
+                    fused[doc_index] = fused.get(doc_index, 0.0) + (1 - self.lexical_weight) * float(score)
+            if lexical_results:
+                lexical_scores = normalize([score for _, score in lexical_results])
+                for (doc_index, _), score in zip(lexical_results, lexical_scores):
+                    fused[doc_index] = fused.get(doc_index, 0.0) + self.lexical_weight * float(score)
+        else:
+            # Reciprocal rank fusion
+            for results in (dense_results, lexical_results):
+                for rank, (doc_index, _) in enumerate(results, 1):
+                    fused[doc_index] = fused.get(doc_index, 0.0) + 1.0 / (rrf_k + rank)
+        
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)
 
     def filter_recommendations(self, recommendations: List[Dict], 
                               duration_limit: int = None,
@@ -283,38 +800,238 @@ class SHLRecommendationEngine:
                 
         return filters
 
-    def recommend_with_auto_filter(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    def recommend_with_auto_filter(self, query: str, top_k: int = 10, rerank: bool = False,
+                                   latency_budget_ms: float = None,
+                                   diversity_lambda: float = None,
+                                   explain: bool = False) -> List[Dict[str, Any]]:
         """
         Get filtered recommendations based on query and automatically extracted filters.
         
         Args:
             query: The query text
             top_k: Maximum number of recommendations
+            rerank: Whether to re-rank candidates with the cross-encoder
+            latency_budget_ms: Latency budget when re-ranking (see recommend)
+            diversity_lambda: MMR trade-off, or None to skip diversification (see recommend)
+            explain: Add an "explanation" to every recommendation (see explain)
             
         Returns:
             List of filtered recommendations
         """
         # Get initial recommendations
-        recommendations = self.recommend(query, top_k=min(top_k * 2, 30))  # Get more than needed for filtering
+        recommendations = self.recommend(query, top_k=min(top_k * 2, 30),  # Get more than needed for filtering
+                                         rerank=rerank, latency_budget_ms=latency_budget_ms,
+                                         diversity_lambda=diversity_lambda)
+        
+        recommendations = self._apply_query_filters(query, recommendations, top_k)
+        if explain:
+            recommendations = [
+                dict(recommendation, explanation=explanation)
+                for recommendation, explanation in zip(recommendations, self.explain(query, recommendations))
+            ]
+        return recommendations
+    
+    def explain(self, query: str, recommendations: List[Dict[str, Any]],
+                filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Explain why each recommendation matches a query.
+        
+        Uses the catalog's precomputed term sets, the scores already on the
+        recommendations and the filters; no model is called.
         
+        Args:
+            query: The query text
+            recommendations: Recommendations for the query
+            filters: Filter criteria to check, as returned by extract_filters_from_query
+                     (defaults to the filters extracted from the query)
+            
+        Returns:
+            One explanation per recommendation (see ResultExplainer.explain), with
+            a "filters" list of the criteria checked and whether each is satisfied
+        """
+        with time_stage("explain"):
+            if filters is None:
+                filters = self.extract_filters_from_query(query)
+            active_filters = {name: value for name, value in filters.items() if value}
+            query_terms = self.explainer.query_terms(self.preprocess_query(query))
+            
+            explanations = []
+            for recommendation in recommendations:
+                explanation = self.explainer.explain(
+                    query_terms, recommendation, self.catalog_index.by_url(recommendation["url"])
+                )
+                # A filter is satisfied if filtering would keep the recommendation
+                explanation["filters"] = [
+                    {"name": name, "value": value,
+                     "satisfied": bool(self.filter_recommendations([recommendation], **{name: value}))}
+                    for name, value in active_filters.items()
+                ]
+                explanations.append(explanation)
+            return explanations
+    
+    def _apply_query_filters(self, query: str, recommendations: List[Dict[str, Any]],
+                             top_k: int) -> List[Dict[str, Any]]:
+        """
+        Filter recommendations by the criteria stated in the query, falling back
+        to the unfiltered list if nothing matches.
+        """
         # Extract filters from query
-        filters = self.extract_filters_from_query(query)
+        with time_stage("filter_extraction"):
+            filters = self.extract_filters_from_query(query)
         
         # Apply filters
-        filtered_recommendations = self.filter_recommendations(
-            recommendations,
-            duration_limit=filters["duration_limit"],
-            remote_testing=filters["remote_testing"],
-            adaptive_testing=filters["adaptive_testing"],
-            test_type=filters["test_type"]
-        )
+        with time_stage("filtering"):
+            filtered_recommendations = self.filter_recommendations(
+                recommendations,
+                duration_limit=filters["duration_limit"],
+                remote_testing=filters["remote_testing"],
+                adaptive_testing=filters["adaptive_testing"],
+                test_type=filters["test_type"]
+            )
         
         # If filtering resulted in too few results, return original recommendations
         if len(filtered_recommendations) < min(top_k, 1):
+            UNFILTERED_FALLBACKS.inc()
             return recommendations[:top_k]
         
         return filtered_recommendations[:top_k]
 
+    
+    def recommend_batch(self, queries: List[str], top_k: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Get filtered recommendations for many queries at once.
+        
+        Encodes all queries in one batch and searches FAISS with one call, then
+        applies each query's own filters as recommend_with_auto_filter does.
+        Uses dense retrieval without re-ranking or diversification.
+        
+        Args:
+            queries: Query texts
+            top_k: Maximum number of recommendations per query
+            
+        Returns:
+            List of recommendations for each query, in input order
+            
+        Raises:
+            Exception: If the batch can't be processed (e.g. encoding fails), so callers
+                       can tell a failed batch from queries without matches
+        """
+        if not queries:
+            return []
+        
+        try:
+            # Ensure we have a valid vector store
+            if not self.vectorstore:
+                self._initialize_vector_store()
+                if not self.vectorstore:
+                    raise RuntimeError("Failed to initialize vector store")
+            
+            candidate_k = min(top_k * 2, 30)  # Get more than needed for filtering
+            
+            # Encode every query in one forward pass (embed_query encodes the same way)
+            search_queries = [self.preprocess_query(query) for query in queries]
+            with time_stage("encode"):
+                query_embeddings = np.asarray(self.embedding_model.embed_documents(search_queries), dtype=np.float32)
+            
+            # FAISS positions are document indices, as the index is built in catalog order
+            with time_stage("search"):
+                distances, positions = self.vectorstore.index.search(query_embeddings, candidate_k)
+            
+            results = []
+            for query, row_distances, row_positions in zip(queries, distances, positions):
+                recommendations = [
+                    self._to_recommendation(self.document_metadatas[position], distance)
+                    for distance, position in zip(row_distances, row_positions)
+                    if position >= 0
+                ]
+                results.append(self._apply_query_filters(query, recommendations, top_k))
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error during batch recommendation: {e}")
+            raise
+    
+    def _extract_time_budget_minutes(self, query: str) -> int:
+        """
+        Extract a total time budget from a query ("about an hour", "90 minutes", "1.5 hours").
+        
+        Returns:
+            Budget in minutes, or None if the query doesn't state one
+        """
+        query = query.lower()
+        
+        match = re.search(r'(\d+(?:\.\d+)?)\s*(?:hours?|hrs?)\b', query)
+        if match:
+            return int(float(match.group(1)) * 60)
+        if re.search(r'\b(?:an|one)\s+hour\b', query):
+            return 60
+        
+        return self.extract_filters_from_query(query)["duration_limit"]
+    
+    def recommend_bundle(self, query: str, total_minutes: int = None, candidates: int = 100,
+                         mode: str = None, item_penalty: float = 0.5,
+                         diversity_bonus: float = 0.1) -> Dict[str, Any]:
+        """
+        Recommend a set of assessments whose combined duration fits a time budget.
+        
+        Candidates are scored by relevance normalized to [0, 1] across the candidate
+        list (re-rank or fusion score when present, otherwise cosine similarity).
+        Each chosen assessment costs item_penalty, so only clearly relevant ones are
+        added, and each distinct test type in the bundle earns diversity_bonus.
+        
+        Args:
+            query: The query text
+            total_minutes: Total time budget (defaults to the budget stated in the
+                           query, or 60 minutes)
+            candidates: Number of top candidates considered
+            mode: Retrieval mode ("dense" or "hybrid")
+            item_penalty: Relevance an assessment must exceed to be worth adding
+            diversity_bonus: Bonus for each distinct test type in the bundle
+            
+        Returns:
+            Dictionary with the chosen "assessments" (most relevant first), the
+            "total_minutes" budget and the "used_minutes"
+        """
+        if total_minutes is None:
+            total_minutes = self._extract_time_budget_minutes(query) or 60
+        
+        recommendations = self.recommend(query, top_k=candidates, mode=mode)
+        
+        # Only assessments with a known duration can be budgeted
+        eligible = []
+        for rec in recommendations:
+            minutes = self._extract_duration_minutes(rec.get("duration", "N/A"))
+            if minutes != float('inf'):
+                eligible.append((rec, minutes))
+        
+        if not eligible:
+            return {"assessments": [], "total_minutes": total_minutes, "used_minutes": 0}
+        
+        with time_stage("bundle_selection"):
+            # Higher is better for every score; embeddings are normalized, so cosine = 1 - d^2 / 2
+            raw_scores = np.array([
+                rec["rerank_score"] if "rerank_score" in rec
+                else rec["fusion_score"] if "fusion_score" in rec
+                else 1.0 - rec["similarity_score"] / 2.0
+                for rec, _ in eligible
+            ], dtype=np.float64)
+            spread = raw_scores.max() - raw_scores.min()
+            relevance = (raw_scores - raw_scores.min()) / spread if spread > 0 else np.ones_like(raw_scores)
+            
+            bundle = select_bundle(
+                [
+                    {"value": float(score) - item_penalty, "minutes": minutes, "group": rec.get("test_type", "N/A")}
+                    for (rec, minutes), score in zip(eligible, relevance)
+                ],
+                total_minutes,
+                diversity_bonus=diversity_bonus
+            )
+        
+        return {
+            "assessments": [eligible[i][0] for i in bundle["indices"]],
+            "total_minutes": total_minutes,
+            "used_minutes": bundle["minutes"]
+        }
 
 if __name__ == "__main__":
     # Test the recommendation engine
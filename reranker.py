@@ -0,0 +1,166 @@
+"""
+Cross-encoder re-ranking for the second stage of retrieval.
+
+Re-scores the top candidates from the first stage (FAISS or hybrid) with a
+small cross-encoder in a single batched forward pass. A per-request latency
+budget decides how many candidates can be scored: candidates are scored in
+first-stage order until the estimated cost would exceed the budget. Until
+the model has been loaded and timed, a request with a budget keeps the
+first-stage order and the model is warmed up in the background, so no
+request pays for loading it under a budget. (query, document text) scores are cached so repeated queries skip the model.
+The cache is keyed by text rather than assessment id, so one re-ranker can
+be shared by engines over different catalogs (where the same id names
+different assessments).
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+
+from metrics import time_stage, CACHE_HITS, CACHE_MISSES, RERANK_BUDGET_EXCEEDED
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 device: str = "cpu", max_length: int = 256, cache_size: int = 10000):
+        """
+        Initialize the re-ranker. The model is loaded on first use.
+
+        Args:
+            model_name: Cross-encoder model name
+            device: Device to run the model on
+            max_length: Maximum tokens per (query, document) pair
+            cache_size: Maximum number of cached (query, document) scores
+        """
+        self.model_name = model_name
+        self.device = device
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Moving average of model time per pair, used to fit the latency budget
+        self._seconds_per_pair = None
+        self._warm_up_thread = None
+
+    def _load_model(self):
+        """Load the cross-encoder once."""
+        with self._model_lock:
+            if self.model is None:
+                from sentence_transformers import CrossEncoder
+                logger.info(f"Loading cross-encoder {self.model_name}...")
+                self.model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        return self.model
+
+    def warm_up(self) -> None:
+        """Load the model and time one pair so the first request doesn't pay for it."""
+        model = self._load_model()
+        # The first call initializes kernels and would overestimate the cost of a pair
+        model.predict([("warm up", "warm up")], show_progress_bar=False)
+        start_time = time.perf_counter()
+        model.predict([("warm up", "warm up")], show_progress_bar=False)
+        self._seconds_per_pair = time.perf_counter() - start_time
+
+    def warm_up_in_background(self) -> None:
+        """Start warm_up in a background thread, unless it has been started already."""
+        with self._model_lock:
+            if self._warm_up_thread is not None:
+                return
+            self._warm_up_thread = threading.Thread(target=self._warm_up_logged, name="rerank-warm-up", daemon=True)
+        self._warm_up_thread.start()
+
+    def _warm_up_logged(self) -> None:
+        try:
+            self.warm_up()
+            logger.info(f"Cross-encoder ready ({self._seconds_per_pair * 1000:.1f} ms per pair)")
+        except Exception as e:
+            logger.error(f"Error warming up the cross-encoder: {e}")
+
+    def _get_cached(self, key: Tuple[str, str]):
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _put_cached(self, key: Tuple[str, str], score: float) -> None:
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def score(self, query: str, doc_ids: List[int], texts: List[str],
+              budget_ms: float = None) -> Dict[int, float]:
+        """
+        Score candidates against a query within a latency budget.
+
+        Args:
+            query: Query text
+            doc_ids: Candidate assessment ids, in first-stage order
+            texts: Document text of each candidate
+            budget_ms: Time available for re-ranking (None for no limit)
+
+        Returns:
+            Dictionary mapping assessment id to cross-encoder score for the leading
+            candidates that fit the budget (empty if re-ranking was skipped)
+        """
+        if budget_ms is not None and budget_ms <= 0:
+            RERANK_BUDGET_EXCEEDED.inc(action="skipped")
+            return {}
+
+        # Without a cost estimate the budget can't be enforced, and loading the model
+        # would take far longer than any budget: skip, and get ready for later requests
+        if budget_ms is not None and self._seconds_per_pair is None:
+            RERANK_BUDGET_EXCEEDED.inc(action="skipped")
+            self.warm_up_in_background()
+            return {}
+
+        query_hash = hashlib.sha1(query.encode('utf-8')).hexdigest()
+        scores = {}
+        pending = []
+
+        # Walk candidates in order, adding uncached ones while the estimated cost fits
+        budget_s = None if budget_ms is None else budget_ms / 1000
+        for doc_id, text in zip(doc_ids, texts):
+            key = (query_hash, hashlib.sha1(text.encode('utf-8')).hexdigest())
+            cached = self._get_cached(key)
+            if cached is not None:
+                CACHE_HITS.inc(cache="rerank_scores")
+                scores[doc_id] = cached
+                continue
+
+            if budget_s is not None and self._seconds_per_pair is not None:
+                if (len(pending) + 1) * self._seconds_per_pair > budget_s:
+                    RERANK_BUDGET_EXCEEDED.inc(action="skipped" if not pending and not scores else "truncated")
+                    break
+
+            CACHE_MISSES.inc(cache="rerank_scores")
+            pending.append((doc_id, text, key))
+
+        if pending:
+            model = self._load_model()
+            start_time = time.perf_counter()
+            with time_stage("rerank"):
+                pair_scores = model.predict(
+                    [(query, text) for _, text, _ in pending],
+                    batch_size=len(pending),
+                    show_progress_bar=False
+                )
+            per_pair = (time.perf_counter() - start_time) / len(pending)
+            self._seconds_per_pair = per_pair if self._seconds_per_pair is None \
+                else 0.8 * self._seconds_per_pair + 0.2 * per_pair
+
+            for (doc_id, _, key), score in zip(pending, pair_scores):
+                scores[doc_id] = float(score)
+                self._put_cached(key, float(score))
+
+        return scores
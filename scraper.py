@@ -224,6 +224,7 @@ class SHLCatalogScraper:
 
 # Mock data generator to use in case scraping fails
 def generate_mock_data(output_file="data/shl_assessments.json"):
+    """Generate the built-in mock catalog and save it to output_file (None returns it without saving)."""
     logger.info("Generating mock assessment data")
     assessments = [
         {
@@ -561,6 +562,9 @@ def generate_mock_data(output_file="data/shl_assessments.json"):
         }
     ]
     
+    if output_file is None:
+        return assessments
+    
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
@@ -574,6 +578,162 @@ def generate_mock_data(output_file="data/shl_assessments.json"):
         logger.error(f"Error saving mock data to JSON: {e}")
         return []
 
+# Vocabularies for synthetic catalogs
+SYNTHETIC_SKILLS = [
+    "Java", "Python", "SQL Server", "JavaScript", ".NET", "C#", "C++", "React", "Angular", "Node.js",
+    "AWS", "Azure", "Docker", "Kubernetes", "Linux Administration", "Selenium", "Tableau", "Microsoft Excel",
+    "SAP", "Salesforce", "Data Science", "Machine Learning", "Networking", "Cybersecurity", "HTML/CSS",
+    "PHP", "Ruby", "Go", "Kotlin", "Swift", "Android Development", "iOS Development", "Hadoop", "Spark",
+    "DevOps", "Manual Testing", "Automata", "Power BI", "Spring Boot", "Django"
+]
+SYNTHETIC_LEVELS = ["Entry Level", "Intermediate", "Advanced", "Expert"]
+SYNTHETIC_ROLES = [
+    "Sales", "Customer Service", "Bank Teller", "Administrative Assistant", "Call Center Agent",
+    "Retail Associate", "Project Manager", "Financial Analyst", "Graduate", "Manager", "Data Entry",
+    "Nurse", "Technician", "Supervisor", "Account Manager", "HR Specialist", "Marketing Specialist",
+    "Operations Manager", "Software Engineer", "Store Manager", "Executive", "Cashier", "Insurance Agent"
+]
+SYNTHETIC_CONSTRUCTS = {
+    "Cognitive": ["Numerical Reasoning", "Verbal Reasoning", "Inductive Reasoning", "Deductive Reasoning",
+                  "Mechanical Comprehension", "Calculation", "Checking", "Reading Comprehension",
+                  "Spatial Reasoning", "General Ability"],
+    "Personality": ["Occupational Personality Questionnaire", "Motivation Questionnaire", "Work Strengths",
+                    "Leadership Styles", "Emotional Intelligence", "Workplace Values"],
+    "Behavioral": ["Situational Judgement", "Teamwork", "Customer Orientation", "Integrity",
+                   "Safety and Dependability", "Work Styles"],
+    "Skills": ["Short Form", "Solution", "7.1 (International)", "Simulation", "Knowledge Test", "Skills Test"]
+}
+SYNTHETIC_EDITIONS = ["", " (New)", " - Short Form", " - Simulation", " (International)", " 2.0"]
+SYNTHETIC_JOB_LEVELS = ["Entry-Level", "Graduate", "Mid-Professional", "Front Line Manager",
+                        "Manager", "Director", "Executive"]
+SYNTHETIC_DESCRIPTIONS = {
+    "Technical": ["Assessment to test {level} {skill} programming skills.",
+                  "Measures {skill} knowledge for {level} {role} roles.",
+                  "Hands-on {skill} coding simulation for {level} developers."],
+    "Cognitive": ["Assessment for {construct} ability of {role} candidates.",
+                  "Interactive assessment for {construct} skills.",
+                  "Measures {construct} under time pressure for {role} roles."],
+    "Personality": ["Questionnaire describing {construct} relevant to {role} roles.",
+                    "Assessment of {construct} for {role} selection and development."],
+    "Behavioral": ["Assessment of {construct} in {role} scenarios.",
+                   "Situational assessment measuring {construct} for {role} positions."],
+    "Skills": ["Assessment for {role} skills.",
+               "Assessment for {level} {role} positions covering core job tasks."]
+}
+SYNTHETIC_DETAILS = [
+    "Results include a candidate report and an interview guide.",
+    "Available in multiple languages with mobile-friendly delivery.",
+    "Scores are benchmarked against a global norm group.",
+    "Items are drawn from a large bank to reduce exposure.",
+    "Suitable for high-volume screening."
+]
+
+
+def generate_synthetic_catalog(size, output_file=None, seed=42, base_assessments=None):
+    """
+    Generate a synthetic catalog of any size for stress testing.
+    
+    Test types, and per test type the durations and remote/adaptive support,
+    are sampled from the distributions of a base catalog (the mock data by
+    default); titles, descriptions and job-level features are composed from
+    fixed vocabularies, so the catalog is deterministic for a seed and every
+    title and URL is unique.
+    
+    Args:
+        size: Number of assessments
+        output_file: JSON file to save the catalog to (None returns it without saving)
+        seed: Random seed
+        base_assessments: Catalog whose field distributions are reproduced
+        
+    Returns:
+        List of assessments
+    """
+    rng = random.Random(seed)
+    base_assessments = base_assessments or generate_mock_data(output_file=None)
+    
+    # Per test type: how common it is, its durations and its support rates (Laplace-smoothed)
+    by_type = {}
+    for assessment in base_assessments:
+        by_type.setdefault(assessment.get("test_type", "Technical"), []).append(assessment)
+    test_types = sorted(by_type)
+    type_weights = [len(by_type[test_type]) for test_type in test_types]
+    durations = {
+        test_type: [int(re.search(r'\d+', a.get("duration", "30")).group()) for a in items if re.search(r'\d+', a.get("duration", ""))] or [30]
+        for test_type, items in by_type.items()
+    }
+    rates = {
+        test_type: {
+            field: (sum(a.get(field) == "Yes" for a in items) + 1) / (len(items) + 2)
+            for field in ("remote_testing_support", "adaptive_irt_support")
+        }
+        for test_type, items in by_type.items()
+    }
+    
+    assessments = []
+    titles = set()
+    urls = set()
+    for _ in range(size):
+        test_type = rng.choices(test_types, weights=type_weights)[0]
+        values = {
+            "skill": rng.choice(SYNTHETIC_SKILLS),
+            "level": rng.choice(SYNTHETIC_LEVELS),
+            "role": rng.choice(SYNTHETIC_ROLES),
+            "construct": rng.choice(SYNTHETIC_CONSTRUCTS.get(test_type, SYNTHETIC_CONSTRUCTS["Skills"]))
+        }
+        
+        if test_type == "Technical":
+            title = f"{values['skill']} ({values['level']})"
+        elif test_type == "Skills":
+            title = f"{values['role']} - {values['construct']}"
+        else:
+            title = f"{values['construct']} - {values['role']}"
+        title += rng.choice(SYNTHETIC_EDITIONS)
+        
+        # Later variants of an existing title get a version number
+        unique_title = title
+        version = 2
+        while unique_title in titles:
+            unique_title = f"{title} v{version}"
+            version += 1
+        titles.add(unique_title)
+        
+        slug = re.sub(r'[^a-z0-9]+', '-', unique_title.lower().replace('+', 'p').replace('#', 'sharp')).strip('-')
+        url = f"https://www.shl.com/solutions/products/product-catalog/view/{slug}/"
+        suffix = 2
+        while url in urls:
+            url = f"https://www.shl.com/solutions/products/product-catalog/view/{slug}-{suffix}/"
+            suffix += 1
+        urls.add(url)
+        
+        # Durations vary around the base catalog's, in 5-minute steps
+        duration = max(5, rng.choice(durations.get(test_type, [30])) + 5 * rng.randint(-2, 2))
+        
+        description = rng.choice(SYNTHETIC_DESCRIPTIONS.get(test_type, SYNTHETIC_DESCRIPTIONS["Skills"])).format(
+            skill=values["skill"], level=values["level"].lower(), role=values["role"],
+            construct=values["construct"].lower()
+        )
+        description = " ".join([description] + rng.sample(SYNTHETIC_DETAILS, rng.randint(0, 2)))
+        
+        type_rates = rates.get(test_type, {"remote_testing_support": 0.9, "adaptive_irt_support": 0.1})
+        assessments.append({
+            "title": unique_title,
+            "url": url,
+            "remote_testing_support": "Yes" if rng.random() < type_rates["remote_testing_support"] else "No",
+            "adaptive_irt_support": "Yes" if rng.random() < type_rates["adaptive_irt_support"] else "No",
+            "duration": f"{duration} minutes",
+            "test_type": test_type,
+            "description": description,
+            "features": [f"Job level: {level}" for level in sorted(rng.sample(SYNTHETIC_JOB_LEVELS, rng.randint(1, 3)))]
+        })
+    
+    if output_file is not None:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(assessments, f, indent=4)
+        logger.info(f"Saved {len(assessments)} synthetic assessments to {output_file}")
+    
+    return assessments
+
 if __name__ == "__main__":
     scraper = SHLCatalogScraper()
     
@@ -0,0 +1,100 @@
+"""
+Fast JSON serialization for API responses.
+
+Uses orjson when it is installed (falling back to the standard library
+with compact separators), and assembles list responses from per-assessment
+JSON fragments that are serialized once when the catalog is loaded, so a
+response costs a byte join instead of one Pydantic model and one encoder
+pass per result.
+"""
+
+import json
+from typing import List, Dict, Any, Iterable
+
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Fields of an assessment in /recommend-style responses, in response order
+ASSESSMENT_FIELDS = (
+    "title", "url", "remote_testing_support", "adaptive_irt_support", "duration", "test_type"
+)
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value to compact UTF-8 JSON."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def assessment_fragment(assessment: Dict[str, Any]) -> bytes:
+    """Serialize the response fields of one assessment (or recommendation)."""
+    return dumps({
+        "title": assessment["title"],
+        "url": assessment["url"],
+        "remote_testing_support": assessment.get("remote_testing_support", "No"),
+        "adaptive_irt_support": assessment.get("adaptive_irt_support", "No"),
+        "duration": assessment.get("duration", "N/A"),
+        "test_type": assessment.get("test_type", "N/A")
+    })
+
+
+def fragment_object(list_field: str, fragments: Iterable[bytes], fields: Dict[str, Any]) -> bytes:
+    """
+    Serialize a JSON object from pre-serialized list items.
+
+    Args:
+        list_field: Name of the field holding the list
+        fragments: Serialized JSON of each list item
+        fields: Remaining fields of the object, serialized here
+
+    Returns:
+        JSON of {list_field: [fragments...], **fields}
+    """
+    body = b'{"' + list_field.encode("utf-8") + b'":[' + b",".join(fragments) + b"]"
+    if fields:
+        return body + b"," + dumps(fields)[1:]
+    return body + b"}"
+
+
+def fragment_response(list_field: str, fragments: Iterable[bytes], fields: Dict[str, Any],
+                      status_code: int = 200, headers: Dict[str, str] = None) -> Response:
+    """Build a JSON response from pre-serialized list items (see fragment_object)."""
+    return Response(
+        content=fragment_object(list_field, fragments, fields),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
+
+
+def recommendation_fragments(recommendations: List[Dict[str, Any]], catalog_index) -> List[bytes]:
+    """
+    Get the serialized response fields of each recommendation.
+
+    Uses the fragments cached by the catalog index, serializing only
+    recommendations whose URL is not in the catalog and explanations.
+    """
+    fragments = []
+    for recommendation in recommendations:
+        assessment_id = catalog_index.by_url(recommendation["url"])
+        if assessment_id is None:
+            fragment = assessment_fragment(recommendation)
+        else:
+            fragment = catalog_index.fragments[assessment_id]
+        if "explanation" in recommendation:
+            fragment = fragment[:-1] + b',"explanation":' + dumps(recommendation["explanation"]) + b'}'
+        fragments.append(fragment)
+    return fragments
@@ -0,0 +1,227 @@
+"""
+Pre-forking API server.
+
+With `uvicorn api:app --workers N`, every worker imports torch and loads the
+embedding model, the index and the catalog on its own, and the first
+requests each worker serves pay for lazy initialization. This server
+initializes the API (engine included) once in the master process, runs a
+warm-up inference pass, freezes the heap for the garbage collector and only
+then forks the workers, which share the master's memory copy-on-write and
+serve requests immediately. Workers that exit are re-forked from the warm
+master, after the background jobs they were running are re-queued.
+
+/metrics reports the sum over all workers: each worker writes its metrics
+to a directory shared with the others (SHL_METRICS_DIR, a fresh temporary
+directory by default).
+
+Usage:
+    python serve.py --workers 4 --port 8000 [--preload-reranker]
+
+The master runs torch and FAISS single-threaded: OpenMP thread pools do not
+survive fork, so workers set their own thread counts (--threads-per-worker)
+after forking.
+"""
+
+import os
+import gc
+import time
+import shutil
+import signal
+import socket
+import logging
+import argparse
+import tempfile
+from typing import List
+
+# Set before the tokenizers library is imported, so it never starts threads in the master
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+# Tell the API it is being preloaded (it leaves starting the background job queue and
+# the metrics writer to the workers)
+os.environ["SHL_PRELOAD"] = "1"
+
+import uvicorn
+
+from job_queue import worker_id
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WARMUP_QUERIES = [
+    "Java developer who can collaborate with business teams, under 40 minutes",
+    "Numerical reasoning test for bank assistants",
+    "Personality questionnaire for a COO"
+]
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    with open("/proc/self/status", 'r') as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def preload(preload_reranker: bool = False):
+    """
+    Import the API (initializing the engine) and run a warm-up inference pass.
+
+    Args:
+        preload_reranker: Also load and warm up the cross-encoder re-ranker
+
+    Returns:
+        The imported api module
+    """
+    import torch
+    import faiss
+    torch.set_num_threads(1)
+    faiss.omp_set_num_threads(1)
+
+    start_time = time.perf_counter()
+    import api
+    engine = api.recommendation_engine
+    load_seconds = time.perf_counter() - start_time
+
+    # Run every stage once so workers start with initialized kernels, caches and lazy state
+    start_time = time.perf_counter()
+    for query in WARMUP_QUERIES:
+        engine.recommend_with_auto_filter(query, top_k=10)
+    engine.recommend(WARMUP_QUERIES[0], top_k=10, mode="hybrid", diversity_lambda=0.7)
+    engine.recommend_batch(WARMUP_QUERIES, top_k=10)
+    if preload_reranker:
+        engine.reranker.warm_up()
+    warmup_seconds = time.perf_counter() - start_time
+
+    # Workers inherit the registry; without a reset every one would report the warm-up traffic
+    api.REGISTRY.reset()
+
+    # Objects that exist now are never collected in workers, so the collector
+    # doesn't write to (and un-share) the pages holding them
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Preloaded the API in {load_seconds:.2f}s and warmed up in {warmup_seconds:.2f}s "
+                f"(RSS {_rss_mb():.0f} MB)")
+    return api
+
+
+def _run_worker(api, sock: socket.socket, threads: int, log_level: str) -> None:
+    """Serve requests in a forked worker."""
+    import torch
+    import faiss
+    torch.set_num_threads(threads)
+    faiss.omp_set_num_threads(threads)
+
+    # uvicorn installs its own shutdown handlers
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Workers share the job database; each claims jobs, including those a dead worker left behind
+    api.job_queue.start()
+    if api.multiprocess_metrics is not None:
+        api.multiprocess_metrics.start()
+
+    logger.info(f"Worker {os.getpid()} ready (RSS {_rss_mb():.0f} MB)")
+    server = uvicorn.Server(uvicorn.Config(api.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = 4, threads_per_worker: int = None,
+          preload_reranker: bool = False, log_level: str = "info") -> None:
+    """
+    Preload the API, then fork and supervise the workers until SIGINT/SIGTERM.
+
+    Args:
+        host: Address to listen on
+        port: Port to listen on
+        workers: Number of worker processes
+        threads_per_worker: torch/FAISS threads per worker (default: CPU count / workers)
+        preload_reranker: Also load the cross-encoder re-ranker before forking
+        log_level: uvicorn log level
+    """
+    start_time = time.perf_counter()
+    # A fresh metrics directory unless one is given (it must not hold files from an earlier run)
+    metrics_dir = None
+    if not os.getenv("SHL_METRICS_DIR"):
+        metrics_dir = tempfile.mkdtemp(prefix="shl-metrics-")
+        os.environ["SHL_METRICS_DIR"] = metrics_dir
+    api = preload(preload_reranker)
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+    # Bind once in the master; every worker accepts from the same socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children: List[int] = []
+    stopping = False
+
+    def fork_worker() -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                _run_worker(api, sock, threads_per_worker, log_level)
+            except Exception as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children.append(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        fork_worker()
+    logger.info(f"Serving on {host}:{port} with {workers} workers, "
+                f"{time.perf_counter() - start_time:.2f}s after start")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid in children:
+            children.remove(pid)
+        # Other workers can run the dead worker's jobs now rather than when their leases expire
+        released = api.job_queue.store.release_worker(worker_id(pid))
+        if released:
+            logger.warning(f"Re-queued {released} background jobs of worker {pid}")
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}; forking a replacement")
+            fork_worker()
+
+    sock.close()
+    if metrics_dir is not None:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from workers forked after preloading the engine")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch/FAISS threads per worker (default: CPU count / workers)")
+    parser.add_argument("--preload-reranker", action="store_true", help="Load the cross-encoder before forking")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.threads_per_worker, args.preload_reranker, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
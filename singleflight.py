@@ -0,0 +1,96 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key at the same time, only the first
+(the leader) runs the computation; the others wait for it and receive the
+same result or exception. Nothing is cached: once the computation finishes,
+the next call for the key runs it again.
+
+Works from threads (`do`) and from the event loop (`do_async`, which runs
+the computation in the threadpool and lets waiting coroutines await it
+without holding a thread). Callers share the returned object, so they must
+not modify it.
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import COALESCED_REQUESTS
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """
+        Initialize a coalescing group.
+
+        Args:
+            name: Operation name used as the metric label
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable, *args) -> Any:
+        """Run fn(*args), or wait for the identical call already running for key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            COALESCED_REQUESTS.inc(operation=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable, *args) -> Any:
+        """
+        Run blocking fn(*args) in the threadpool, coalescing identical concurrent calls.
+
+        The computation runs as its own task that every caller, the first one
+        included, awaits through a shield: a caller that is cancelled (e.g. its
+        client disconnected) stops waiting without cancelling it for the others.
+        """
+        task = self._async_calls.get(key)
+        if task is not None:
+            COALESCED_REQUESTS.inc(operation=self.name)
+        else:
+            task = asyncio.ensure_future(run_in_threadpool(self.do, key, fn, *args))
+            self._async_calls[key] = task
+            task.add_done_callback(lambda done: self._finish_async(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_async(self, key: Hashable, task: asyncio.Future) -> None:
+        """Forget a finished computation, so the next call for its key runs it again."""
+        if self._async_calls.get(key) is task:
+            del self._async_calls[key]
+        # Waiters re-raise a failure; don't report it as unretrieved if they all went away
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,88 @@
+"""
+Shared test setup: the repository root on sys.path and small engines built
+over the shipped catalog with a deterministic stand-in for the embedding
+model, so tests never download a model.
+"""
+
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.embeddings import Embeddings
+
+CATALOG_PATH = os.path.join(ROOT, "data", "shl_assessments.json")
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words vectors from hashed words, normalized like the real model's."""
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimensions] += 1
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FailingEmbeddings(HashingEmbeddings):
+    """Fails to encode any batch holding a query with `fail_on` once `failing` is set."""
+
+    def __init__(self, fail_on: str):
+        super().__init__()
+        self.fail_on = fail_on
+        self.failing = False
+
+    def embed_documents(self, texts):
+        if self.failing and any(self.fail_on in text for text in texts):
+            raise RuntimeError("encoder out of memory")
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def catalog():
+    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """Build engines whose catalog copies, caches and indexes live under tmp_path."""
+    from recommend_engine import SHLRecommendationEngine
+
+    engines = []
+
+    def make(name: str = "default", assessments=None, **kwargs):
+        directory = tmp_path / name
+        directory.mkdir(exist_ok=True)
+        if "data_path" not in kwargs:
+            with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            kwargs["data_path"] = str(directory / "catalog.json")
+            with open(kwargs["data_path"], 'w', encoding='utf-8') as f:
+                json.dump(catalog if assessments is None else assessments, f)
+        kwargs.setdefault("embeddings_path", str(directory / "embeddings.pkl"))
+        kwargs.setdefault("faiss_index_path", str(directory / "faiss_index"))
+        kwargs.setdefault("embedding_model", HashingEmbeddings())
+        engine = SHLRecommendationEngine(**kwargs)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.close()
@@ -0,0 +1,87 @@
+"""Tests for the NDJSON batch stream."""
+
+import json
+import asyncio
+
+from batch_stream import NDJSONBatchStream
+from conftest import FailingEmbeddings
+
+
+def _run_stream(stream: NDJSONBatchStream, body: bytes) -> list:
+    """Send a request body through the stream and return the output lines, parsed."""
+    sent = []
+
+    async def run():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # The client stays connected until the response ends
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await stream({"type": "http"}, receive, send)
+
+    asyncio.run(run())
+    output = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return [json.loads(line) for line in output.splitlines()]
+
+
+def _echo_batch(items):
+    return b"".join(json.dumps({"id": item.get("id"), "query": item.get("query")}).encode() + b"\n" for item in items)
+
+
+def test_failed_batch_reports_an_error_per_line_and_continues():
+    calls = []
+
+    def process_batch(items):
+        calls.append(len(items))
+        if any(item.get("query") == "boom" for item in items):
+            raise RuntimeError("encoder crashed")
+        return _echo_batch(items)
+
+    queries = ["a", "b", "boom", "c", "d", "e"]
+    body = b"\n".join(json.dumps({"id": i, "query": query}).encode() for i, query in enumerate(queries))
+    lines = _run_stream(NDJSONBatchStream(process_batch, batch_size=2), body)
+
+    assert calls == [2, 2, 2]
+    assert len(lines) == len(queries)
+    assert lines[:2] == [{"id": 0, "query": "a"}, {"id": 1, "query": "b"}]
+    # Both lines of the failed batch get an error with their input position
+    assert [line["index"] for line in lines[2:4]] == [2, 3]
+    assert [line["id"] for line in lines[2:4]] == [2, 3]
+    assert all("encoder crashed" in line["error"] for line in lines[2:4])
+    # Later batches are still processed
+    assert lines[4:] == [{"id": 4, "query": "d"}, {"id": 5, "query": "e"}]
+
+
+def test_all_lines_are_processed_in_order():
+    body = b"\n".join(json.dumps({"id": i, "query": str(i)}).encode() for i in range(10))
+    lines = _run_stream(NDJSONBatchStream(_echo_batch, batch_size=3), body)
+    assert [line["id"] for line in lines] == list(range(10))
+
+
+def test_engine_encoding_failure_reaches_the_stream_as_error_lines(make_engine):
+    embeddings = FailingEmbeddings("boom")
+    engine = make_engine(embedding_model=embeddings)
+    embeddings.failing = True
+
+    def process_batch(items):
+        results = engine.recommend_batch([item["query"] for item in items], top_k=3)
+        return b"".join(
+            json.dumps({"id": item["id"], "recommendations": recs}).encode() + b"\n"
+            for item, recs in zip(items, results)
+        )
+
+    queries = ["java developer", "boom test", "numerical reasoning", "sales manager"]
+    body = b"\n".join(json.dumps({"id": i, "query": query}).encode() for i, query in enumerate(queries))
+    lines = _run_stream(NDJSONBatchStream(process_batch, batch_size=2), body)
+
+    # The failed batch is reported, not answered with empty recommendation lists
+    assert [line["index"] for line in lines[:2]] == [0, 1]
+    assert all("encoder out of memory" in line["error"] for line in lines[:2])
+    assert [line["id"] for line in lines[2:]] == [2, 3]
+    assert all(line["recommendations"] for line in lines[2:])
@@ -0,0 +1,28 @@
+"""Tests for offline bulk recommendation shards."""
+
+import os
+
+import pytest
+
+import bulk_recommend
+from conftest import FailingEmbeddings
+
+
+def test_shard_with_a_failed_batch_is_left_for_the_next_run(make_engine, tmp_path, monkeypatch):
+    embeddings = FailingEmbeddings("boom")
+    monkeypatch.setattr(bulk_recommend, "_engine", make_engine(embedding_model=embeddings))
+    embeddings.failing = True
+    work_dir = str(tmp_path / "shards")
+    os.makedirs(work_dir)
+    rows = [{"id": i, "query": query} for i, query in enumerate(["java developer", "boom", "sales manager"])]
+
+    with pytest.raises(RuntimeError, match="encoder out of memory"):
+        bulk_recommend._process_shard(0, rows, work_dir, top_k=3, batch_size=2)
+    # Neither a complete nor a partial results file counts the shard as done
+    assert os.listdir(work_dir) == []
+
+    # Once encoding works again, the shard is processed in full
+    embeddings.failing = False
+    shard, count, _ = bulk_recommend._process_shard(0, rows, work_dir, top_k=3, batch_size=2)
+    assert (shard, count) == (0, 3)
+    assert os.path.exists(bulk_recommend._shard_path(work_dir, 0))
@@ -0,0 +1,73 @@
+"""Tests for converting pickled-docstore indexes to the embedding store."""
+
+import os
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from embedding_store import STORE_FILE, MANIFEST_FILE, EmbeddingStore, convert_faiss_index, read_index_version
+from conftest import HashingEmbeddings
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    """Counts documents encoded, to tell an index load from a rebuild."""
+
+    def __init__(self):
+        super().__init__()
+        self.documents_encoded = 0
+
+    def embed_documents(self, texts):
+        self.documents_encoded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _save_legacy_index(engine, index_dir: str) -> None:
+    """Save the engine's documents the way older versions did: index.faiss plus a pickled docstore."""
+    texts, metadatas = engine._build_documents()
+    FAISS.from_embeddings(
+        list(zip(texts, engine.document_embeddings.tolist())),
+        engine.embedding_model,
+        metadatas=metadatas
+    ).save_local(index_dir)
+
+
+def test_engine_loads_a_converted_index_without_rebuilding(tmp_path, make_engine):
+    source = make_engine("source")
+    legacy_dir = str(tmp_path / "legacy_index")
+    _save_legacy_index(source, legacy_dir)
+    assert not os.path.exists(os.path.join(legacy_dir, MANIFEST_FILE))
+
+    convert_faiss_index(legacy_dir, model_name=source.model_name)
+    assert read_index_version(legacy_dir) == source.index_version
+    assert EmbeddingStore(os.path.join(legacy_dir, STORE_FILE)).index_version == source.index_version
+
+    embeddings = CountingEmbeddings()
+    engine = make_engine(
+        "converted",
+        data_path=source.data_path,
+        faiss_index_path=legacy_dir,
+        embeddings_path=str(tmp_path / "empty_cache" / "embeddings.pkl"),
+        embedding_model=embeddings
+    )
+    assert embeddings.documents_encoded == 0
+    assert engine.embedding_store is not None
+    np.testing.assert_allclose(engine.document_embeddings, source.document_embeddings, atol=1e-6)
+    assert [r["url"] for r in engine.recommend("Java developer", top_k=5)] == \
+        [r["url"] for r in source.recommend("Java developer", top_k=5)]
+
+
+def test_converted_index_of_another_model_is_rebuilt(tmp_path, make_engine):
+    source = make_engine("source")
+    legacy_dir = str(tmp_path / "legacy_index")
+    _save_legacy_index(source, legacy_dir)
+    convert_faiss_index(legacy_dir, model_name="some-other-model")
+
+    embeddings = CountingEmbeddings()
+    make_engine(
+        "converted",
+        data_path=source.data_path,
+        faiss_index_path=legacy_dir,
+        embeddings_path=str(tmp_path / "empty_cache" / "embeddings.pkl"),
+        embedding_model=embeddings
+    )
+    assert embeddings.documents_encoded == len(source.assessments)
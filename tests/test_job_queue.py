@@ -0,0 +1,164 @@
+"""Tests for the SQLite-backed background job queue shared between processes."""
+
+import time
+import sqlite3
+import multiprocessing
+
+from job_queue import JobStore, JobQueue, worker_id, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+
+def _wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _echo(request):
+    return {"echo": request["query"]}
+
+
+def _serve_jobs(db_path: str, log_path: str, seconds: float) -> None:
+    """Run a job queue in a separate process, logging every job it runs."""
+    def handler(request):
+        with open(log_path, "a") as f:
+            f.write(f"{request['query']}\n")
+        time.sleep(0.01)
+        return {"echo": request["query"]}
+
+    JobQueue(JobStore(db_path), handler, workers=2, poll_interval=0.02)
+    time.sleep(seconds)
+
+
+def test_each_job_runs_once_across_processes(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    log_path = str(tmp_path / "runs.log")
+    queue = JobQueue(JobStore(db_path), _echo, start=False)
+    job_ids = [queue.submit({"query": f"q{i}"}) for i in range(30)]
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_serve_jobs, args=(db_path, log_path, 3.0)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    assert _wait_for(lambda: all(queue.get(job_id)["status"] == SUCCEEDED for job_id in job_ids))
+    for process in processes:
+        process.join()
+
+    with open(log_path) as f:
+        runs = f.read().split()
+    assert sorted(runs) == sorted(f"q{i}" for i in range(30))
+
+
+def test_identical_submissions_share_a_job_across_queues(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    first = JobQueue(JobStore(db_path), _echo, start=False)
+    second = JobQueue(JobStore(db_path), _echo, start=False)
+
+    job_id = first.submit({"query": "java"})
+    assert second.submit({"query": "java"}) == job_id
+    assert second.submit({"query": "python"}) != job_id
+
+    # Once the job has finished, the same request is a new job
+    first.start()
+    assert _wait_for(lambda: first.get(job_id)["status"] == SUCCEEDED)
+    assert second.submit({"query": "java"}) != job_id
+
+
+def test_job_of_a_dead_worker_is_claimed_after_its_lease_expires(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store, _echo, lease_seconds=0.3, poll_interval=0.02, start=False)
+    job_id = queue.submit({"query": "sql"})
+
+    # A worker that claims the job and dies without renewing its lease
+    assert store.claim("other-host:1", lease_seconds=0.2, max_attempts=3)[0] == job_id
+    assert store.get(job_id)["status"] == RUNNING
+
+    queue.start()
+    assert _wait_for(lambda: store.get(job_id)["status"] == SUCCEEDED)
+    assert store.get(job_id)["result"] == {"echo": "sql"}
+    # The dead worker's late result is not recorded over it
+    assert not store.finish(job_id, "other-host:1", FAILED, error="late")
+
+
+def test_running_job_keeps_its_lease(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    def slow(request):
+        time.sleep(0.6)
+        return {"echo": request["query"]}
+
+    queue = JobQueue(store, slow, lease_seconds=0.15, poll_interval=0.02)
+    job_id = queue.submit({"query": "slow"})
+    assert _wait_for(lambda: store.get(job_id)["status"] == RUNNING)
+
+    # Renewals keep other workers from claiming it while it runs
+    time.sleep(0.3)
+    assert store.claim("other-host:1", lease_seconds=1, max_attempts=3) is None
+    assert _wait_for(lambda: store.get(job_id)["status"] == SUCCEEDED)
+
+
+def test_job_that_keeps_killing_its_worker_fails(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store, _echo, start=False)
+    job_id = queue.submit({"query": "crash"})
+
+    for attempt in range(2):
+        assert store.claim(f"other-host:{attempt}", lease_seconds=0, max_attempts=2)[0] == job_id
+        time.sleep(0.01)
+    assert store.claim("other-host:3", lease_seconds=0, max_attempts=2) is None
+    assert store.get(job_id)["status"] == FAILED
+
+
+def test_finished_jobs_are_purged_while_running(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store, _echo, retention_seconds=0.1, purge_interval=0.1, poll_interval=0.02)
+    job_id = queue.submit({"query": "numerical"})
+    # Only finished jobs are purged, without creating a new queue
+    assert _wait_for(lambda: store.get(job_id) is None)
+
+
+def test_jobs_left_running_by_an_old_database_are_resumed(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    connection = sqlite3.connect(db_path)
+    connection.execute("""
+        CREATE TABLE jobs (id TEXT PRIMARY KEY, request_key TEXT NOT NULL, request TEXT NOT NULL,
+                           status TEXT NOT NULL, result TEXT, error TEXT,
+                           created_at REAL NOT NULL, updated_at REAL NOT NULL)
+    """)
+    connection.execute(
+        "INSERT INTO jobs VALUES ('old', 'key', '{\"query\": \"legacy\"}', ?, NULL, NULL, 0, 0)", (RUNNING,)
+    )
+    connection.commit()
+    connection.close()
+
+    store = JobStore(db_path)
+    JobQueue(store, _echo, poll_interval=0.02)
+    assert _wait_for(lambda: store.get("old")["status"] == SUCCEEDED)
+
+
+def test_jobs_of_a_reaped_worker_are_requeued_at_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store, _echo, lease_seconds=3600, poll_interval=0.02, start=False)
+    job_id = queue.submit({"query": "reasoning"})
+
+    # The worker dies holding a long lease; its supervisor releases the job
+    assert store.claim(worker_id(12345), lease_seconds=3600, max_attempts=3)[0] == job_id
+    assert store.release_worker(worker_id(12345)) == 1
+    assert store.get(job_id)["status"] == QUEUED
+
+    queue.start()
+    assert _wait_for(lambda: store.get(job_id)["status"] == SUCCEEDED)
+
+
+def test_released_job_that_keeps_killing_its_worker_fails(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store, _echo, start=False)
+    job_id = queue.submit({"query": "crash"})
+
+    for attempt in range(2):
+        assert store.claim(worker_id(attempt + 1), lease_seconds=3600, max_attempts=2)[0] == job_id
+        store.release_worker(worker_id(attempt + 1))
+    assert store.claim(worker_id(3), lease_seconds=3600, max_attempts=2) is None
+    assert store.get(job_id)["status"] == FAILED
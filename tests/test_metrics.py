@@ -0,0 +1,58 @@
+"""Tests for metrics aggregated over the worker processes of one server."""
+
+import multiprocessing
+
+from metrics import MetricsRegistry, MultiprocessMetrics
+
+
+def _registry():
+    registry = MetricsRegistry()
+    registry.counter("shl_test_requests_total", "Requests", ["route"])
+    registry.histogram("shl_test_seconds", "Latency", buckets=(0.1, 1.0))
+    return registry
+
+
+def _serve_requests(directory: str, requests: int) -> None:
+    """A worker that serves some requests, writes its metrics and exits."""
+    registry = _registry()
+    exporter = MultiprocessMetrics(registry, directory, interval=60)
+    exporter.start()
+    counter = registry.counter("shl_test_requests_total", "Requests", ["route"])
+    histogram = registry.histogram("shl_test_seconds", "Latency", buckets=(0.1, 1.0))
+    for _ in range(requests):
+        counter.inc(route="/recommend")
+        histogram.observe(0.5)
+    exporter.write()
+
+
+def test_metrics_are_summed_over_workers_including_exited_ones(tmp_path):
+    directory = str(tmp_path / "metrics")
+    context = multiprocessing.get_context("fork")
+    for requests in (3, 4):
+        process = context.Process(target=_serve_requests, args=(directory, requests))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+    # The worker answering /metrics adds its live values to the other workers' files
+    registry = _registry()
+    exporter = MultiprocessMetrics(registry, directory, interval=60)
+    exporter.start()
+    registry.counter("shl_test_requests_total", "Requests", ["route"]).inc(route="/recommend")
+    registry.histogram("shl_test_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.05)
+
+    lines = exporter.render().splitlines()
+    assert 'shl_test_requests_total{route="/recommend"} 8.0' in lines
+    assert 'shl_test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'shl_test_seconds_bucket{le="1.0"} 8' in lines
+    assert "shl_test_seconds_count 8" in lines
+
+
+def test_reset_forgets_values_before_workers_start(tmp_path):
+    registry = _registry()
+    counter = registry.counter("shl_test_requests_total", "Requests", ["route"])
+    counter.inc(route="/recommend")
+    registry.reset()
+
+    assert counter.value(route="/recommend") == 0
+    assert "shl_test_seconds_count" not in registry.render()
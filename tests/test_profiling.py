@@ -0,0 +1,51 @@
+"""Tests for per-request profiling."""
+
+import os
+import time
+import asyncio
+
+import pytest
+from starlette.concurrency import run_in_threadpool
+
+from profiling import RequestProfiler, PYINSTRUMENT_AVAILABLE
+
+
+def _busy_engine_stage(seconds: float) -> int:
+    """CPU-bound work standing in for a slow pipeline stage."""
+    deadline = time.perf_counter() + seconds
+    iterations = 0
+    while time.perf_counter() < deadline:
+        iterations += 1
+    return iterations
+
+
+@pytest.mark.skipif(not PYINSTRUMENT_AVAILABLE, reason="pyinstrument is not installed")
+def test_profile_of_threadpool_work_contains_engine_frames(tmp_path, make_engine):
+    engine = make_engine()
+    profiler = RequestProfiler(enabled=True, output_dir=str(tmp_path / "profiles"))
+
+    def recommend(query):
+        _busy_engine_stage(0.05)
+        return engine.recommend_with_auto_filter(query, top_k=5)
+
+    # Run the way the API does: on a threadpool thread, awaited from the event loop
+    async def request():
+        return await run_in_threadpool(profiler.run, "request-1", recommend, "Java developer under 40 minutes")
+
+    recommendations, profile_path = asyncio.run(request())
+
+    assert recommendations
+    assert os.path.exists(profile_path)
+    with open(profile_path, encoding='utf-8') as f:
+        artifact = f.read()
+    assert "recommend_with_auto_filter" in artifact
+    assert "_busy_engine_stage" in artifact
+
+
+def test_concurrent_profile_runs_unprofiled(tmp_path):
+    profiler = RequestProfiler(enabled=True, output_dir=str(tmp_path / "profiles"))
+    with profiler.profile("first") as first_path:
+        result, second_path = profiler.run("second", sum, [1, 2, 3])
+    assert first_path is not None
+    assert second_path is None
+    assert result == 6
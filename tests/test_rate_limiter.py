@@ -0,0 +1,81 @@
+"""Tests for the per-client rate limiting middleware."""
+
+import asyncio
+import threading
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from rate_limiter import RateLimitMiddleware, SQLiteRateLimitBackend
+
+
+class RecordingBackend(SQLiteRateLimitBackend):
+    """Records the threads its calls are made on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def take(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().take(*args)
+
+    def acquire_slot(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().acquire_slot(*args)
+
+    def release_slot(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().release_slot(*args)
+
+
+def _client(endpoint, **settings):
+    app = Starlette(routes=[Route("/recommend", endpoint, methods=["GET"])])
+    return TestClient(RateLimitMiddleware(app, **settings))
+
+
+def test_limit_header_reports_the_burst_size():
+    async def endpoint(request):
+        return PlainTextResponse("ok")
+
+    client = _client(endpoint, rate=2, burst=5, concurrency=0)
+    responses = [client.get("/recommend") for _ in range(6)]
+
+    assert [response.status_code for response in responses] == [200] * 5 + [429]
+    assert {response.headers["x-ratelimit-limit"] for response in responses} == {"5"}
+    assert [response.headers["x-ratelimit-remaining"] for response in responses[:5]] == ["4", "3", "2", "1", "0"]
+
+
+def test_shared_backend_is_called_off_the_event_loop(tmp_path):
+    loop_threads = []
+
+    async def endpoint(request):
+        loop_threads.append(threading.get_ident())
+        return PlainTextResponse("ok")
+
+    backend = RecordingBackend(str(tmp_path / "limits.db"))
+    client = _client(endpoint, rate=10, burst=20, concurrency=4, backend=backend)
+    assert client.get("/recommend").status_code == 200
+
+    assert len(backend.threads) == 3
+    assert loop_threads[0] not in backend.threads
+
+
+def test_slot_of_a_long_request_outlives_its_lease(tmp_path):
+    backend = SQLiteRateLimitBackend(str(tmp_path / "limits.db"), slot_lease_seconds=0.3)
+    held = []
+
+    async def endpoint(request):
+        # Several leases later, the client's only slot is still taken
+        await asyncio.sleep(1.0)
+        held.append(backend.acquire_slot("ip:testclient", 1) is None)
+        return PlainTextResponse("ok")
+
+    client = _client(endpoint, rate=0, concurrency=1, backend=backend)
+    assert client.get("/recommend").status_code == 200
+
+    assert held == [True]
+    # Released once the response was sent
+    assert backend.acquire_slot("ip:testclient", 1) is not None
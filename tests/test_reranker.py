@@ -0,0 +1,57 @@
+"""Tests for the cross-encoder re-ranker shared between catalogs."""
+
+import zlib
+
+from reranker import CrossEncoderReranker
+
+
+class TextScoringModel:
+    """Stands in for the cross-encoder: a pair's score depends only on its document text."""
+
+    def __init__(self):
+        self.pairs = 0
+
+    def predict(self, pairs, **kwargs):
+        self.pairs += len(pairs)
+        return [zlib.crc32(text.encode("utf-8")) / 2 ** 32 for _, text in pairs]
+
+
+def _expected_scores(engine, recommendations):
+    texts = {metadata["url"]: text for metadata, text in zip(engine.document_metadatas, engine.document_texts)}
+    return [zlib.crc32(texts[rec["url"]].encode("utf-8")) / 2 ** 32 for rec in recommendations]
+
+
+def test_shared_reranker_scores_each_catalog_by_its_own_documents(make_engine, catalog):
+    reranker = CrossEncoderReranker()
+    reranker.model = TextScoringModel()
+    reranker.warm_up()
+    reranker.model.pairs = 0
+    # The same ids name different assessments in the two catalogs
+    first = make_engine("first", reranker=reranker, rerank_budget_ms=60000)
+    second = make_engine("second", assessments=list(reversed(catalog))[:20], reranker=reranker,
+                         rerank_budget_ms=60000)
+
+    query = "Java developer who collaborates with business teams"
+    for engine in (first, second, first, second):
+        recommendations = engine.recommend(query, top_k=5, rerank=True)
+        assert [rec["rerank_score"] for rec in recommendations] == _expected_scores(engine, recommendations)
+
+    # Assessments both catalogs hold were scored once
+    texts = set(first.document_texts) | set(second.document_texts)
+    assert reranker.model.pairs <= len(texts)
+
+
+def test_budgeted_request_does_not_wait_for_the_model(make_engine):
+    reranker = CrossEncoderReranker()
+    reranker.model = TextScoringModel()
+    engine = make_engine(reranker=reranker, rerank_budget_ms=60000)
+    query = "Java developer who collaborates with business teams"
+
+    # Before the model has been timed, the first-stage order is kept and the model warms up
+    first = engine.recommend(query, top_k=5, rerank=True)
+    assert all("rerank_score" not in rec for rec in first)
+    reranker._warm_up_thread.join(5)
+    assert reranker._seconds_per_pair is not None
+
+    second = engine.recommend(query, top_k=5, rerank=True)
+    assert [rec["rerank_score"] for rec in second] == _expected_scores(engine, second)
@@ -0,0 +1,51 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    runs = []
+
+    def compute(query):
+        runs.append(query)
+        release.wait(5)
+        return {"query": query}
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do_async("java", compute, "java"))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(flight.do_async("java", compute, "java"))
+        await asyncio.sleep(0.05)
+
+        # The leader's client goes away while the computation runs
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await follower
+
+    assert asyncio.run(scenario()) == {"query": "java"}
+    assert runs == ["java"]
+
+
+def test_failure_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("encoder unavailable")
+
+    async def scenario():
+        results = await asyncio.gather(flight.do_async("k", fail), flight.do_async("k", fail),
+                                       return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        # The next call runs the computation again
+        return await flight.do_async("k", lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"